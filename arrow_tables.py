@@ -0,0 +1,42 @@
+"""
+pandas ↔ Arrow 轉換（中繼檔、checkpoint 與主資料共用）
+"""
+import pandas as pd
+import pyarrow as pa
+
+
+def _decode_dictionaries(table: pa.Table) -> pa.Table:
+    # category 欄位存成一般型別，各 segment / 分區檔 schema 一致（Parquet 本身仍會字典編碼）
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    return table
+
+
+def to_arrow_table(df: pd.DataFrame, keep_dictionaries: bool = False) -> pa.Table:
+    """
+    DataFrame 轉 Arrow；混合型別的 object 欄位（例如數字與字串混雜）轉成字串。
+    keep_dictionaries=True 時保留 category（checkpoint 讀回仍為 category）。
+    """
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.columns:
+            if df[col].dtype == object:
+                try:
+                    pa.array(df[col], from_pandas=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    return table if keep_dictionaries else _decode_dictionaries(table)
+
+
+def string_types_mapper(arrow_type: pa.DataType):
+    """
+    Table.to_pandas 的 types_mapper：字串欄位轉成 pd.ArrowDtype，直接沿用 Arrow buffer
+    （memory-mapped 檔案不複製、不轉成 Python 物件）；其他型別沿用 pyarrow 預設（數值為 numpy、dictionary 為 category）。
+    """
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
@@ -0,0 +1,67 @@
+"""
+縣市分區 process pool benchmark：filter_basic ~ elevator 的 transform 鏈在 1/2/4/8 個 worker 下的耗時，
+並確認各 worker 數的輸出與單一程序相同（全域統計先算好再廣播）。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_city_partition --rows 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import numpy as np
+
+from benchmarks.bench_moi_schema import write_moi_csv
+from etl_01_extract.moi_schema import read_moi_csv
+from etl_02_transform.city_partition import STEPS, run_step
+
+
+def make_city_frame(rows, seed=42):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_moi_csv(os.path.join(tmp, "merged.csv"), rows, seed=seed, english_header=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = read_moi_csv(path)
+    rng = np.random.default_rng(seed)
+    df["來源檔名"] = rng.choice(["A_lvr_land_a.csv", "F_lvr_land_a.csv", "H_lvr_land_a.csv"], len(df),
+                              p=[.3, .45, .25])
+    return df
+
+
+def run_chain(df, workers, max_rows):
+    for name in STEPS:
+        df = run_step(name, df, workers=workers, max_rows=max_rows)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--max-rows", type=int, default=200_000, help="可切塊步驟的分區列數上限")
+    args = parser.parse_args()
+
+    df = make_city_frame(args.rows)
+    print(f"rows: {len(df):,}  cpus: {os.cpu_count()}")
+
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            out = run_chain(df.copy(), workers, args.max_rows)
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline = (out, elapsed)
+            check = "baseline"
+        else:
+            ref = baseline[0]
+            same = ref.index.equals(out.index) and ref.astype(object).equals(out.astype(object))
+            check = f"same output={same}"
+        print(f"workers={workers}: {elapsed:7.2f}s  {len(df) / elapsed:12,.0f} rows/sec  "
+              f"(x{baseline[1] / elapsed:.2f})  rows_out={len(out):,}  {check}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+免複製模式 benchmark：FilterBasic → DateHouseAge → ParkingProcessing → MaterialProcessing → ElevatorProcessing
+在三種交接方式下的峰值 RSS 與耗時。
+
+- deep  ：每個 stage 收到 df.copy()（舊版 __init__ 的防禦性複製）
+- shared：owned=False，copy-on-write 下淺複製
+- owned ：owned=True，上游交出所有權，完全不複製
+
+每種模式在獨立子程序執行，峰值 RSS 互不影響。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_copy_mode --rows 1000000
+"""
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from etl_02_transform.copy_mode import enable_copy_on_write
+from etl_02_transform.date_houseage import DateHouseAge
+from etl_02_transform.elevator_processing import ElevatorProcessing
+from etl_02_transform.filter_basic import FilterBasic
+from etl_02_transform.material_processing import MaterialProcessing
+from etl_02_transform.parking_processing import ParkingProcessing
+
+MODES = ("deep", "shared", "owned")
+
+
+def _reset_peak_rss():
+    # 清除 VmHWM，峰值只計算 stage 執行期間（不含產生測試資料）；不支援時退回 ru_maxrss
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Linux 單位為 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _current_rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+def make_frame(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    roads = [f"臺北市大安區復興南路{i}段{j}號" for i in range(1, 5) for j in range(1, 200)]
+    return pd.DataFrame({
+        "編號": [f"RPID{i:012d}" for i in range(rows)],
+        "土地位置建物門牌": rng.choice(roads, rows),
+        "交易標的": rng.choice(["房地(土地+建物)", "房地(土地+建物)+車位", "土地", "車位"], rows, p=[.6, .3, .05, .05]),
+        "主要用途": rng.choice(["住家用", "集合住宅", "商業用", "國民住宅"], rows, p=[.5, .3, .15, .05]),
+        "都市土地使用分區": rng.choice(["住", "商", "工"], rows, p=[.8, .15, .05]),
+        "非都市土地使用分區": rng.choice(["", "鄉村區"], rows, p=[.98, .02]),
+        "備註": rng.choice(["", "親友間交易", "含增建", "急買急賣"], rows, p=[.85, .03, .1, .02]),
+        "建物型態": rng.choice(["住宅大樓(11層含以上有電梯)", "華廈(10層含以下有電梯)", "公寓(5樓含以下無電梯)",
+                              "透天厝", "套房(1房1廳1衛)"], rows),
+        "來源檔名": rng.choice(["A_lvr_land_a.csv", "F_lvr_land_a.csv", "H_lvr_land_a.csv"], rows),
+        "交易年月日": rng.integers(1100101, 1131231, rows).astype(str),
+        "建築完成年月": rng.integers(700101, 1101231, rows).astype(str),
+        "交易筆棟數": rng.choice(["土地1建物1車位0", "土地1建物1車位1", "土地2建物1車位2"], rows),
+        "建物移轉總面積平方公尺": rng.uniform(20, 300, rows).round(2),
+        "車位移轉總面積平方公尺": rng.choice([0.0, 10.5, 25.3, 33.1], rows),
+        "總價元": rng.integers(3_000_000, 60_000_000, rows),
+        "車位總價元": rng.choice([0, 1_500_000, 2_200_000], rows),
+        "車位類別": rng.choice(["坡道平面", "坡道機械", "無車位", None], rows),
+        "主要建材": rng.choice(["鋼筋混凝土造", "鋼骨造", None], rows, p=[.7, .2, .1]),
+        "電梯": rng.choice(["有", "無", None], rows),
+    })
+
+
+def run_chain(holder, mode):
+    def hand_off(frame):
+        # deep 模式模擬舊版：每個 stage 收到一份完整複製
+        return (frame.copy(), True) if mode == "deep" else (frame, mode == "owned")
+
+    # holder 讓呼叫端不保留輸入 df 的參照，owned 模式才能真正交出所有權
+    frame, owned = hand_off(holder.pop())
+    f = FilterBasic(frame, owned=owned)
+    del frame
+    for step in ("remove_pua_chars_from_address", "drop_duplicates_by_id", "unify_columns",
+                 "filter_out_transaction_targets", "keep_residential_usage", "keep_urban_zone_residential",
+                 "filter_out_non_urban_zones", "remove_notes_with_keywords", "cleaning_house_type",
+                 "add_city_from_source"):
+        getattr(f, step)()
+
+    d = DateHouseAge(*hand_off(f.df))
+    del f
+    d.parse_dates().calculate_house_age()
+
+    p = ParkingProcessing(*hand_off(d.df))
+    del d
+    p.process_parking().impute_parking_type()
+
+    m = MaterialProcessing(*hand_off(p.df))
+    del p
+    m.impute_main_material()
+
+    e = ElevatorProcessing(*hand_off(m.df))
+    del m
+    e.infer_elevator()
+    return e.df
+
+
+def child(mode, rows, object_strings):
+    import contextlib
+    import io
+
+    enable_copy_on_write()
+    if object_strings:
+        # 模擬 pandas 2.x 的 object 字串欄
+        pd.set_option("future.infer_string", False)
+    df = make_frame(rows)
+    gc.collect()
+    base = _current_rss_mb()
+    _reset_peak_rss()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        holder = [df]
+        del df
+        out = run_chain(holder, mode)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "mode": mode,
+        "rows_out": len(out),
+        "seconds": round(elapsed, 2),
+        "base_rss_mb": round(base, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3, help="每種模式執行次數，取峰值中位數")
+    parser.add_argument("--object-strings", action="store_true", help="字串欄使用 object dtype（pandas 2.x 行為）")
+    parser.add_argument("--child", choices=MODES)
+    args = parser.parse_args()
+
+    if resource is None:
+        sys.exit("需要 resource 模組（Linux / macOS）量測峰值 RSS")
+    if args.child:
+        return child(args.child, args.rows, args.object_strings)
+
+    results = []
+    for mode in MODES:
+        runs = []
+        for _ in range(args.repeat):
+            cmd = [sys.executable, "-m", "benchmarks.bench_copy_mode", "--rows", str(args.rows), "--child", mode]
+            if args.object_strings:
+                cmd.append("--object-strings")
+            out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        # 記憶體配置器的峰值有雜訊，取中位數
+        runs.sort(key=lambda r: r["peak_rss_mb"])
+        results.append(runs[len(runs) // 2])
+
+    strings = "object" if args.object_strings else "str"
+    print(f"rows: {args.rows:,}  pandas {pd.__version__}  string dtype: {strings}  repeat: {args.repeat}")
+    deep = results[0]
+    for r in results:
+        growth = r["peak_rss_mb"] - r["base_rss_mb"]
+        deep_growth = deep["peak_rss_mb"] - deep["base_rss_mb"]
+        print(f"{r['mode']:<7}: {r['seconds']:7.2f}s  peak RSS {r['peak_rss_mb']:8.1f} MB  "
+              f"(+{growth:7.1f} MB over input, {100 * (1 - growth / deep_growth):5.1f}% less than deep)  "
+              f"rows_out={r['rows_out']:,}")
+
+
+if __name__ == "__main__":
+    main()
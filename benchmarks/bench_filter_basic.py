@@ -0,0 +1,96 @@
+"""
+FilterBasic benchmark：舊版逐條過濾（每條規則產生一份子集）與 filter plan（單一合併 mask）的耗時比較，
+並確認兩者保留的列與各規則刪除筆數相同。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_filter_basic --rows 1000000
+"""
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+import pandas as pd
+
+from etl_02_transform.filter_basic import FILTER_PLAN, FilterBasic
+
+
+def legacy_filter_basic(df):
+    """舊版逐條過濾（與原本 FilterBasic 方法相同），回傳 (df, 各規則刪除筆數)"""
+    counts = {}
+
+    def step(name, new_df):
+        nonlocal df
+        counts[name] = len(df) - len(new_df)
+        df = new_df
+
+    df = df.copy()
+    pua = df["土地位置建物門牌"].astype(str).str.contains('[\uE000-\uF8FF]', regex=True, na=False)
+    step("remove_pua_chars_from_address", df[~pua].copy())
+    step("drop_duplicates_by_id", df.drop_duplicates(subset=["編號"], keep="first"))
+    step("filter_out_transaction_targets", df[~df["交易標的"].isin(["土地", "車位"])])
+    step("keep_residential_usage", df[df["主要用途"].isin(["住家用", "國民住宅", "集合住宅"])])
+    step("keep_urban_zone_residential", df[df["都市土地使用分區"].isin(["住"])])
+    step("filter_out_non_urban_zones",
+         df[~df["非都市土地使用分區"].isin(["一般農業區", "鄉村區", "山坡地保育區", "特定農業區"])])
+    step("remove_notes_with_keywords",
+         df[~df["備註"].astype(str).str.contains("親友|親戚|朋友|員工|特殊", na=False)])
+    df = df.copy()
+    df['建物型態'] = df['建物型態'].astype(str).str.split('(').str[0]
+    step("cleaning_house_type", df[df['建物型態'].isin(('住宅大樓', '華廈', '公寓', '透天厝', '套房'))].copy())
+    return df, counts
+
+
+def make_filter_frame(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    roads = [f"新北市板橋區文化路{i}段{j}號" for i in range(1, 3) for j in range(1, 300)] + ["新北市板橋區\ue0a1路1號"]
+    ids = rng.integers(0, int(rows * 0.97), rows)
+    return pd.DataFrame({
+        "編號": [f"RPID{i:012d}" for i in ids],
+        "土地位置建物門牌": rng.choice(roads, rows),
+        "交易標的": rng.choice(["房地(土地+建物)", "房地(土地+建物)+車位", "土地", "車位", None], rows,
+                             p=[.6, .28, .05, .05, .02]),
+        "主要用途": rng.choice(["住家用", "集合住宅", "商業用", "國民住宅", None], rows, p=[.5, .3, .12, .05, .03]),
+        "都市土地使用分區": rng.choice(["住", "商", "工", None], rows, p=[.75, .15, .05, .05]),
+        "非都市土地使用分區": rng.choice([None, "鄉村區", "特定農業區"], rows, p=[.96, .02, .02]),
+        "備註": rng.choice([None, "親友、員工或其他特殊關係間之交易", "含增建或未登記建物", "急買急賣", "朋友間交易"], rows,
+                         p=[.8, .04, .1, .04, .02]),
+        "建物型態": rng.choice(["住宅大樓(11層含以上有電梯)", "華廈(10層含以下有電梯)", "公寓(5樓含以下無電梯)",
+                              "透天厝", "套房(1房1廳1衛)", "店面(店鋪)", "其他", None], rows),
+    })
+
+
+def _time(func, df):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        out = func(df)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    df = make_filter_frame(args.rows)
+
+    def plan(frame):
+        f = FilterBasic(frame).apply_filter_plan()
+        return f.df, f.step_metrics["drop_counts"]
+
+    (old, old_counts), t_old = _time(legacy_filter_basic, df)
+    (new, new_counts), t_new = _time(plan, df)
+
+    print(f"rows: {args.rows:,}")
+    print(f"legacy     : {t_old:8.3f}s  {args.rows / t_old:14,.0f} rows/sec")
+    print(f"filter plan: {t_new:8.3f}s  {args.rows / t_new:14,.0f} rows/sec  (x{t_old / t_new:.1f})")
+    for rule in FILTER_PLAN:
+        print(f"  {rule:<32} legacy {old_counts.get(rule, 0):>9,}  plan {new_counts.get(rule, 0):>9,}")
+
+    same_rows = old.index.equals(new.index)
+    same_values = same_rows and old.astype(object).equals(new.astype(object))
+    print(f"differential: same rows={same_rows}, same values={same_values}, same counts={old_counts == new_counts}")
+
+
+if __name__ == "__main__":
+    main()
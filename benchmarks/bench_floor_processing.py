@@ -0,0 +1,133 @@
+"""
+FloorProcessing 樓層解析 benchmark：舊版逐列 .apply 與新版相異值單次解析的 rows/sec 比較。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_floor_processing --rows 1000000
+"""
+import argparse
+import re
+import time
+import numpy as np
+import pandas as pd
+
+from etl_02_transform.floor_processing import FloorProcessing
+
+CN = ['一', '二', '三', '四', '五', '六', '七', '八', '九', '十', '十一', '十二', '十五', '二十', '二十三', '三十一']
+
+
+def _legacy_total_floor(value):
+    cn = {'零': 0, '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+    try:
+        s = str(value).strip().replace('層', '')
+        if s.isdigit():
+            num = int(s)
+            return np.nan if num == 0 else num
+        if s == '十':
+            return 10
+        if s.startswith('十'):
+            return 10 + cn.get(s[1:], 0)
+        if s.endswith('十'):
+            return cn.get(s[0], 0) * 10
+        m = re.match(r'^([一二三四五六七八九])十([一二三四五六七八九])$', s)
+        if m:
+            return cn[m.group(1)] * 10 + cn[m.group(2)]
+        if s in cn:
+            num = cn[s]
+            return np.nan if num == 0 else num
+    except:
+        pass
+    return np.nan
+
+
+def _legacy_count(text):
+    if pd.isnull(text): return pd.NA
+    t = str(text)
+    if '全' in t: return 0
+    basement = re.findall(r'地下([一二三四五六七八九十]{1,5})層', t)
+    normal = re.findall(r'(?<!地下)([一二三四五六七八九十]{1,5})層', t)
+    total = len(basement) + len(normal)
+    return total if total > 0 else pd.NA
+
+
+def _legacy_cn2int(s):
+    cn = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
+    if s.isdigit(): return int(s)
+    if s in cn: return cn[s]
+    if '十' in s:
+        left, right = s.split('十')
+        if left == '':
+            return 10 + (cn.get(right, 0) if right != '' else 0)
+        return cn.get(left, 0) * 10 + (cn.get(right, 0) if right != '' else 0)
+    return 0
+
+
+def _legacy_highest(text):
+    if pd.isnull(text): return pd.NA
+    t = str(text)
+    if '全' in t: return 0
+    basement = [-_legacy_cn2int(x) for x in re.findall(r'地下([一二三四五六七八九十0-9]+)層', t)]
+    above = [_legacy_cn2int(x) for x in re.findall(r'(?<!地下)([一二三四五六七八九十0-9]+)層', t)]
+    all_lvls = basement + above
+    return max(all_lvls) if all_lvls else pd.NA
+
+
+def legacy_floor_processing(df):
+    df = df.copy()
+    df['總樓層數'] = df['總樓層數'].apply(_legacy_total_floor).astype('Int64')
+    df['移轉樓層總數'] = df['移轉層次'].apply(_legacy_count).astype('Int64')
+    df['最高交易樓層'] = df['移轉層次'].apply(_legacy_highest)
+    df = df[(df['最高交易樓層'].isna()) | (df['最高交易樓層'] >= 0)]
+    df['最高交易樓層'] = df['最高交易樓層'].astype('Int64')
+    return df
+
+
+def make_floor_frame(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    total = [f"{c}層" for c in CN]
+    transfer = [f"{c}層" for c in CN] + [
+        '全', '地下一層', '地下二層，一層', '二層，三層', '一層，夾層', '騎樓，一層',
+        '四層，陽台', '見其他登記事項', '十二層，十三層，屋頂突出物', '地下一層，地下二層，一層，二層',
+    ]
+    return pd.DataFrame({
+        '總樓層數': rng.choice(total, rows),
+        '移轉層次': rng.choice(transfer, rows),
+    })
+
+
+def _time(func, df):
+    start = time.perf_counter()
+    out = func(df)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    df = make_floor_frame(args.rows)
+
+    def optimized(frame):
+        return (
+            FloorProcessing(frame.copy())
+            .total_floor()
+            .count_transfer_floors()
+            .extract_highest_floor()
+            .df
+        )
+
+    old, t_old = _time(legacy_floor_processing, df)
+    new, t_new = _time(optimized, df)
+
+    print(f"rows: {args.rows:,}")
+    print(f"legacy   : {t_old:8.3f}s  {args.rows / t_old:14,.0f} rows/sec")
+    print(f"optimized: {t_new:8.3f}s  {args.rows / t_new:14,.0f} rows/sec  (x{t_old / t_new:.1f})")
+
+    cols = ['總樓層數', '移轉樓層總數', '最高交易樓層']
+    same_index = old.index.equals(new.index)
+    mismatch = 0 if not same_index else int((old[cols].fillna(-99) != new[cols].fillna(-99)).any(axis=1).sum())
+    print(f"differential: same rows={same_index}, mismatched rows={mismatch}")
+
+
+if __name__ == '__main__':
+    main()
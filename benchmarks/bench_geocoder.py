@@ -0,0 +1,91 @@
+"""
+GeocoderPool 吞吐量 benchmark：以本機假 geocoding server 模擬延遲，
+比較不同 worker 數的 筆/分鐘，並檢查是否達到目標吞吐量。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_geocoder --lookups 200 --latency 0.2 --target 600
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from etl_02_transform.geocoder import GeocoderPool, HttpGeocoder
+
+
+def fake_coordinates(address: str):
+    """地址雜湊成臺北附近的固定座標"""
+    h = int(hashlib.md5(address.encode("utf-8")).hexdigest(), 16)
+    return 25.0 + (h % 10000) / 100000, 121.5 + (h // 10000 % 10000) / 100000
+
+
+def start_fake_server(latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            address = query.get("q", [""])[0]
+            time.sleep(latency)
+            if not address or address.startswith("查無"):
+                body = []
+            else:
+                lat, lng = fake_coordinates(address)
+                body = [{"lat": f"{lat:.7f}", "lon": f"{lng:.7f}"}]
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="假 server 每筆回應延遲（秒）")
+    parser.add_argument("--target", type=float, default=600, help="目標吞吐量（筆/分鐘）")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server = start_fake_server(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/search"
+    addresses = [f"臺北市中正區測試路{i}號" for i in range(args.lookups)]
+
+    for workers in args.workers:
+        # 限速設為遠高於目標，量測的是 worker 並行的實際吞吐量
+        pool = GeocoderPool(lambda: HttpGeocoder(base_url), workers=workers, max_per_minute=60_000, burst=workers)
+        start = time.perf_counter()
+        results = pool.geocode_many(addresses)
+        elapsed = time.perf_counter() - start
+        pool.close()
+
+        per_minute = len(addresses) / elapsed * 60
+        wrong = sum(
+            1 for a, (lat, lng) in results.items()
+            if (round(float(lat), 7), round(float(lng), 7))
+            != tuple(round(v, 7) for v in fake_coordinates(a))
+        )
+        status = "OK" if per_minute >= args.target else "BELOW TARGET"
+        print(f"workers={workers:2d}  {per_minute:10,.0f} 筆/分鐘  錯誤={wrong}  [{status}]")
+
+    # 限速驗證：上限 120 筆/分鐘、burst 1 時 10 筆約需 4.5 秒
+    pool = GeocoderPool(lambda: HttpGeocoder(base_url), workers=4, max_per_minute=120, burst=1)
+    start = time.perf_counter()
+    pool.geocode_many(addresses[:10])
+    print(f"rate limit 120/min, 10 lookups: {time.perf_counter() - start:.2f}s (expected ≈ 4.5s)")
+    pool.close()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
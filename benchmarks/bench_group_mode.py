@@ -0,0 +1,96 @@
+"""
+分組眾數 benchmark：舊版每組 lambda 呼叫兩次 mode() 與向量化 group_mode（一次 groupby size）的耗時，
+並確認兩者的眾數相同；另外量測 ModeTableStore 由主資料建立、累加批次與查詢眾數的耗時，
+以及小批次以本批眾數 / 主資料眾數補值的一致性。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_group_mode --rows 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from etl_02_transform.mode_tables import ModeTableStore, group_mode
+
+HOUSE_TYPES = ["住宅大樓", "華廈", "公寓", "透天厝", "套房"]
+MATERIALS = ["鋼筋混凝土造", "鋼骨造", "加強磚造", "鋼骨鋼筋混凝土造", "磚造", "木造"]
+
+
+def legacy_mode(df):
+    return df.groupby("建物型態", observed=True)["主要建材"].apply(
+        lambda x: x.mode().iloc[0] if not x.mode().empty else np.nan
+    )
+
+
+def make_frame(rows, seed=42, groups=5):
+    rng = np.random.default_rng(seed)
+    house_types = HOUSE_TYPES + [f"型態{i}" for i in range(groups - len(HOUSE_TYPES))]
+    df = pd.DataFrame({
+        "建物型態": rng.choice(house_types, rows),
+        "主要建材": rng.choice(MATERIALS, rows, p=[.55, .15, .12, .1, .05, .03]),
+    })
+    df.loc[rng.random(rows) < 0.05, "主要建材"] = None
+    return df
+
+
+def _time(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--groups", type=int, default=500, help="分組數（建物型態 種類；多組時 lambda 成本明顯）")
+    parser.add_argument("--batch", type=int, default=300, help="季度小批次筆數")
+    args = parser.parse_args()
+
+    for groups in (len(HOUSE_TYPES), args.groups):
+        df = make_frame(args.rows, groups=groups)
+        for label, frame in (("object", df), ("category", df.astype("category"))):
+            old, t_old = _time(lambda: legacy_mode(frame))
+            new, t_new = _time(lambda: group_mode(frame["建物型態"], frame["主要建材"]))
+            same = old.dropna().astype(str).sort_index().equals(new.astype(str).sort_index())
+            print(f"rows {args.rows:,}  groups {groups:>4}  {label:<8}  legacy {t_old:7.3f}s  "
+                  f"group_mode {t_new:7.3f}s  (x{t_old / t_new:5.1f})  same modes={same}")
+
+    # ModeTableStore：主資料建立 / 累加 / 查詢
+    master = make_frame(args.rows, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        master_path = os.path.join(tmp, "master.csv")
+        master.to_csv(master_path, index=False, encoding="utf-8-sig")
+        store = ModeTableStore(os.path.join(tmp, "mode_tables.sqlite"), master_path=master_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, t_build = _time(lambda: store.rebuild("main_material"), repeat=1)
+        batch = make_frame(args.batch, seed=2)
+        _, t_modes = _time(lambda: store.modes("main_material", batch))
+        _, t_add = _time(lambda: store.add(batch), repeat=1)
+        store.close()
+
+    # 小批次：本批眾數 vs 主資料眾數（分組較多時小批次很多組沒有已知值，或眾數與主資料不同）
+    small_master = make_frame(args.rows, seed=1, groups=50)
+    master_modes = group_mode(small_master["建物型態"], small_master["主要建材"])
+    missing, disagree = [], []
+    for seed in range(20):
+        batch = make_frame(args.batch, seed=100 + seed, groups=50)
+        batch_modes = group_mode(batch["建物型態"], batch["主要建材"]).reindex(master_modes.index)
+        missing.append(batch_modes.isna().mean())
+        disagree.append((batch_modes.dropna() != master_modes[batch_modes.notna()]).mean())
+
+    print(f"ModeTableStore: build from master {t_build:6.2f}s  modes(batch) {t_modes * 1000:6.1f} ms  "
+          f"add(batch) {t_add * 1000:6.1f} ms")
+    print(f"batch of {args.batch} rows, 50 groups: batch-only modes missing for {np.mean(missing) * 100:.1f}% "
+          f"of groups, differ from master in {np.mean(disagree) * 100:.1f}% of the rest (master-backed tables: 0% / 0%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+HTTP 下載 benchmark（本機檔案伺服器代替開放資料站）：
+1. 第一次下載本期 zip 並放進原始資料夾的耗時（舊版 Selenium 固定 sleep(50)）
+2. 本期未更新：條件請求（304）略過的耗時
+3. 伺服器不回 304 時：重新下載後以內容雜湊判斷未更新
+4. 傳送一半時中斷連線 + 503：重試後由中斷處續傳，伺服器實際送出的位元組數
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_http_download --rows 200000
+"""
+import argparse
+import json
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from benchmarks.bench_moi_schema import write_moi_csv
+from benchmarks.local_file_server import LocalFileServer
+from etl_01_extract.download_house_data import HouseDownload, TARGET_CSV
+from etl_01_extract.http_downloader import HttpDownloader
+
+
+def make_release_zip(path: Path, rows: int, seed: int = 42):
+    """產生與開放資料相同結構的 zip（三個縣市的 lvr_land_A.csv + 其他縣市的檔案）"""
+    tmp = path.parent / "csv"
+    tmp.mkdir(exist_ok=True)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zfile:
+        for i, name in enumerate(TARGET_CSV + ["B_lvr_land_A.csv", "A_lvr_land_B.csv"]):
+            csv_path = tmp / name
+            write_moi_csv(csv_path, rows, seed=seed + i)
+            zfile.write(csv_path, name)
+            csv_path.unlink()
+    tmp.rmdir()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000, help="每個 CSV 的筆數")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        site = tmp / "site"
+        site.mkdir()
+        zip_path = make_release_zip(site / "lvr_landcsv.zip", args.rows)
+        size = zip_path.stat().st_size
+        print(f"本期 zip：{size / 1024 / 1024:.1f} MB（每個 CSV {args.rows:,} 筆）")
+
+        with LocalFileServer(site) as server:
+            url = server.url + "//Download?type=zip&fileName=lvr_landcsv.zip"
+            house = HouseDownload(download_path=tmp / "downloads", save_path=tmp / "raw",
+                                  downloader=HttpDownloader(progress=None, backoff=0.1), current_url=url)
+
+            start = time.perf_counter()
+            written = house.download_current()
+            first = time.perf_counter() - start
+            print(f"\n[1] 第一次下載 + 放進原始資料夾 {len(written)} 個 zip：{first:.2f}s（舊版固定等待 50s）")
+
+            start = time.perf_counter()
+            written = house.download_current()
+            skip = time.perf_counter() - start
+            print(f"[2] 本期未更新（{house.last_result.status}）：{skip * 1000:.1f} ms，寫出 {len(written)} 個檔案")
+
+            meta_path = HttpDownloader.meta_path(tmp / "downloads" / "lvr_landcsv_current.zip")
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            meta["etag"] = meta["last_modified"] = None
+            meta_path.write_text(json.dumps(meta), encoding="utf-8")
+            start = time.perf_counter()
+            written = house.download_current()
+            print(f"[3] 無條件請求、比對雜湊（{house.last_result.status}）：{time.perf_counter() - start:.2f}s，"
+                  f"寫出 {len(written)} 個檔案")
+
+            # 新一期資料：傳送一半中斷 + 一次 503
+            make_release_zip(zip_path, args.rows, seed=7)
+            size = zip_path.stat().st_size
+            server.bytes_sent = 0
+            server.fail_after_bytes = size // 2
+            server.fail_status = 0
+            start = time.perf_counter()
+            first_attempt = HouseDownload(download_path=tmp / "downloads", save_path=tmp / "raw",
+                                          downloader=HttpDownloader(progress=None, retries=0), current_url=url)
+            try:
+                first_attempt.download_current()
+            except Exception as e:
+                print(f"[4] 第一次下載中斷：{e}")
+            server.fail_status = 1
+            written = house.download_current()
+            result = house.last_result
+            print(f"    重試後（{result.status}）：{time.perf_counter() - start:.2f}s，續傳起點 {result.resumed_bytes:,} bytes，"
+                  f"伺服器共送出 {server.bytes_sent:,} / {size:,} bytes，寫出 {len(written)} 個檔案")
+            with zipfile.ZipFile(zip_path) as src, zipfile.ZipFile(result.path) as dst:
+                same = all(src.read(n) == dst.read(n) for n in src.namelist())
+            print(f"    續傳後 zip 內容與來源相同：{same}")
+
+
+if __name__ == "__main__":
+    main()
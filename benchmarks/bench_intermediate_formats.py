@@ -0,0 +1,84 @@
+"""
+中繼檔格式 benchmark：CSV 與 Arrow IPC（未壓縮 / zstd）
+1. merge → load_raw：RawMerger 寫出 merged_rawdata，IOHandler（moi_schema）讀回
+2. load_master 交接：清整結果寫出 merged_cleaned，MainDataLoader 讀回
+比較寫出 / 讀回耗時、檔案大小、讀回時 Arrow 額外配置的記憶體，並確認讀回內容與型別。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_intermediate_formats --rows 500000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.bench_moi_schema import write_moi_csv
+from etl_01_extract.io_handler import IOHandler, read_frame
+from etl_01_extract.raw_merger import RawMerger
+
+FORMATS = [("csv", ".csv", None), ("arrow", ".arrow", "uncompressed"), ("arrow zstd", ".arrow", "zstd")]
+
+
+def _dtype_names(df):
+    # Arrow IPC 讀回的字串欄位為 pd.ArrowDtype（沿用 mapped buffer），與 CSV 的 string[pyarrow] 視為相同型別
+    return df.dtypes.map(lambda t: "string" if pd.api.types.is_string_dtype(t) and t != object else str(t))
+
+
+def _timed(func):
+    start = time.perf_counter()
+    before = pa.total_allocated_bytes()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return result, time.perf_counter() - start, (pa.total_allocated_bytes() - before) / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000, help="每個原始檔的筆數（共 3 個檔案）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, "raw")
+        os.makedirs(raw)
+        for i, city in enumerate("AFH"):
+            write_moi_csv(os.path.join(raw, f"{city}_113S1.csv"), args.rows, seed=i)
+        print(f"原始檔 3 個 × {args.rows:,} 筆")
+
+        print("\n[1] merge → load_raw")
+        loaded = {}
+        for name, suffix, compression in FORMATS:
+            work = os.path.join(tmp, name.replace(" ", "_"))
+            merged = os.path.join(work, "merged_rawdata" + suffix)
+            merger = RawMerger(raw, merged, workers=2, compression=compression or "uncompressed",
+                               ledger_path=os.path.join(work, "ledger.sqlite"))
+            _, write_s, _ = _timed(merger.merge)
+            merger.ledger.close()
+            df, read_s, arrow_mb = _timed(lambda: IOHandler(input_path=merged, moi_schema=True).load())
+            loaded[name] = df
+            print(f"  {name:11s} 寫出 {write_s:6.2f}s  讀回 {read_s:6.2f}s  檔案 {os.path.getsize(merged) / 1024 / 1024:7.1f} MB"
+                  f"  讀回 Arrow 配置 {arrow_mb:7.1f} MB")
+        base = loaded["csv"]
+        for name, df in loaded.items():
+            same = (list(base.columns) == list(df.columns)
+                    and (_dtype_names(base) == _dtype_names(df)).all()
+                    and base.astype(str).equals(df.astype(str)))
+            print(f"  {name:11s} 與 CSV 讀回內容 / 型別相同：{same}")
+
+        print("\n[2] load_master 交接（清整後資料）")
+        cleaned = base
+        for name, suffix, compression in FORMATS:
+            path = os.path.join(tmp, "merged_cleaned_" + name.replace(" ", "_") + suffix)
+            handler = IOHandler(output_path=path, compression=compression or "uncompressed")
+            _, write_s, _ = _timed(lambda: handler.save(cleaned))
+            df, read_s, arrow_mb = _timed(lambda: read_frame(path))
+            kept = int((_dtype_names(df) == _dtype_names(cleaned)).sum())
+            print(f"  {name:11s} 寫出 {write_s:6.2f}s  讀回 {read_s:6.2f}s  檔案 {os.path.getsize(path) / 1024 / 1024:7.1f} MB"
+                  f"  讀回 Arrow 配置 {arrow_mb:7.1f} MB  型別保留 {kept}/{len(cleaned.columns)} 欄")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+IOHandler 讀檔 benchmark：舊版（先以 utf-8 / 逗號整檔解析，失敗再以 big5 / tab 重新解析，C engine）
+與 read_csv_auto（檔頭偵測編碼與分隔符號，pyarrow engine 讀 memory-mapped 檔案只解析一次）的耗時，
+並確認兩者讀出的內容相同。
+
+big5 檔案另外量測「檔頭全是 ASCII、中文在後段」的情況：舊版要解析到出錯處才改用 big5 整檔重讀。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_io_handler --rows 500000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import pandas as pd
+
+from benchmarks.bench_moi_schema import make_moi_frame
+from etl_01_extract.io_handler import read_csv_auto
+
+
+def legacy_load(path):
+    try:
+        return pd.read_csv(path, encoding="utf-8", sep=","), "utf-8"
+    except UnicodeDecodeError:
+        return pd.read_csv(path, encoding="big5", sep="\t"), "big5 重讀"
+
+
+def _measure(func, path):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df, how = func(path)
+    return time.perf_counter() - start, df, how
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    df = make_moi_frame(args.rows)
+    # big5 無法編碼的字元（合成資料皆為常用字，保險起見仍替換）
+    big5_df = df.map(lambda v: v.encode("big5", "replace").decode("big5") if isinstance(v, str) else v)
+    # 英文欄名 + 前 80% 列只有 ASCII：big5 內容直到檔案後段才出現
+    late = big5_df.copy()
+    late.columns = [f"col_{i}" for i in range(len(df.columns))]
+    ascii_rows = int(len(late) * 0.8)
+    for c in late.columns:
+        if late[c].dtype == object or pd.api.types.is_string_dtype(late[c]):
+            late.loc[:ascii_rows, c] = "x"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            "utf-8-sig, 逗號": (os.path.join(tmp, "utf8.csv"), df, dict(encoding="utf-8-sig", sep=",")),
+            "big5, tab": (os.path.join(tmp, "big5.csv"), big5_df, dict(encoding="big5", sep="\t")),
+            "big5, tab（中文在後段）": (os.path.join(tmp, "late.csv"), late, dict(encoding="big5", sep="\t")),
+        }
+        print(f"{args.rows:,} 筆 × {len(df.columns)} 欄")
+        for name, (path, frame, kwargs) in files.items():
+            frame.to_csv(path, index=False, **kwargs)
+            size = os.path.getsize(path) / 1024 / 1024
+            old_s, old_df, old_how = _measure(legacy_load, path)
+            new_s, new_df, info = _measure(read_csv_auto, path)
+            same = old_df.astype(str).equals(new_df.astype(str))
+            print(f"{name:22s} {size:7.1f} MB  舊版 {old_s:6.2f}s（{old_how}）  read_csv_auto {new_s:6.2f}s "
+                  f"（{info['encoding']}、{info['engine']}，偵測 {info['sniff_ms']} ms）  {old_s / new_s:5.2f}x  "
+                  f"內容相同：{same}")
+
+
+if __name__ == "__main__":
+    main()
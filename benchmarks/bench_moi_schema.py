@@ -0,0 +1,124 @@
+"""
+MOI schema 讀檔 benchmark：預設 read_csv（object / 預設型別）與 read_moi_csv（讀檔時套用 category、Arrow 字串、
+數值降階）的解析時間與 DataFrame 記憶體比較。
+
+未指定 --path 時產生合成的 lvr_land_a 格式 CSV；指定 --path 可直接量測實際的主資料 / 中繼檔 CSV。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_moi_schema --rows 1000000
+    python -m benchmarks.bench_moi_schema --path ../cleaning_house_rawdata/cleaning_main_data.csv
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from etl_01_extract.moi_schema import read_moi_csv
+
+ENGLISH_HEADER = [
+    "The villages and towns urban district", "transaction sign", "land sector position building sector house number plate",
+]
+
+
+def make_moi_frame(rows, seed=42, version="v2"):
+    rng = np.random.default_rng(seed)
+    districts = ["板橋區", "三重區", "中和區", "永和區", "新莊區", "新店區", "土城區", "蘆洲區", "汐止區", "樹林區"]
+    addresses = [f"新北市{d}中山路{i}段{j}巷{k}號" for d in districts[:4] for i in range(1, 4)
+                 for j in range(1, 40) for k in range(1, 30)]
+    roc_year = rng.integers(101, 114, rows)
+    df = pd.DataFrame({
+        "鄉鎮市區": rng.choice(districts, rows),
+        "交易標的": rng.choice(["房地(土地+建物)", "房地(土地+建物)+車位", "土地", "車位", "建物"], rows),
+        "土地位置建物門牌": rng.choice(addresses, rows),
+        "土地移轉總面積平方公尺": rng.uniform(5, 200, rows).round(2),
+        "都市土地使用分區": rng.choice(["住", "商", "工", "其他"], rows),
+        "非都市土地使用分區": rng.choice(["", "鄉村區"], rows, p=[.97, .03]),
+        "非都市土地使用編定": rng.choice(["", "甲種建築用地"], rows, p=[.97, .03]),
+        "交易年月日": roc_year * 10000 + rng.integers(1, 13, rows) * 100 + rng.integers(1, 29, rows),
+        "交易筆棟數": [f"土地{a}建物1車位{b}" for a, b in zip(rng.integers(1, 4, rows), rng.integers(0, 3, rows))],
+        "移轉層次": rng.choice(["一層", "三層", "五層", "十二層", "全", "地下一層，一層"], rows),
+        "總樓層數": rng.choice(["四層", "五層", "七層", "十二層", "十五層", "二十三層"], rows),
+        "建物型態": rng.choice(["住宅大樓(11層含以上有電梯)", "華廈(10層含以下有電梯)", "公寓(5樓含以下無電梯)",
+                              "透天厝", "套房(1房1廳1衛)", "店面(店鋪)"], rows),
+        "主要用途": rng.choice(["住家用", "集合住宅", "商業用", "國民住宅", ""], rows),
+        "主要建材": rng.choice(["鋼筋混凝土造", "鋼骨造", "加強磚造", ""], rows),
+        "建築完成年月": (roc_year - rng.integers(0, 40, rows)) * 10000 + rng.integers(1, 13, rows) * 100 + 1,
+        "建物移轉總面積平方公尺": rng.uniform(20, 300, rows).round(2),
+        "建物現況格局-房": rng.integers(0, 6, rows),
+        "建物現況格局-廳": rng.integers(0, 3, rows),
+        "建物現況格局-衛": rng.integers(0, 4, rows),
+        "建物現況格局-隔間": rng.choice(["有", "無"], rows),
+        "有無管理組織": rng.choice(["有", "無"], rows),
+        "總價元": rng.integers(3_000_000, 60_000_000, rows),
+        "單價元平方公尺": rng.integers(50_000, 400_000, rows),
+        "車位類別": rng.choice(["", "坡道平面", "坡道機械", "升降機械", "一樓平面"], rows),
+        "車位移轉總面積平方公尺": rng.choice([0.0, 10.5, 25.3, 33.1], rows),
+        "車位總價元": rng.choice([0, 1_500_000, 2_200_000], rows),
+        "備註": rng.choice(["", "親友、員工或其他特殊關係間之交易", "含增建或未登記建物", "急買急賣"], rows,
+                         p=[.85, .03, .1, .02]),
+        "編號": [f"RPQOMLRKKHIFFAA{i:08d}" for i in range(rows)],
+        "主建物面積": rng.uniform(15, 200, rows).round(2),
+        "附屬建物面積": rng.uniform(0, 20, rows).round(2),
+        "陽台面積": rng.uniform(0, 15, rows).round(2),
+        "電梯": rng.choice(["有", "無", ""], rows),
+        "移轉編號": rng.integers(1, 100000, rows),
+    })
+    if version == "v1":
+        df = df.rename(columns={"車位移轉總面積平方公尺": "車位移轉總面積(平方公尺)"}).drop(
+            columns=["主建物面積", "附屬建物面積", "陽台面積", "電梯", "移轉編號"])
+    return df
+
+
+def write_moi_csv(path, rows, seed=42, version="v2", english_header=True):
+    """寫出與原始檔相同格式的 CSV（utf-8-sig，第二列為英文欄名）"""
+    df = make_moi_frame(rows, seed=seed, version=version)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(",".join(df.columns) + "\n")
+        if english_header:
+            eng = ENGLISH_HEADER + [f"col {i}" for i in range(len(ENGLISH_HEADER), len(df.columns))]
+            f.write(",".join(eng) + "\n")
+        df.to_csv(f, header=False, index=False)
+    return path
+
+
+def _measure(func):
+    start = time.perf_counter()
+    df = func()
+    return df, time.perf_counter() - start, df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--path", help="量測既有 CSV（不產生合成資料）")
+    parser.add_argument("--raw", action="store_true", help="合成資料含第二列英文欄名（原始檔格式，預設為中繼檔格式）")
+    args = parser.parse_args()
+
+    tmpdir = None
+    path = args.path
+    if path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = write_moi_csv(os.path.join(tmpdir.name, "F_lvr_land_a.csv"), args.rows, english_header=args.raw)
+
+    default, t_default, m_default = _measure(lambda: pd.read_csv(path, encoding="utf-8-sig", low_memory=False))
+    del default
+    typed, t_typed, m_typed = _measure(lambda: read_moi_csv(path))
+    cols = ["鄉鎮市區", "土地位置建物門牌", "建物型態", "主要用途", "總價元", "建物移轉總面積平方公尺", "交易年月日"]
+    subset, t_subset, m_subset = _measure(lambda: read_moi_csv(path, usecols=cols))
+
+    print(f"file: {os.path.basename(path)}  rows: {len(typed):,}  size: {os.path.getsize(path) / 1024 / 1024:.1f} MB"
+          f"  pandas {pd.__version__}")
+    print(f"read_csv default      : {t_default:7.2f}s  {m_default:9.1f} MB")
+    print(f"read_moi_csv          : {t_typed:7.2f}s  {m_typed:9.1f} MB  "
+          f"(time x{t_default / t_typed:.2f}, memory -{100 * (1 - m_typed / m_default):.0f}%)")
+    print(f"read_moi_csv (usecols): {t_subset:7.2f}s  {m_subset:9.1f} MB  ({len(cols)} columns)")
+    print(typed.dtypes.astype(str).value_counts().to_string())
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+捷運距離 benchmark：舊版（每次建立都重讀 CSV，calculate_distance_to_mrt 與 process_mrt_name_and_grade
+各建一棵 BallTree、各查一次）與共用索引單次查詢的耗時比較，並確認距離 / 便利等級 / 最近出入口相同，
+最近車站與暴力法（所有出入口 haversine 距離取最小）一致。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_mrt_distance --rows 1000000 --k 3
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from etl_02_transform.MRT_distance import (
+    EARTH_RADIUS_KM,
+    GRADE_BINS,
+    GRADE_LABELS,
+    MrtDistance,
+    _INDEX_CACHE,
+    read_mrt_locations,
+    station_names,
+)
+
+MRT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mrt_location.csv")
+
+
+def legacy_mrt(df, mrt_path):
+    """舊版流程：重讀 CSV、兩棵 BallTree、兩次查詢（最近捷運站 為出入口名稱）"""
+    try:
+        mrt_df = pd.read_csv(mrt_path, encoding="big5")
+    except UnicodeDecodeError:
+        mrt_df = pd.read_csv(mrt_path, encoding="utf-8")
+    df = df.dropna(subset=["緯度", "經度"]).copy()
+    mrt_df = mrt_df.dropna(subset=["緯度", "經度"])
+
+    house = np.deg2rad(df[["緯度", "經度"]].to_numpy())
+    distances, _ = BallTree(np.deg2rad(mrt_df[["緯度", "經度"]].to_numpy()), metric="haversine").query(house, k=1)
+    df["捷運距離(km)"] = (distances[:, 0] * EARTH_RADIUS_KM).round(2)
+
+    _, indices = BallTree(np.deg2rad(mrt_df[["緯度", "經度"]].to_numpy()), metric="haversine").query(house, k=1)
+    df["最近捷運站"] = mrt_df.iloc[indices[:, 0]]["出入口名稱"].values
+    grade = pd.cut(df["捷運距離(km)"], bins=GRADE_BINS, labels=GRADE_LABELS, include_lowest=True)
+    df["捷運便利等級"] = grade.astype(float).fillna(0).astype(int)
+    df.loc[df["捷運便利等級"] == 0, "最近捷運站"] = "尚無捷運區"
+    return df
+
+
+def brute_force_stations(lat, lng, mrt_df, k):
+    """所有出入口的 haversine 距離，依站取最小後排序（只用於少量樣本驗證）"""
+    lat1, lng1 = np.deg2rad(lat)[:, None], np.deg2rad(lng)[:, None]
+    lat2, lng2 = np.deg2rad(mrt_df["緯度"].to_numpy())[None, :], np.deg2rad(mrt_df["經度"].to_numpy())[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    km = pd.DataFrame(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)), columns=station_names(mrt_df["出入口名稱"]))
+    per_station = km.T.groupby(level=0).min().T
+    order = np.argsort(per_station.to_numpy(), axis=1, kind="stable")[:, :k]
+    return per_station.columns.to_numpy()[order]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--k", type=int, default=3, help="最近的 k 個不同車站")
+    parser.add_argument("--check-rows", type=int, default=2000, help="暴力法驗證的樣本數")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "緯度": rng.uniform(24.90, 25.20, args.rows),
+        "經度": rng.uniform(121.40, 121.65, args.rows),
+    })
+    df.loc[rng.choice(args.rows, args.rows // 100, replace=False), "緯度"] = np.nan
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        old = legacy_mrt(df, MRT_PATH)
+        t_old = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = os.path.join(tmp, "mrt_index.pkl")
+            _INDEX_CACHE.clear()
+            start = time.perf_counter()
+            MrtDistance(df.iloc[:0].copy(), mrt_path=MRT_PATH, index_path=index_path)
+            t_build = time.perf_counter() - start
+
+            _INDEX_CACHE.clear()
+            start = time.perf_counter()
+            mrt = MrtDistance(df.copy(), mrt_path=MRT_PATH, index_path=index_path)
+            t_load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            mrt.calculate_distance_to_mrt().process_mrt_name_and_grade()
+            t_query = time.perf_counter() - start
+
+            mrt_k = MrtDistance(df.copy(), mrt_path=MRT_PATH, k_stations=args.k)
+            start = time.perf_counter()
+            mrt_k.calculate_distance_to_mrt()
+            t_query_k = time.perf_counter() - start
+    new = mrt.df
+
+    t_new = t_load + t_query
+    print(f"rows: {args.rows:,}")
+    print(f"legacy (re-read + 2 trees + 2 queries): {t_old:7.3f}s")
+    print(f"shared index (load + 1 query)         : {t_new:7.3f}s  (x{t_old / t_new:.2f})"
+          f"  build {t_build * 1000:.1f} ms, load {t_load * 1000:.1f} ms")
+    print(f"{f'single query, k={args.k} stations':<38}: {t_query_k:7.3f}s")
+
+    same = (old.index.equals(new.index)
+            and (old["捷運距離(km)"] == new["捷運距離(km)"]).all()
+            and (old["捷運便利等級"] == new["捷運便利等級"]).all()
+            and (old["最近捷運站"] == new["最近捷運站"]).all())
+    print(f"differential vs legacy: distance/grade/最近捷運站 same={same}")
+
+    sample = mrt_k.df.iloc[:args.check_rows]
+    expected = brute_force_stations(sample["緯度"].to_numpy(), sample["經度"].to_numpy(),
+                                    read_mrt_locations(MRT_PATH), args.k)
+    got = sample[[f"第{i + 1}近捷運站" for i in range(args.k)]].to_numpy()
+    print(f"k nearest stations vs brute force ({len(sample):,} rows): "
+          f"match={(got == expected).mean() * 100:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+離線地址比對 benchmark：合成路段（門牌沿路段線性分布）上的已知座標，新交易的地址加上不同樓層、
+全形數字、中文數字、之N 等寫法。比較舊版精確地址比對（normalize_address 後完全相同）與 OfflineGeocoder
+的命中率、誤差與耗時。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_offline_geocoder --known 200000 --queries 100000
+"""
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+import pandas as pd
+
+from etl_02_transform.address_geocoder import OfflineGeocoder
+from etl_02_transform.geocode_cache import normalize_address
+
+FLOORS = ["一樓", "三樓", "五樓", "十二樓", "3樓", "地下一層", ""]
+CN = "零一二三四五六七八九"
+
+
+def _cn(n):
+    """1..99 → 中文數字"""
+    tens, ones = divmod(n, 10)
+    return (("" if tens == 1 else CN[tens]) + "十" if tens else "") + (CN[ones] if ones or not tens else "")
+
+
+def make_roads(n_roads, seed):
+    rng = np.random.default_rng(seed)
+    districts = ["大安區", "中山區", "板橋區", "三重區", "中壢區"]
+    # 路名不含數字：由常用字兩兩組合
+    chars = "忠孝仁愛信義和平民生權族光復建國興安康福德華"
+    names = [a + b for a in chars for b in chars if a != b]
+    return pd.DataFrame({
+        "road": [f"{districts[i % len(districts)]}{names[i % len(names)]}{'路' if i < len(names) else '街'}{i % 5 + 1}段"
+                 for i in range(n_roads)],
+        "lat0": rng.uniform(24.9, 25.2, n_roads),
+        "lng0": rng.uniform(121.3, 121.6, n_roads),
+        "dlat": rng.normal(0, 1e-5, n_roads),
+        "dlng": rng.normal(0, 1e-5, n_roads),
+    })
+
+
+def make_addresses(roads, n, rng, variants=False):
+    road = rng.integers(0, len(roads), n)
+    number = rng.integers(1, 200, n)
+    sub = np.where(rng.random(n) < 0.05, rng.integers(1, 4, n), 0)
+    floor = rng.choice(FLOORS, n)
+    r = roads.iloc[road]
+    text = [f"{rd}{num}{'之' + str(s) if s else ''}號{fl}" for rd, num, s, fl in zip(r["road"], number, sub, floor)]
+    if variants:
+        # 全形數字 / 中文數字 / 台→臺 混用
+        style = rng.integers(0, 3, n)
+        text = [t.translate(str.maketrans("0123456789", "０１２３４５６７８９")) if st == 1
+                else t.replace(f"{num}號", f"{_cn(num)}號") if st == 2 and num < 100 else t
+                for t, st, num in zip(text, style, number)]
+    # 座標：沿路段線性 + 同棟約 3 公尺內的誤差
+    pos = number + sub / 1000
+    lat = r["lat0"].to_numpy() + pos * r["dlat"].to_numpy() + rng.normal(0, 2e-5, n)
+    lng = r["lng0"].to_numpy() + pos * r["dlng"].to_numpy() + rng.normal(0, 2e-5, n)
+    return pd.DataFrame({"address": ["臺北市" + t for t in text], "lat": lat, "lng": lng})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--known", type=int, default=200_000, help="主資料已知座標筆數")
+    parser.add_argument("--queries", type=int, default=100_000, help="新交易筆數")
+    parser.add_argument("--roads", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    roads = make_roads(args.roads, 7)
+    known = make_addresses(roads, args.known, rng)
+    queries = make_addresses(roads, args.queries, rng, variants=True)
+
+    start = time.perf_counter()
+    exact = dict(zip(known["address"].map(normalize_address), known["lat"]))
+    exact_hit = queries["address"].map(normalize_address).map(exact).notna()
+    t_exact = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        geocoder = OfflineGeocoder(known["address"], known["lat"], known["lng"])
+    t_build = time.perf_counter() - start
+    start = time.perf_counter()
+    result = geocoder.geocode(queries["address"])
+    t_query = time.perf_counter() - start
+
+    error_m = np.hypot((result["lat"] - queries["lat"]) * 111_000, (result["lng"] - queries["lng"]) * 101_000)
+    print(f"known: {args.known:,}  queries: {args.queries:,}  buildings: {len(geocoder):,}")
+    print(f"exact address match : hit {exact_hit.mean() * 100:6.2f}%  {t_exact:6.2f}s")
+    print(f"OfflineGeocoder     : hit {result['lat'].notna().mean() * 100:6.2f}%  "
+          f"build {t_build:6.2f}s  query {t_query:6.2f}s  ({args.queries / t_query:,.0f} addresses/sec)")
+    for method, group in error_m.groupby(result["method"]):
+        print(f"  {method:<13} {len(group) / len(result) * 100:6.2f}%  median error {group.median():6.1f} m  "
+              f"p95 {group.quantile(0.95):6.1f} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+整條 pipeline 的 per-stage benchmark（合成資料，見 benchmarks/synthetic_lvr_land.py）：
+RawMerger → IOHandler → FilterBasic ~ ElevatorProcessing → LatLngUpdate → MrtDistance → PoiFeatures → MainDataLoader
+
+- 每個 stage 以 MetricsRecorder 記錄 wall / CPU time、筆數進出；記憶體為 stage 執行期間的峰值 RSS
+  （每個 stage 開始前清除 VmHWM，含 Arrow / numpy 配置）與相對 stage 開始時的增量。
+  --trace-python 另外記錄 tracemalloc 峰值（Python 配置，耗時會明顯變長）；各 stage 類別的方法層級紀錄可寫入 --history
+- 經緯度：快取預先放入「前一批」（同門牌池、不同 seed）的座標，快取 / 離線比對找不到的地址交給
+  以門牌池真實座標回答的假 geocoder（不連網）
+- differential：在抽樣資料上比對最佳化路徑與原本寫法（舊版 FilterBasic / FloorProcessing / 捷運距離、
+  縣市分區多程序 vs 單一程序）；--reference 資料夾記錄各 stage 輸出的欄位雜湊，之後的最佳化與目前輸出比對
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_pipeline_stages --sizes 10k,100k
+    python -m benchmarks.bench_pipeline_stages --sizes 1M --reference benchmarks/reference
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_city_partition import run_chain
+from benchmarks.bench_copy_mode import _current_rss_mb, _peak_rss_mb, _reset_peak_rss
+from benchmarks.bench_filter_basic import legacy_filter_basic
+from benchmarks.bench_floor_processing import legacy_floor_processing
+from benchmarks.bench_mrt_distance import legacy_mrt
+from benchmarks.synthetic_lvr_land import (
+    CITIES, address_pool, default_pool_size, make_lvr_frame, make_poi_points, parse_size, write_lvr_release,
+)
+from etl_01_extract.io_handler import IOHandler, feather_num_rows
+from etl_01_extract.raw_merger import RawMerger
+from etl_02_transform.MRT_distance import MrtDistance
+from etl_02_transform.address_geocoder import canonicalize_address
+from etl_02_transform.city_partition import STEPS, run_step
+from etl_02_transform.floor_processing import FloorProcessing
+from etl_02_transform.filter_basic import FilterBasic
+from etl_02_transform.geocode_cache import GeocodeCache
+from etl_02_transform.geocoder import Geocoder
+from etl_02_transform.lat_lng_processing import LatLngUpdate
+from etl_02_transform.mode_tables import ModeTableStore
+from etl_02_transform.parking_price_model import ParkingPriceModelStore
+from etl_02_transform.poi_features import PoiFeatures, PoiLayer
+from etl_03_load.master_store import MasterStore
+from etl_03_load.save_handler import MainDataLoader
+from run_metrics import MetricsRecorder
+
+MRT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mrt_location.csv")
+# 地址最後的樓層（五樓、十二樓），假 geocoder 以棟為單位回答
+_FLOOR_SUFFIX = re.compile(r"[〇一二三四五六七八九十]+樓$")
+
+
+class SyntheticGeocoder(Geocoder):
+    """以門牌池的真實座標回答（同棟不同樓層同一座標），查無（例如 PUA 造字地址）回傳 (None, None)"""
+
+    source = "synthetic"
+
+    def __init__(self, table: dict):
+        self.table = table
+
+    def geocode(self, address: str):
+        return self.table.get(_FLOOR_SUFFIX.sub("", canonicalize_address(address)), (None, None))
+
+
+def geocode_table(pool_size: int) -> dict:
+    pools = pd.concat([address_pool(code, pool_size) for code in CITIES], ignore_index=True)
+    keys = pools["address"].map(canonicalize_address)
+    return dict(zip(keys, zip(pools["緯度"], pools["經度"])))
+
+
+def fingerprint(df: pd.DataFrame) -> dict:
+    """欄位層級的內容雜湊（值相同、型別相同才一致），筆數與索引另外記錄"""
+    return {
+        "rows": len(df),
+        "index": int(pd.util.hash_pandas_object(df.index.to_series(), index=False).sum()),
+        "columns": {c: [str(df[c].dtype), int(pd.util.hash_pandas_object(df[c], index=False).sum())]
+                    for c in df.columns},
+    }
+
+
+def compare_fingerprint(ref: dict, cur: dict) -> str:
+    if ref["rows"] != cur["rows"] or ref["index"] != cur["index"]:
+        return f"筆數 / 列不同（{ref['rows']:,} → {cur['rows']:,}）"
+    diff = [c for c in set(ref["columns"]) | set(cur["columns"]) if ref["columns"].get(c) != cur["columns"].get(c)]
+    return "相同" if not diff else f"{len(diff)} 欄不同：{', '.join(sorted(diff)[:6])}"
+
+
+class StageRunner:
+    """依 main.py 的順序執行各 stage，每個 stage 一筆 MetricsRecorder 紀錄，並保留抽樣輸入與輸出雜湊"""
+
+    def __init__(self, work: Path, recorder: MetricsRecorder, rows: int, seed: int, estimator: str,
+                 diff_rows: int):
+        self.work = work
+        self.recorder = recorder
+        self.rows = rows
+        self.seed = seed
+        self.estimator = estimator
+        self.diff_rows = diff_rows
+        self.pool_size = default_pool_size(rows)
+        self.samples = {}
+        self.fingerprints = {}
+
+    def stage(self, name, func, df=None):
+        if df is not None and self.diff_rows:
+            # 抽樣輸入先複製出來：保留原 df 的參照會讓 stage 內的修改觸發 copy-on-write
+            n = min(self.diff_rows, len(df))
+            self.samples[name] = df.sample(n, random_state=0).sort_index().copy() if n else df.copy()
+        gc.collect()
+        base = _current_rss_mb()
+        _reset_peak_rss()
+        with self.recorder.measure(name, rows_in=len(df) if df is not None else None) as extra:
+            with contextlib.redirect_stdout(io.StringIO()):
+                out = func(df)
+            extra["rows_out"] = out if isinstance(out, int) else len(out)
+            peak = _peak_rss_mb()
+            extra["peak_rss_mb"] = round(peak, 1)
+            extra["peak_delta_mb"] = round(peak - base, 1)
+        if isinstance(out, pd.DataFrame):
+            self.fingerprints[name] = fingerprint(out)
+        return out
+
+    def extract(self):
+        raw = self.work / "raw"
+        write_lvr_release(raw, self.rows, seed=self.seed, pool_size=self.pool_size)
+        merged = self.work / "merged_rawdata.arrow"
+
+        def merge(_):
+            merger = self.recorder.instrument(RawMerger(raw, merged, ledger_path=self.work / "ledger.sqlite"))
+            merger.merge()
+            merger.ledger.close()
+            return feather_num_rows(merged)
+
+        self.stage("RawMerger", merge)
+        return self.stage("IOHandler", lambda _: self.recorder.instrument(
+            IOHandler(input_path=merged, moi_schema=True)).load())
+
+    def transform(self, df):
+        mode_store = ModeTableStore()
+        price_store = ParkingPriceModelStore(self.work / "parking_price_model.pkl", estimator=self.estimator)
+        stats = {
+            "parking": lambda d: {"parking_type_modes": mode_store.modes("parking_type", d),
+                                  "parking_price_model": price_store.model_for(d)},
+            "material": lambda d: {"main_material_modes": mode_store.modes("main_material", d)},
+        }
+        for name in STEPS:
+            fit = stats.get(name)
+            df = self.stage(name, lambda d, name=name, fit=fit: run_step(
+                name, d, wrap=self.recorder.instrument, stats=fit(d) if fit else None), df)
+        return df
+
+    def geocode(self, df):
+        # 快取：前一批（同門牌池、不同 seed）的已知座標
+        previous = make_lvr_frame(min(self.rows, 500_000), seed=self.seed + 1, coordinates=True,
+                                  pool_size=self.pool_size)
+        cache = GeocodeCache(self.work / "geocode_cache.sqlite")
+        cache.put_many(previous[["土地位置建物門牌", "緯度", "經度"]].itertuples(index=False, name=None),
+                       source="master")
+        cache.close()
+        del previous
+        table = geocode_table(self.pool_size)
+
+        def lat_lng(d):
+            update = self.recorder.instrument(LatLngUpdate(
+                d, cache_path=self.work / "geocode_cache.sqlite", geocoder_factory=lambda: SyntheticGeocoder(table),
+                workers=4, max_per_minute=10 ** 9, test_mode=False, owned=True))
+            try:
+                update.visit()
+                update.update_lat_lng()
+            finally:
+                update.quit()
+            return update.df
+
+        df = self.stage("lat_lng", lat_lng, df)
+
+        def mrt(d):
+            distance = self.recorder.instrument(MrtDistance(d, mrt_path=MRT_PATH,
+                                                            index_path=self.work / "mrt_index.pkl"))
+            distance.calculate_distance_to_mrt()
+            distance.process_mrt_name_and_grade()
+            return distance.df
+
+        df = self.stage("mrt", mrt, df)
+
+        layers = [
+            PoiLayer("學校", make_poi_points(1_500, seed=1, name="學校"), name_col="名稱"),
+            PoiLayer("公園", make_poi_points(3_000, seed=2, name="公園"), name_col="名稱"),
+            PoiLayer("公車站", make_poi_points(20_000, seed=3, name="公車站"), k=3),
+        ]
+        return self.stage("poi", lambda d: self.recorder.instrument(PoiFeatures(d, layers)).add_features().df, df)
+
+    def load(self, df):
+        cleaned = self.work / "merged_cleaned.arrow"
+        store = self.work / "main_data_parquet"
+        # 主資料已有本批前半的編號：upsert 同時包含更新與新增
+        with contextlib.redirect_stdout(io.StringIO()):
+            MasterStore(store).write(df.iloc[: len(df) // 2])
+
+        def load_master(d):
+            IOHandler(output_path=cleaned).save(d)
+            self.recorder.instrument(MainDataLoader(main_data_path=store, new_data_path=cleaned)).load()
+            return MasterStore(store).read(columns=["編號"])
+
+        return self.stage("load_master", load_master, df)
+
+
+def master_store_upsert_check():
+    """同一 編號 多次 upsert 後 filters 只看最新版本；compaction 前後讀回一致"""
+    rows = {"標的縣市": ["臺北市", "新北市"], "交易年月日": ["1130105", "1130305"]}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MasterStore(Path(tmp) / "master")
+        store.write(pd.DataFrame({"編號": ["A", "B"], "總價元": [1, 60], **rows}))
+        store.upsert(pd.DataFrame({"編號": ["A"], "總價元": [100], "標的縣市": ["臺北市"], "交易年月日": ["1130105"]}))
+        store.upsert(pd.DataFrame({"編號": ["A"], "總價元": [5], "標的縣市": ["高雄市"], "交易年月日": ["1130805"]}))
+        filtered = sorted(store.read(filters=[("總價元", ">=", 50)])["編號"])
+        before = store.read().sort_values("編號", ignore_index=True)
+        after = store.compact().read().sort_values("編號", ignore_index=True)[list(before.columns)]
+    same = filtered == ["B"] and before.astype(str).equals(after.astype(str))
+    return "MasterStore 多次 upsert 後 filters / compaction", same, f"filters 結果 {filtered}"
+
+
+def differential(samples: dict, mrt_sample_rows: int = 50_000):
+    """抽樣資料上的 最佳化路徑 vs 原本寫法"""
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        if "filter_basic" in samples:
+            raw = samples["filter_basic"]
+            old, old_counts = legacy_filter_basic(raw)
+            plan = FilterBasic(raw).apply_filter_plan()
+            new_counts = plan.step_metrics["drop_counts"]
+            same = old.index.equals(plan.df.index) and old_counts == new_counts
+            results.append(("FilterBasic 規則合併 vs 逐條過濾", same, f"{len(old):,} 筆"))
+
+            one = run_chain(raw.copy(), 1, 200_000)
+            many = run_chain(raw.copy(), 2, max(1, len(raw) // 4))
+            same = one.index.equals(many.index) and one.astype(object).equals(many.astype(object))
+            results.append(("縣市分區 2 workers vs 單一程序", same, f"{len(one):,} 筆"))
+
+        if "floor" in samples:
+            frame = samples["floor"][["總樓層數", "移轉層次"]]
+            old = legacy_floor_processing(frame)
+            new = FloorProcessing(frame.copy()).total_floor().count_transfer_floors().extract_highest_floor().df
+            cols = ["總樓層數", "移轉樓層總數", "最高交易樓層"]
+            same = old.index.equals(new.index) and not (old[cols].fillna(-99) != new[cols].fillna(-99)).any().any()
+            results.append(("FloorProcessing 向量化 vs 逐列 apply", same, f"{len(old):,} 筆"))
+
+        if "mrt" in samples:
+            frame = samples["mrt"].head(mrt_sample_rows)
+            old = legacy_mrt(frame, MRT_PATH)
+            new = MrtDistance(frame.copy(), mrt_path=MRT_PATH).calculate_distance_to_mrt().process_mrt_name_and_grade().df
+            cols = ["捷運距離(km)", "捷運便利等級"]
+            same = (old.index.equals(new.index) and np.allclose(old[cols].to_numpy(float), new[cols].to_numpy(float))
+                    and (old["最近捷運站"] == new["最近捷運站"]).all())
+            results.append(("MrtDistance 共用索引 vs 兩棵 BallTree", same, f"{len(old):,} 筆"))
+
+        results.append(master_store_upsert_check())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10k,100k", help="逗號分隔：10k / 100k / 1M / 5M 或整數")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--estimator", default="rf", choices=["rf", "hgb"], help="車位總價模型")
+    parser.add_argument("--diff-rows", type=int, default=100_000, help="differential 抽樣筆數（0 = 不比對）")
+    parser.add_argument("--reference", help="各 stage 輸出雜湊的資料夾：不存在的規模寫入，已存在的比對")
+    parser.add_argument("--update-reference", action="store_true", help="以本次輸出覆寫 --reference")
+    parser.add_argument("--history", help="stage / 方法層級紀錄（JSON Lines）")
+    parser.add_argument("--trace-python", action="store_true", help="另外記錄 tracemalloc 峰值（耗時會明顯變長）")
+    args = parser.parse_args()
+
+    for size in args.sizes.split(","):
+        rows = parse_size(size)
+        recorder = MetricsRecorder(history_path=args.history, trace_memory=args.trace_python)
+        with tempfile.TemporaryDirectory() as tmp:
+            runner = StageRunner(Path(tmp), recorder, rows, args.seed, args.estimator, args.diff_rows)
+            start = time.perf_counter()
+            df = runner.extract()
+            df = runner.transform(df)
+            df = runner.geocode(df)
+            runner.load(df)
+            total = time.perf_counter() - start
+
+        print(f"\n=== {size}：{rows:,} 筆（合成資料，pandas {pd.__version__}，cpus {os.cpu_count()}）總計 {total:.1f}s")
+        print(f"{'stage':14s} {'wall_s':>8s} {'cpu_s':>8s} {'rows_in':>11s} {'rows_out':>11s} {'rows/sec':>12s}"
+              f" {'peak_rss_mb':>12s} {'peak_delta_mb':>14s}" + (f" {'py_peak_mb':>11s}" if args.trace_python else ""))
+        for r in recorder.records:
+            if r["step"] is not None:
+                continue
+            rows_in = f"{r['rows_in']:,}" if r["rows_in"] is not None else "-"
+            per_sec = (r["rows_in"] or r["rows_out"] or 0) / r["wall_s"] if r["wall_s"] else 0
+            print(f"{r['stage']:14s} {r['wall_s']:8.2f} {r['cpu_s']:8.2f} {rows_in:>11s} {r['rows_out']:11,}"
+                  f" {per_sec:12,.0f} {r['peak_rss_mb']:12.1f} {r['peak_delta_mb']:14.1f}"
+                  + (f" {r['py_peak_delta_mb']:11.1f}" if args.trace_python else ""))
+
+        for name, same, note in differential(runner.samples):
+            print(f"  differential {name}：{'相同' if same else '不同'}（{note}）")
+
+        if args.reference:
+            path = Path(args.reference) / f"{rows}.json"
+            if path.exists() and not args.update_reference:
+                ref = json.loads(path.read_text(encoding="utf-8"))
+                for stage, cur in runner.fingerprints.items():
+                    result = compare_fingerprint(ref[stage], cur) if stage in ref else "無參考輸出"
+                    print(f"  reference {stage:14s} {result}")
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(json.dumps(runner.fingerprints, ensure_ascii=False, indent=1), encoding="utf-8")
+                print(f"  已寫入參考輸出雜湊：{path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+POI 特徵 benchmark：逐筆 haversine 迴圈（notebook 寫法，每棟房屋對所有點位算距離）與 PoiFeatures
+（每個圖層一棵 BallTree、分批 query / query_radius）的耗時比較，並確認最近距離與半徑內數量相同。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_poi_features --rows 200000 --points 5000
+"""
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from etl_02_transform.MRT_distance import EARTH_RADIUS_KM
+from etl_02_transform.poi_features import DEFAULT_RADII_M, PoiFeatures, PoiLayer
+
+
+def haversine_km(lat, lng, lats, lngs):
+    lat, lng, lats, lngs = map(np.deg2rad, (lat, lng, lats, lngs))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def loop_features(df, points, radii_m):
+    """逐筆迴圈：最近距離 + 各半徑內數量"""
+    nearest, counts = [], {r: [] for r in radii_m}
+    lats, lngs = points["緯度"].to_numpy(), points["經度"].to_numpy()
+    for lat, lng in zip(df["緯度"], df["經度"]):
+        km = haversine_km(lat, lng, lats, lngs)
+        nearest.append(km.min())
+        for r in radii_m:
+            counts[r].append(int((km <= r / 1000).sum()))
+    return np.array(nearest), {r: np.array(c) for r, c in counts.items()}
+
+
+def make_points(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"名稱": [f"P{i}" for i in range(n)],
+                         "緯度": rng.uniform(24.90, 25.20, n), "經度": rng.uniform(121.40, 121.65, n)})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--points", type=int, default=5_000, help="每個圖層的點數")
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--loop-rows", type=int, default=2_000, help="逐筆迴圈量測 / 驗證的樣本數")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"緯度": rng.uniform(24.90, 25.20, args.rows), "經度": rng.uniform(121.40, 121.65, args.rows)})
+    point_frames = [make_points(args.points, seed) for seed in range(1, args.layers + 1)]
+    layers = [PoiLayer(f"POI{i}", pts, name_col="名稱", k=3) for i, pts in enumerate(point_frames)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        out = PoiFeatures(df.copy(), layers, chunk_size=args.chunk_size).add_features().df
+    t_engine = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+
+    sample = df.iloc[:args.loop_rows]
+    start = time.perf_counter()
+    loops = [loop_features(sample, pts, DEFAULT_RADII_M) for pts in point_frames]
+    t_loop = (time.perf_counter() - start) * len(df) / len(sample)
+
+    same = True
+    for layer, (nearest, counts) in zip(layers, loops):
+        head = out.iloc[:args.loop_rows]
+        same &= np.allclose(head[f"{layer.name}距離(km)"], nearest.round(3), atol=1e-3)
+        same &= all((head[f"{layer.name}數_{r}m"].to_numpy() == counts[r]).all() for r in DEFAULT_RADII_M)
+
+    n_features = sum(len(layer.feature_columns()) for layer in layers)
+    print(f"rows: {args.rows:,}  layers: {args.layers} x {args.points:,} points  features: {n_features}")
+    print(f"loop (extrapolated from {len(sample):,} rows): {t_loop:9.2f}s")
+    print(f"PoiFeatures                     : {t_engine:9.2f}s  (x{t_loop / t_engine:.0f})  "
+          f"peak traced {peak:.1f} MB, chunk {args.chunk_size:,}")
+    print(f"differential vs loop: nearest distance / radius counts same={same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+歷史季度回補 benchmark（本機檔案伺服器代替開放資料站，每個連線限速模擬遠端頻寬）：
+1. 同時下載數 1 與 N 的總耗時
+2. 第二次執行：全部以條件請求略過
+3. 新資料夾中途中斷一季：失敗季下次執行時由 .part 續傳
+4. 原始資料夾的 zip 交給 RawMerger（匯入帳本）合併的筆數
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_season_backfill --seasons 8 --rows 20000 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_http_download import make_release_zip
+from benchmarks.local_file_server import LocalFileServer
+from etl_01_extract.http_downloader import HttpDownloader
+from etl_01_extract.raw_merger import RawMerger
+from etl_01_extract.season_backfill import SeasonBackfill, enumerate_seasons
+
+
+def run_backfill(server, tmp: Path, name: str, seasons, workers: int, retries: int = 3):
+    url = server.url + "//DownloadSeason?season={season}&type=zip&fileName=lvr_landcsv.zip"
+    backfill = SeasonBackfill(tmp / name / "downloads", tmp / name / "raw", workers=workers, season_url=url,
+                              downloader_factory=lambda: HttpDownloader(progress=None, retries=retries, backoff=0.1))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        files = backfill.run(seasons)
+    return time.perf_counter() - start, files, backfill.step_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seasons", type=int, default=8, help="回補的季度數（由 101S1 起）")
+    parser.add_argument("--rows", type=int, default=20_000, help="每季每個 CSV 的筆數")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate-mb", type=float, default=20.0, help="每個連線的頻寬上限（MB/s）")
+    args = parser.parse_args()
+
+    seasons = enumerate_seasons("101S1")[:args.seasons]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        site = tmp / "site"
+        total = 0
+        for i, season in enumerate(seasons):
+            (site / season).mkdir(parents=True)
+            total += make_release_zip(site / season / "lvr_landcsv.zip", args.rows, seed=i).stat().st_size
+        print(f"{len(seasons)} 季（{seasons[0]} ~ {seasons[-1]}），共 {total / 1024 / 1024:.1f} MB，"
+              f"每個連線 {args.rate_mb} MB/s")
+
+        with LocalFileServer(site, delay=0.05, rate=args.rate_mb * 1024 * 1024) as server:
+            serial, _, _ = run_backfill(server, tmp, "serial", seasons, workers=1)
+            print(f"[1] 同時下載 1：{serial:.2f}s")
+            parallel, files, metrics = run_backfill(server, tmp, "parallel", seasons, workers=args.workers)
+            print(f"    同時下載 {args.workers}：{parallel:.2f}s（{serial / parallel:.2f}x），放進原始資料夾 {len(files)} 個 zip")
+
+            again, files, metrics = run_backfill(server, tmp, "parallel", seasons, workers=args.workers)
+            print(f"[2] 再次執行：{again:.2f}s，{metrics['statuses']}，放進原始資料夾 {len(files)} 個 zip")
+
+            server.bytes_sent = 0
+            server.fail_after_bytes = total // len(seasons) // 2
+            _, files, metrics = run_backfill(server, tmp, "resume", seasons, workers=args.workers, retries=0)
+            print(f"[3] 第一次執行失敗季：{metrics['failed']}，放進原始資料夾 {len(files)} 個 zip")
+            _, files, metrics = run_backfill(server, tmp, "resume", seasons, workers=args.workers, retries=0)
+            print(f"    續跑：{metrics['statuses']}，補齊 {len(files)} 個 zip；伺服器共送出 "
+                  f"{server.bytes_sent / 1024 / 1024:.1f} MB（資料 {total / 1024 / 1024:.1f} MB）")
+
+        raw = tmp / "parallel" / "raw"
+        merger = RawMerger(raw, tmp / "merged" / "merged_rawdata.csv", workers=2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            merger.merge()
+        rows = sum(r[0] or 0 for r in merger.ledger.conn.execute("SELECT row_count FROM ingest"))
+        expected = len(seasons) * 3 * args.rows
+        print(f"[4] RawMerger 合併 {len(merger.ledger)} 個檔案、{rows:,} 筆（預期 {expected:,}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+zip 直接匯入 benchmark：
+- 舊版：extractall 整個 zip 到 temp_extract → 搬出三個 CSV → RawMerger 讀 CSV
+- 新版：zip 整檔放進原始資料夾 → RawMerger 直接由 zip 串流讀取目標成員
+比較耗時、原始資料夾佔用空間、暫存寫入量，並確認兩者的中繼檔內容相同。
+
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_zip_ingest --rows 200000 --seasons 2
+"""
+import argparse
+import contextlib
+import filecmp
+import io
+import shutil
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from benchmarks.bench_http_download import make_release_zip
+from etl_01_extract.download_house_data import TARGET_CSV, archive_zip
+from etl_01_extract.raw_merger import RawMerger
+
+
+def folder_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+
+
+def legacy_ingest(zips, work: Path):
+    """舊版 handle_zip：整包解壓、搬出目標 CSV、刪除暫存，再由 RawMerger 讀 CSV"""
+    raw = work / "raw"
+    raw.mkdir(parents=True)
+    extracted = 0
+    for tag, zip_path in zips:
+        temp_dir = work / "temp_extract"
+        temp_dir.mkdir()
+        with zipfile.ZipFile(zip_path) as zfile:
+            zfile.extractall(temp_dir)
+            extracted += sum(info.file_size for info in zfile.infolist())
+        for file in TARGET_CSV:
+            shutil.move(temp_dir / file, raw / f"{file[0]}_{tag}.csv")
+        shutil.rmtree(temp_dir)
+    merger = RawMerger(raw, work / "merged_rawdata.csv", workers=2)
+    merger.merge()
+    merger.ledger.close()
+    return raw, extracted
+
+
+def zip_ingest(zips, work: Path):
+    raw = work / "raw"
+    for tag, zip_path in zips:
+        archive_zip(zip_path, raw, tag)
+    merger = RawMerger(raw, work / "merged_rawdata.csv", workers=2)
+    merger.merge()
+    merger.ledger.close()
+    return raw, 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000, help="每個 CSV 的筆數")
+    parser.add_argument("--seasons", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "site").mkdir()
+        zips = [(f"{101 + i // 4}S{i % 4 + 1}", make_release_zip(tmp / "site" / f"season{i}.zip", args.rows, seed=i))
+                for i in range(args.seasons)]
+        zip_bytes = sum(p.stat().st_size for _, p in zips)
+        print(f"{args.seasons} 個 zip（每個 5 個 CSV × {args.rows:,} 筆），共 {zip_bytes / 1024 / 1024:.1f} MB")
+
+        results = {}
+        for name, func in (("legacy extractall", legacy_ingest), ("zip 直接讀取", zip_ingest)):
+            work = tmp / name.split()[0]
+            work.mkdir()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                raw, extracted = func(zips, work)
+            seconds = time.perf_counter() - start
+            results[name] = work / "merged_rawdata.csv"
+            print(f"{name:18s} {seconds:7.2f}s  原始資料夾 {folder_size(raw) / 1024 / 1024:7.1f} MB  "
+                  f"暫存解壓 {extracted / 1024 / 1024:7.1f} MB")
+
+        legacy, direct = results.values()
+        print(f"中繼檔內容相同：{filecmp.cmp(legacy, direct, shallow=False)}")
+
+
+if __name__ == "__main__":
+    main()
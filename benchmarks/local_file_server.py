@@ -0,0 +1,132 @@
+"""
+本機 HTTP 檔案伺服器（代替內政部開放資料站，供下載 benchmark 使用）：
+- 路徑對應 root 目錄下的檔案；query string 的 season=112S1 對應 112S1/ 子目錄
+- 回傳 ETag（內容 sha1）與 Last-Modified，支援 If-None-Match / If-Modified-Since（304）與 Range / If-Range（206）
+- 可注入失敗：fail_after_bytes 傳送到指定位元組後中斷連線、fail_status 前 N 次回傳 503、delay 每次回應延遲
+- rate：每個連線的傳輸速率上限（bytes/s），模擬遠端頻寬
+"""
+import email.utils
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "LocalOpenData/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self) -> Path:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        root = self.server.root
+        if "season" in query:
+            root = root / query["season"][0]
+        name = query.get("fileName", [Path(url.path).name])[0]
+        return root / name
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail_status = server.fail_status > 0
+            if fail_status:
+                server.fail_status -= 1
+            fail_after = server.fail_after_bytes
+            server.fail_after_bytes = None
+        if server.delay:
+            time.sleep(server.delay)
+        if fail_status:
+            self.send_error(503)
+            return
+
+        path = self._resolve()
+        if not path.is_file():
+            self.send_error(404)
+            return
+        data, etag, mtime = server.file_info(path)
+        last_modified = email.utils.formatdate(mtime, usegmt=True)
+
+        if self.headers.get("If-None-Match") == etag or (
+                "If-None-Match" not in self.headers and self.headers.get("If-Modified-Since") == last_modified):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and range_header.startswith("bytes=") and if_range in (None, etag, last_modified):
+            start = int(range_header[6:].split("-")[0])
+        body = data[start:]
+
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Accept-Ranges", "bytes")
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.end_headers()
+
+        with server.lock:
+            server.bytes_sent += len(body) if fail_after is None else min(fail_after, len(body))
+        if fail_after is not None:
+            self.wfile.write(body[:fail_after])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        if not server.rate:
+            self.wfile.write(body)
+            return
+        block = 64 * 1024
+        for i in range(0, len(body), block):
+            self.wfile.write(body[i:i + block])
+            time.sleep(block / server.rate)
+
+
+class LocalFileServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root, port: int = 0, delay: float = 0.0, rate: float = 0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.root = Path(root)
+        self.delay = delay
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.fail_status = 0
+        self.fail_after_bytes = None
+        self._cache = {}
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def file_info(self, path: Path):
+        stat = path.stat()
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            if key not in self._cache:
+                data = path.read_bytes()
+                self._cache[key] = (data, f'"{hashlib.sha1(data).hexdigest()}"', int(stat.st_mtime))
+            return self._cache[key]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,410 @@
+"""
+合成實價登錄（不動產買賣 lvr_land_a）資料產生器：不需下載內政部開放資料即可量測整條 transform 鏈。
+
+資料特性盡量貼近原始檔：
+- 民國日期：交易年月日 7 碼、建築完成年月 民國 100 年前為 0 開頭 7 碼；少量缺值、不存在的日期（2/30）、預售屋
+- 移轉層次 / 總樓層數：中文數字（一層 ~ 三十五層）、地下層、多層（二層，三層）、全、屋頂突出物、見其他登記事項
+- 交易筆棟數：土地N建物N車位N，車位數與 交易標的 / 車位類別 / 車位總價元 一致（部分車位總價缺值待補）
+- 地址：臺北市 / 新北市 / 桃園市 路段巷號樓，台/臺 混用、全形數字、少量私用區（PUA）造字
+- 座標：依 路段 + 門牌 排列在各縣市範圍內（同一路段門牌連續，可做內插），coordinates=True 時輸出 緯度 / 經度
+- 編號：約 1% 重複；備註含 親友 / 特殊關係 等關鍵字
+
+地址池只由縣市與池大小決定（與 seed 無關），不同 seed 的批次共用相同門牌，可模擬主資料 / 快取命中。
+
+執行方式（專案根目錄，寫出原始檔格式 CSV）：
+    python -m benchmarks.synthetic_lvr_land --rows 1M --out ./synthetic_raw
+"""
+import argparse
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_moi_schema import ENGLISH_HEADER
+
+# benchmark 規模
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "5M": 5_000_000}
+
+# 縣市代碼 → 縣市名稱、行政區、座標範圍（緯度下限, 緯度上限, 經度下限, 經度上限）、單價基準（元/平方公尺）、批次比例
+CITIES = {
+    "A": {
+        "name": "臺北市",
+        "districts": ["中正區", "大同區", "中山區", "松山區", "大安區", "萬華區", "信義區", "士林區", "北投區",
+                      "內湖區", "南港區", "文山區"],
+        "bbox": (24.98, 25.15, 121.48, 121.62),
+        "unit_price": 300_000,
+        "share": 0.3,
+    },
+    "F": {
+        "name": "新北市",
+        "districts": ["板橋區", "三重區", "中和區", "永和區", "新莊區", "新店區", "土城區", "蘆洲區", "汐止區",
+                      "樹林區", "淡水區", "三峽區"],
+        "bbox": (24.93, 25.18, 121.40, 121.68),
+        "unit_price": 180_000,
+        "share": 0.45,
+    },
+    "H": {
+        "name": "桃園市",
+        "districts": ["桃園區", "中壢區", "平鎮區", "八德區", "楊梅區", "蘆竹區", "龜山區", "龍潭區", "大園區",
+                      "觀音區"],
+        "bbox": (24.86, 25.08, 121.10, 121.38),
+        "unit_price": 110_000,
+        "share": 0.25,
+    },
+}
+CITY_SEEDS = {"A": 101, "F": 102, "H": 103}
+
+ROADS = ["中山路", "中正路", "民生路", "民權路", "復興路", "建國路", "文化路", "光復路", "和平路", "忠孝路",
+         "仁愛路", "信義路", "成功路", "自強街", "福德街", "大同路", "新生街", "三民路", "永安街", "臺興路"]
+PUA_CHARS = ["\ue8d1", "\ue000", "\uf2a3"]
+FULLWIDTH = str.maketrans("0123456789", "０１２３４５６７８９")
+
+# 建物型態 → (比例, 總樓層數範圍)
+BUILDING_TYPES = {
+    "住宅大樓(11層含以上有電梯)": (0.36, 11, 35),
+    "華廈(10層含以下有電梯)": (0.18, 6, 10),
+    "公寓(5樓含以下無電梯)": (0.16, 4, 5),
+    "透天厝": (0.12, 1, 5),
+    "套房(1房1廳1衛)": (0.06, 5, 25),
+    "店面(店鋪)": (0.05, 1, 15),
+    "辦公商業大樓": (0.03, 8, 30),
+    "工廠": (0.02, 1, 4),
+    "其他": (0.02, 1, 10),
+}
+PARKING_TYPES = ["坡道平面", "坡道機械", "升降機械", "升降平面", "一樓平面", "塔式車位", "其他"]
+REMARKS = ["親友、員工、共有人或其他特殊關係間之交易。", "含增建或未登記建物。", "急買急賣。",
+           "朋友間之交易。", "瑕疵物件。", "建商與地主合建案。", "陽台外推。"]
+
+_CN_DIGITS = "〇一二三四五六七八九"
+
+
+def cn_numeral(n: int) -> str:
+    """1 → 一、10 → 十、12 → 十二、20 → 二十、35 → 三十五"""
+    tens, ones = divmod(int(n), 10)
+    if tens == 0:
+        return _CN_DIGITS[ones]
+    return ("" if tens == 1 else _CN_DIGITS[tens]) + "十" + (_CN_DIGITS[ones] if ones else "")
+
+
+# index = 樓層數（0 不使用）
+CN_FLOORS = np.array([""] + [cn_numeral(n) + "層" for n in range(1, 100)], dtype=object)
+CN_NUMS = np.array([""] + [cn_numeral(n) for n in range(1, 100)], dtype=object)
+
+
+def default_pool_size(rows: int) -> int:
+    """門牌池大小：約每棟 2 筆交易，上限 20 萬棟"""
+    return int(np.clip(rows // 2, 2_000, 200_000))
+
+
+def _pick(rng, values, size, p=None):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size, p=p)]
+
+
+def _roc(year, month, day):
+    """民國 年/月/日 → 7 碼字串（民國 100 年前補 0）"""
+    return pd.Series(year * 10000 + month * 100 + day).astype(str).str.zfill(7).to_numpy(dtype=object)
+
+
+def address_pool(city: str, size: int) -> pd.DataFrame:
+    """
+    縣市的門牌池（只由 city 與 size 決定）：address / 緯度 / 經度 / district。
+    同一路段的門牌沿固定方向排列（約每號 5 公尺），巷內門牌再往垂直方向延伸。
+    """
+    spec = CITIES[city]
+    rng = np.random.default_rng(CITY_SEEDS[city] * 1_000_003 + size)
+    lat0, lat1, lng0, lng1 = spec["bbox"]
+
+    district = rng.integers(0, len(spec["districts"]), size)
+    road = rng.integers(0, len(ROADS), size)
+    section = rng.choice(5, size, p=[.5, .2, .15, .1, .05])
+    lane = np.where(rng.random(size) < .4, rng.integers(1, 300, size), 0)
+    number = rng.integers(1, 400, size)
+    sub = np.where(rng.random(size) < .05, rng.integers(1, 6, size), 0)
+
+    # 路段起點與方向：以 (行政區, 路, 段) 決定，與門牌池大小無關
+    segment = (district * len(ROADS) + road) * 5 + section
+    seg_rng = np.random.default_rng(CITY_SEEDS[city])
+    n_segments = len(spec["districts"]) * len(ROADS) * 5
+    anchor_lat = seg_rng.uniform(lat0 + .01, lat1 - .01, n_segments)
+    anchor_lng = seg_rng.uniform(lng0 + .01, lng1 - .01, n_segments)
+    angle = seg_rng.uniform(0, np.pi, n_segments)
+    step = 0.00005
+    lat = anchor_lat[segment] + np.sin(angle[segment]) * number * step - np.cos(angle[segment]) * lane * step * 0.5
+    lng = anchor_lng[segment] + np.cos(angle[segment]) * number * step + np.sin(angle[segment]) * lane * step * 0.5
+
+    text = (
+        spec["name"] + np.asarray(spec["districts"], dtype=object)[district]
+        + np.asarray(ROADS, dtype=object)[road]
+        + np.where(section > 0, CN_NUMS[section] + "段", "")
+        + np.where(lane > 0, pd.Series(lane).astype(str).to_numpy(dtype=object) + "巷", "")
+        + pd.Series(number).astype(str).to_numpy(dtype=object) + "號"
+        + np.where(sub > 0, "之" + pd.Series(sub).astype(str).to_numpy(dtype=object), "")
+    )
+    return pd.DataFrame({
+        "address": text,
+        "緯度": lat.clip(lat0, lat1).round(6),
+        "經度": lng.clip(lng0, lng1).round(6),
+        "district": np.asarray(spec["districts"], dtype=object)[district],
+    })
+
+
+def _floors(rng, building_type, rows):
+    """建物型態 → 總樓層數、移轉層次、最高樓層（地址樓層用）"""
+    lo = np.zeros(rows, dtype=int)
+    hi = np.zeros(rows, dtype=int)
+    for name, (_, low, high) in BUILDING_TYPES.items():
+        mask = building_type == name
+        lo[mask], hi[mask] = low, high
+    total = lo + (rng.random(rows) * (hi - lo + 1)).astype(int)
+    floor = 1 + (rng.random(rows) * total).astype(int)
+    upper = np.minimum(floor + 1, 99)
+    basement = rng.integers(1, 4, rows)
+
+    u = rng.random(rows)
+    is_house = building_type == "透天厝"
+    transfer = np.select(
+        [
+            is_house & (u < .7),
+            u < .05,
+            u < .11,
+            u < .13,
+            u < .15,
+            u < .17,
+            u < .18,
+            u < .19,
+            u < .20,
+        ],
+        [
+            "全",
+            np.where(floor < total, CN_FLOORS[floor] + "，" + CN_FLOORS[upper], CN_FLOORS[floor]),
+            "地下" + CN_FLOORS[basement] + "，" + CN_FLOORS[floor],
+            "地下" + CN_FLOORS[basement],
+            CN_FLOORS[floor] + "，屋頂突出物",
+            CN_FLOORS[floor] + "，陽台",
+            "騎樓，一層",
+            "見其他登記事項",
+            "",
+        ],
+        default=CN_FLOORS[floor],
+    )
+    total_text = np.where(rng.random(rows) < .01, "", CN_FLOORS[np.minimum(total, 99)])
+    return total_text, transfer, floor
+
+
+def make_lvr_frame(rows: int, seed: int = 42, city=None, coordinates: bool = False, id_offset: int = 0,
+                   pool_size=None) -> pd.DataFrame:
+    """
+    產生 rows 筆合成交易（欄位與 lvr_land_a 新版格式相同，值皆為字串 / 數值，與讀原始檔前相同）。
+    city：A / F / H；None 時三縣市依比例混合並加上 來源檔名（RawMerger 合併後的中繼檔格式）。
+    coordinates=True 時加上門牌的真實 緯度 / 經度（原始檔沒有座標，由 LatLngUpdate 補上）。
+    id_offset：編號起始值，分段產生同一批資料時避免重複。
+    pool_size：門牌池大小（預設依 rows）；不同批次指定相同大小即共用門牌。
+    """
+    rng = np.random.default_rng(seed)
+    if city is None:
+        codes = list(CITIES)
+        city_code = _pick(rng, codes, rows, p=[CITIES[c]["share"] for c in codes])
+    else:
+        city_code = np.full(rows, city, dtype=object)
+
+    # 門牌：各縣市的門牌池（不同批次共用）
+    address = np.empty(rows, dtype=object)
+    district = np.empty(rows, dtype=object)
+    lat = np.empty(rows)
+    lng = np.empty(rows)
+    unit_base = np.empty(rows)
+    for code in CITIES:
+        mask = city_code == code
+        n = int(mask.sum())
+        if n == 0:
+            continue
+        pool = address_pool(code, pool_size or default_pool_size(rows))
+        pick = rng.integers(0, len(pool), n)
+        address[mask] = pool["address"].to_numpy(dtype=object)[pick]
+        district[mask] = pool["district"].to_numpy(dtype=object)[pick]
+        lat[mask] = pool["緯度"].to_numpy()[pick]
+        lng[mask] = pool["經度"].to_numpy()[pick]
+        unit_base[mask] = CITIES[code]["unit_price"]
+
+    type_names = list(BUILDING_TYPES)
+    building_type = _pick(rng, type_names, rows, p=[BUILDING_TYPES[t][0] for t in type_names])
+    total_floors, transfer_floors, floor = _floors(rng, building_type, rows)
+
+    # 地址樓層、台/臺 混用、全形數字、PUA 造字
+    with_floor = building_type != "透天厝"
+    address = np.where(with_floor, address + CN_NUMS[np.minimum(floor, 99)] + "樓", address)
+    addr = pd.Series(address, dtype=object)
+    variant = rng.random(rows)
+    taiwan = variant < .12
+    fullwidth = (variant >= .12) & (variant < .22)
+    addr[taiwan] = addr[taiwan].str.replace("臺", "台", regex=False)
+    addr[fullwidth] = addr[fullwidth].str.translate(FULLWIDTH)
+    pua = rng.random(rows) < .003
+    if pua.any():
+        # 路名第二個字換成造字（原始資料的罕用字以私用區字元呈現）
+        addr[pua] = (addr[pua].str.slice(0, 7) + _pick(rng, PUA_CHARS, int(pua.sum()))
+                     + addr[pua].str.slice(8))
+
+    # 交易筆棟數 與 交易標的 / 車位
+    parking = rng.choice(4, rows, p=[.65, .28, .06, .01])
+    land = rng.choice(4, rows, p=[.05, .8, .1, .05])
+    target = np.where(parking > 0, "房地(土地+建物)+車位", "房地(土地+建物)").astype(object)
+    t = rng.random(rows)
+    target[t < .03] = "土地"
+    target[(t >= .03) & (t < .05)] = "車位"
+    target[(t >= .05) & (t < .06)] = "建物"
+    building = np.where(target == "土地", 0, np.where(target == "車位", 0, 1))
+    land = np.where(target == "建物", 0, np.where(target == "車位", 0, land))
+    parking = np.where(target == "土地", 0, np.where((target == "車位") & (parking == 0), 1, parking))
+    count_text = ("土地" + land.astype(str).astype(object) + "建物" + building.astype(str).astype(object)
+                  + "車位" + parking.astype(str).astype(object))
+
+    has_parking = parking > 0
+    parking_type = np.where(has_parking, _pick(rng, PARKING_TYPES, rows), "").astype(object)
+    parking_type[has_parking & (rng.random(rows) < .08)] = ""  # 待補車位類別
+    parking_area = np.where(has_parking, parking * rng.uniform(18, 40, rows), 0).round(2)
+    parking_price = np.where(has_parking, parking * rng.integers(800_000, 3_200_000, rows), 0).astype(float)
+    parking_price[has_parking & (rng.random(rows) < .2)] = np.nan  # 車位價格併入總價：待模型補值
+
+    # 面積與價格
+    area = np.where(building_type == "套房(1房1廳1衛)", rng.uniform(15, 45, rows), rng.uniform(30, 300, rows)).round(2)
+    unit = (unit_base * rng.lognormal(0, .25, rows)).round()
+    total_price = (unit * area + np.nan_to_num(parking_price)).round(-3)
+
+    # 民國日期
+    trade_year = rng.integers(101, 115, rows)
+    trade_day = rng.integers(1, 29, rows)
+    trade_day[rng.random(rows) < .005] = 30
+    trade_month = rng.integers(1, 13, rows)
+    trade_date = _roc(trade_year, trade_month, trade_day)
+    age = rng.integers(0, 50, rows)
+    presale = rng.random(rows) < .03
+    build_year = np.where(presale, trade_year + rng.integers(0, 4, rows), trade_year - age)
+    build_date = _roc(np.maximum(build_year, 40), rng.integers(1, 13, rows), rng.integers(1, 29, rows))
+    build_date[rng.random(rows) < .02] = ""
+
+    # 編號：約 1% 與前面的交易重複
+    ids = np.arange(id_offset, id_offset + rows)
+    dup = rng.random(rows) < .01
+    ids[dup] = np.maximum(ids[dup] - rng.integers(1, 1000, int(dup.sum())), id_offset)
+    serial = pd.Series(ids).astype(str).str.zfill(12).to_numpy(dtype=object)
+
+    elevator = np.where(np.isin(building_type, ["住宅大樓(11層含以上有電梯)", "華廈(10層含以下有電梯)"]), "有",
+                        np.where(building_type == "公寓(5樓含以下無電梯)", "無", "")).astype(object)
+    elevator[rng.random(rows) < .1] = ""
+
+    df = pd.DataFrame({
+        "鄉鎮市區": district,
+        "交易標的": target,
+        "土地位置建物門牌": addr.to_numpy(dtype=object),
+        "土地移轉總面積平方公尺": (area * rng.uniform(.05, .4, rows)).round(2),
+        "都市土地使用分區": _pick(rng, ["住", "商", "工", "其他", ""], rows, p=[.7, .15, .05, .05, .05]),
+        "非都市土地使用分區": _pick(rng, ["", "鄉村區", "特定農業區", "一般農業區"], rows, p=[.96, .02, .01, .01]),
+        "非都市土地使用編定": _pick(rng, ["", "甲種建築用地", "乙種建築用地"], rows, p=[.96, .02, .02]),
+        "交易年月日": trade_date,
+        "交易筆棟數": count_text,
+        "移轉層次": transfer_floors,
+        "總樓層數": total_floors,
+        "建物型態": building_type,
+        "主要用途": _pick(rng, ["住家用", "集合住宅", "國民住宅", "商業用", "工業用", ""], rows,
+                          p=[.55, .2, .03, .12, .03, .07]),
+        "主要建材": _pick(rng, ["鋼筋混凝土造", "鋼骨造", "鋼骨鋼筋混凝土造", "加強磚造", ""], rows,
+                          p=[.7, .08, .1, .07, .05]),
+        "建築完成年月": build_date,
+        "建物移轉總面積平方公尺": area,
+        "建物現況格局-房": rng.integers(0, 6, rows),
+        "建物現況格局-廳": rng.integers(0, 3, rows),
+        "建物現況格局-衛": rng.integers(0, 4, rows),
+        "建物現況格局-隔間": _pick(rng, ["有", "無"], rows, p=[.9, .1]),
+        "有無管理組織": _pick(rng, ["有", "無"], rows, p=[.7, .3]),
+        "總價元": total_price.astype("int64"),
+        "單價元平方公尺": unit,
+        "車位類別": parking_type,
+        "車位移轉總面積平方公尺": parking_area,
+        "車位總價元": parking_price,
+        "備註": np.where(rng.random(rows) < .15, _pick(rng, REMARKS, rows), "").astype(object),
+        "編號": "RP" + city_code + "QOMLRKKH" + serial,
+        "主建物面積": (area * rng.uniform(.55, .8, rows)).round(2),
+        "附屬建物面積": (area * rng.uniform(0, .08, rows)).round(2),
+        "陽台面積": (area * rng.uniform(0, .06, rows)).round(2),
+        "電梯": elevator,
+        "移轉編號": rng.integers(1, 100_000, rows),
+    })
+    if city is None:
+        df["來源檔名"] = city_code + "_lvr_land_a.csv"
+    if coordinates:
+        df["緯度"] = lat
+        df["經度"] = lng
+    return df
+
+
+def write_lvr_csv(path, rows: int, seed: int = 42, city: str = "F", english_header: bool = True,
+                  chunk_rows: int = 500_000, id_offset: int = 0, pool_size=None):
+    """
+    寫出與原始檔相同格式的 CSV（utf-8-sig、第二列英文欄名），分段產生避免大量資料一次放進記憶體。
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        for i, start in enumerate(range(0, rows, chunk_rows)):
+            n = min(chunk_rows, rows - start)
+            df = make_lvr_frame(n, seed=seed * 1000 + i, city=city, id_offset=id_offset + start,
+                                pool_size=pool_size or default_pool_size(rows))
+            if i == 0:
+                f.write(",".join(df.columns) + "\n")
+                if english_header:
+                    eng = ENGLISH_HEADER + [f"col {j}" for j in range(len(ENGLISH_HEADER), len(df.columns))]
+                    f.write(",".join(eng) + "\n")
+            df.to_csv(f, header=False, index=False)
+    return path
+
+
+def write_lvr_release(folder, rows: int, seed: int = 42, tag: str = "113S1", chunk_rows: int = 500_000,
+                      pool_size=None):
+    """依縣市比例寫出一季的原始檔（{代碼}_{tag}.csv，RawMerger 的原始資料夾格式），回傳路徑"""
+    paths = []
+    for i, (code, spec) in enumerate(CITIES.items()):
+        n = int(round(rows * spec["share"]))
+        paths.append(write_lvr_csv(Path(folder) / f"{code}_{tag}.csv", n, seed=seed + i, city=code,
+                                   chunk_rows=chunk_rows, id_offset=i * 10 ** 10, pool_size=pool_size))
+    return paths
+
+
+def make_poi_points(n: int, seed: int = 0, name: str = "點位") -> pd.DataFrame:
+    """三縣市範圍內的 POI 點位（名稱 / 緯度 / 經度），依縣市比例分布"""
+    rng = np.random.default_rng(seed)
+    codes = list(CITIES)
+    city_code = rng.choice(len(codes), n, p=[CITIES[c]["share"] for c in codes])
+    bbox = np.array([CITIES[c]["bbox"] for c in codes])[city_code]
+    return pd.DataFrame({
+        "名稱": [f"{name}{i}" for i in range(n)],
+        "緯度": rng.uniform(bbox[:, 0], bbox[:, 1]).round(6),
+        "經度": rng.uniform(bbox[:, 2], bbox[:, 3]).round(6),
+    })
+
+
+def parse_size(text: str) -> int:
+    """10k / 100k / 1M / 5M 或整數"""
+    if text in SIZES:
+        return SIZES[text]
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="100k", help=f"筆數（{' / '.join(SIZES)} 或整數）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tag", default="113S1", help="檔名季度標記")
+    parser.add_argument("--out", default="synthetic_raw", help="輸出資料夾")
+    args = parser.parse_args()
+
+    rows = parse_size(args.rows)
+    paths = write_lvr_release(args.out, rows, seed=args.seed, tag=args.tag)
+    for path in paths:
+        print(f"已寫出 {path}（{os.path.getsize(path) / 1024 / 1024:.1f} MB）")
+
+
+if __name__ == "__main__":
+    main()
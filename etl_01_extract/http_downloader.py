@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import sys
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+import requests
+
+# 暫時性錯誤才重試（4xx 除 408 / 429 外直接失敗）
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+STATUS_DOWNLOADED = "downloaded"      # 新內容
+STATUS_NOT_MODIFIED = "not_modified"  # 伺服器回 304（ETag / Last-Modified 相同），未下載
+STATUS_UNCHANGED = "unchanged"        # 伺服器不支援條件請求，下載後內容雜湊與上次相同
+
+
+class DownloadError(Exception):
+    pass
+
+
+class DownloadResult:
+    def __init__(self, status: str, path: Path, size: int = 0, sha256: str = "", seconds: float = 0.0,
+                 resumed_bytes: int = 0):
+        self.status = status
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.seconds = seconds
+        self.resumed_bytes = resumed_bytes
+
+    @property
+    def changed(self) -> bool:
+        return self.status == STATUS_DOWNLOADED
+
+    def __repr__(self):
+        return (f"DownloadResult({self.status}, {self.path.name}, {self.size:,} bytes, "
+                f"{self.seconds:.2f}s, resumed {self.resumed_bytes:,})")
+
+
+def verify_zip(path) -> bool:
+    """zip 結構與各檔 CRC 檢查"""
+    try:
+        with zipfile.ZipFile(path) as zfile:
+            return zfile.testzip() is None
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+def print_progress(name: str, done: int, total: Optional[int]):
+    if total:
+        sys.stdout.write(f"\r  {name}: {done / 1024 / 1024:8.1f} / {total / 1024 / 1024:.1f} MB ({done / total:6.1%})")
+    else:
+        sys.stdout.write(f"\r  {name}: {done / 1024 / 1024:8.1f} MB")
+    sys.stdout.flush()
+
+
+class HttpDownloader:
+    """
+    以 HTTP 串流下載檔案：
+    - 條件請求：上次的 ETag / Last-Modified 存在 <檔名>.meta.json，未變更時伺服器回 304 直接略過；
+      伺服器不支援時下載後比對內容雜湊（status = unchanged）
+    - 先寫入 <檔名>.part，失敗時保留，重試以 Range 從中斷處續傳（If-Range 確認仍是同一版本）
+    - 完成後（zip 檔通過完整性檢查）才置換正式檔案
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, chunk_size: int = 1 << 20, retries: int = 3,
+                 backoff: float = 1.0, timeout: float = 60, progress: Optional[Callable] = print_progress):
+        self.session = session or requests.Session()
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.progress = progress
+
+    @staticmethod
+    def meta_path(dest: Path) -> Path:
+        return dest.with_name(dest.name + ".meta.json")
+
+    def load_meta(self, dest: Path) -> dict:
+        path = self.meta_path(dest)
+        if not path.exists() or not dest.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_meta(self, dest: Path, meta: dict):
+        tmp = self.meta_path(dest).with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.meta_path(dest))
+
+    def download(self, url: str, dest, verify: Optional[bool] = None) -> DownloadResult:
+        """
+        下載 url 到 dest。verify 未指定時 .zip 檔做完整性檢查。
+        回傳 DownloadResult（status 為 downloaded / not_modified / unchanged）。
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        verify = dest.suffix.lower() == ".zip" if verify is None else verify
+        meta = self.load_meta(dest)
+        start = time.perf_counter()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = self._attempt(url, dest, meta, verify)
+                result.seconds = time.perf_counter() - start
+                return result
+            except (requests.RequestException, DownloadError) as e:
+                if attempt > self.retries or (isinstance(e, DownloadError) and not getattr(e, "retry", True)):
+                    raise DownloadError(f"{url} 下載失敗（{attempt} 次）：{e}") from e
+                part = dest.with_name(dest.name + ".part")
+                kept = part.stat().st_size if part.exists() else 0
+                wait = self.backoff * 2 ** (attempt - 1)
+                print(f"\n[HttpDownloader] {dest.name} 第 {attempt} 次失敗（{e}），已下載 {kept:,} bytes，{wait:.1f}s 後續傳")
+                time.sleep(wait)
+
+    def _attempt(self, url: str, dest: Path, meta: dict, verify: bool) -> DownloadResult:
+        part = dest.with_name(dest.name + ".part")
+        part_meta = self.meta_path(part)
+        headers = {}
+
+        # 未完成的 .part：確認是同一版本（If-Range）後從中斷處續傳
+        offset = part.stat().st_size if part.exists() else 0
+        validator = None
+        if offset and part_meta.exists():
+            try:
+                saved = json.loads(part_meta.read_text(encoding="utf-8"))
+                validator = saved.get("etag") or saved.get("last_modified")
+            except (OSError, ValueError):
+                validator = None
+        if offset and validator:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+        else:
+            offset = 0
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as resp:
+            if resp.status_code == 304:
+                return DownloadResult(STATUS_NOT_MODIFIED, dest, size=meta.get("size", 0), sha256=meta.get("sha256", ""))
+            if resp.status_code in RETRY_STATUS:
+                raise DownloadError(f"HTTP {resp.status_code}")
+            if resp.status_code not in (200, 206):
+                error = DownloadError(f"HTTP {resp.status_code}")
+                error.retry = False
+                raise error
+
+            etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+            resumed = resp.status_code == 206
+            if not resumed:
+                offset = 0
+            part_meta.write_text(json.dumps({"url": url, "etag": etag, "last_modified": last_modified}),
+                                 encoding="utf-8")
+
+            length = resp.headers.get("Content-Length")
+            total = offset + int(length) if length is not None else None
+            done = offset
+            with open(part, "ab" if resumed else "wb") as f:
+                for block in resp.iter_content(chunk_size=self.chunk_size):
+                    f.write(block)
+                    done += len(block)
+                    if self.progress:
+                        self.progress(dest.name, done, total)
+            if self.progress:
+                sys.stdout.write("\n")
+
+        if total is not None and done != total:
+            raise DownloadError(f"內容長度不符（{done:,} / {total:,} bytes）")
+        if verify and not verify_zip(part):
+            # 損毀的續傳內容無法修復：刪除後重新下載
+            part.unlink()
+            part_meta.unlink(missing_ok=True)
+            raise DownloadError("zip 完整性檢查失敗")
+
+        sha256 = hashlib.sha256()
+        with open(part, "rb") as f:
+            for block in iter(lambda: f.read(self.chunk_size), b""):
+                sha256.update(block)
+        digest = sha256.hexdigest()
+
+        status = STATUS_UNCHANGED if meta.get("sha256") == digest else STATUS_DOWNLOADED
+        os.replace(part, dest)
+        part_meta.unlink(missing_ok=True)
+        self._save_meta(dest, {
+            "url": url, "etag": etag, "last_modified": last_modified, "sha256": digest, "size": done,
+            "downloaded_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        return DownloadResult(status, dest, size=done, sha256=digest, resumed_bytes=offset)
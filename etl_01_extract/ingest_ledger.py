@@ -0,0 +1,169 @@
+import hashlib
+import os
+import sqlite3
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+# merged：已寫入中繼檔（尚未寫入主資料）；loaded：已寫入主資料
+STATUS_MERGED = "merged"
+STATUS_LOADED = "loaded"
+# 開放資料 zip 的檔名前綴（lvr_landcsv_{季度或日期}.zip）
+ZIP_PREFIX = "lvr_landcsv_"
+
+
+def file_sha256(path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def zip_source_name(zip_path, member: str) -> str:
+    """
+    zip 成員的原始檔名稱：{縣市代碼}_{zip 標籤}.csv（lvr_landcsv_112S1.zip 內的 a_lvr_land_a.csv → A_112S1.csv），
+    與解壓後另存的檔名相同，來源檔名 第一碼仍是縣市代碼。
+    """
+    tag = Path(zip_path).stem
+    if tag.startswith(ZIP_PREFIX):
+        tag = tag[len(ZIP_PREFIX):]
+    return f"{Path(member).name[0].upper()}_{tag}.csv"
+
+
+def zip_inputs(zip_path, members):
+    """
+    zip 內符合 members（不分大小寫比對檔名）的成員；只讀 central directory，
+    以成員的 CRC32 + 大小作為內容雜湊，不需解壓即可判斷內容是否變更。
+    """
+    zip_path = Path(zip_path)
+    wanted = {m.lower() for m in members}
+    mtime = zip_path.stat().st_mtime
+    with zipfile.ZipFile(zip_path) as zfile:
+        for zinfo in zfile.infolist():
+            if Path(zinfo.filename).name.lower() in wanted:
+                yield {
+                    "name": zip_source_name(zip_path, zinfo.filename),
+                    "path": zip_path,
+                    "member": zinfo.filename,
+                    "size": zinfo.file_size,
+                    "mtime": mtime,
+                    "sha256": f"crc32:{zinfo.CRC:08x}:{zinfo.file_size}",
+                }
+
+
+class IngestLedger:
+    """
+    原始檔匯入紀錄（SQLite）：檔名、大小、mtime、內容雜湊、筆數、匯入時間。
+    判斷新檔只需 stat；大小或 mtime 改變時才重新計算雜湊，內容真的變了才重新匯入。
+    """
+
+    def __init__(self, ledger_path):
+        self.ledger_path = Path(ledger_path)
+        self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.ledger_path))
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingest (
+                file_name   TEXT PRIMARY KEY,
+                size        INTEGER NOT NULL,
+                mtime       REAL NOT NULL,
+                sha256      TEXT NOT NULL,
+                row_count   INTEGER,
+                status      TEXT NOT NULL,
+                ingested_at TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM ingest").fetchone()[0]
+
+    def _entries(self):
+        rows = self.conn.execute("SELECT file_name, size, mtime, sha256, status FROM ingest").fetchall()
+        return {r[0]: {"size": r[1], "mtime": r[2], "sha256": r[3], "status": r[4]} for r in rows}
+
+    def scan(self, folder, merged_exists: bool = True, suffix: str = ".csv", zip_members=None):
+        """
+        回傳需要處理的檔案 [{name, path, member, size, mtime, sha256, reason}]，reason 為 new / changed / pending。
+        merged_exists=False 時，狀態仍為 merged（中繼檔已不存在）的檔案也要重新處理。
+        zip_members 指定時，資料夾內 zip 的對應成員也是原始檔（member 為 zip 內路徑，一般 CSV 為 None）。
+        """
+        entries = self._entries()
+        todo, seen = [], set()
+        for info in self._inputs(folder, suffix, zip_members):
+            name = info["name"]
+            if name in seen:
+                print(f"[IngestLedger] {name} 重複（{info['path'].name}），略過")
+                continue
+            seen.add(name)
+            entry = entries.get(name)
+
+            if entry is None:
+                info["reason"] = "new"
+            elif entry["size"] == info["size"] and entry["mtime"] == info["mtime"]:
+                # metadata 未變，不讀檔
+                if entry["status"] == STATUS_MERGED and not merged_exists:
+                    info["sha256"] = entry["sha256"]
+                    info["reason"] = "pending"
+                else:
+                    continue
+            else:
+                info["sha256"] = info["sha256"] or file_sha256(info["path"])
+                same = info["sha256"] == entry["sha256"]
+                if info["member"] and not entry["sha256"].startswith("crc32:"):
+                    # 先前以解壓後的 CSV 匯入、現在改由 zip 讀取：大小相同視為同一檔案
+                    same = entry["size"] == info["size"]
+                if same:
+                    # 只有 mtime 變（例如重新下載相同內容）：更新 metadata 即可
+                    self.conn.execute(
+                        "UPDATE ingest SET size = ?, mtime = ?, sha256 = ? WHERE file_name = ?",
+                        (info["size"], info["mtime"], info["sha256"], name),
+                    )
+                    self.conn.commit()
+                    if entry["status"] == STATUS_MERGED and not merged_exists:
+                        info["reason"] = "pending"
+                    else:
+                        continue
+                else:
+                    info["reason"] = "changed"
+            todo.append(info)
+        return todo
+
+    @staticmethod
+    def _inputs(folder, suffix: str, zip_members):
+        for name in sorted(os.listdir(folder)):
+            path = Path(folder) / name
+            if name.endswith(suffix):
+                st = path.stat()
+                yield {"name": name, "path": path, "member": None, "size": st.st_size, "mtime": st.st_mtime,
+                       "sha256": None}
+            elif zip_members and name.lower().endswith(".zip"):
+                try:
+                    yield from zip_inputs(path, zip_members)
+                except zipfile.BadZipFile:
+                    print(f"[IngestLedger] {name} 不是有效的 zip，略過")
+
+    def record(self, info, row_count=None, status: str = STATUS_MERGED):
+        sha256 = info.get("sha256") or file_sha256(info["path"])
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO ingest (file_name, size, mtime, sha256, row_count, status, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (info["name"], info["size"], info["mtime"], sha256, row_count, status,
+             datetime.now().isoformat(timespec="seconds")),
+        )
+        self.conn.commit()
+
+    def mark_loaded(self):
+        """主資料寫入成功後呼叫：中繼檔內的檔案全部標記為 loaded"""
+        n = self.conn.execute(
+            "UPDATE ingest SET status = ? WHERE status = ?", (STATUS_LOADED, STATUS_MERGED)
+        ).rowcount
+        self.conn.commit()
+        return n
+
+    def close(self):
+        self.conn.close()
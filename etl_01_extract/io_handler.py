@@ -1,34 +1,219 @@
 import pandas as pd
-from typing import Optional
+import pyarrow as pa
+import pyarrow.feather as feather
+from pathlib import Path
+from typing import Optional, Sequence
+import codecs
+import csv
 import os
+import time
+from etl_01_extract.moi_schema import apply_moi_dtypes, read_moi_csv
+from arrow_tables import string_types_mapper, to_arrow_table
+
+# 只讀檔頭這麼多 bytes 判斷編碼與分隔符號
+SNIFF_BYTES = 64 * 1024
+CANDIDATE_DELIMITERS = (",", "\t", ";", "|")
+# big5 判斷到的檔案以 cp950 解析：cp950 為 big5 的超集（碁、銹 等字），不會在檔案後段才解碼失敗
+PARSE_ENCODING = {"big5": "cp950"}
+
+
+# 中繼檔（stage 之間交接）使用 Arrow IPC（Feather v2）：型別完整保留、memory-mapped 讀取
+FEATHER_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+
+def is_feather(path) -> bool:
+    return Path(path).suffix.lower() in FEATHER_SUFFIXES
+
+
+def write_feather(df: pd.DataFrame, path, compression: str = "uncompressed"):
+    """
+    寫出 Arrow IPC 檔（先寫暫存檔再置換）。category 保留為 dictionary，讀回仍是 category。
+    compression："uncompressed"（讀取為 zero-copy）、"zstd" / "lz4"（檔案較小，讀取需解壓）
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    feather.write_feather(to_arrow_table(df, keep_dictionaries=True), tmp, compression=compression)
+    os.replace(tmp, path)
+    return path
+
+
+def read_feather(path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    memory-mapped 讀取 Arrow IPC 檔（未壓縮時欄位資料直接對應檔案內容，不另外複製）；
+    字串欄位為 pd.ArrowDtype，沿用 mapped buffer 而不轉成 Python 物件。
+    """
+    return feather.read_table(str(path), columns=list(columns) if columns is not None else None,
+                              memory_map=True).to_pandas(types_mapper=string_types_mapper)
+
+
+def feather_columns(path):
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def feather_num_rows(path) -> int:
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def read_frame(path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """中繼檔讀取入口：Arrow IPC 或 CSV（依副檔名）"""
+    if is_feather(path):
+        return read_feather(path, columns)
+    return pd.read_csv(path, usecols=columns, encoding="utf-8-sig", low_memory=False)
+
+
+def _decodes(block: bytes, encoding: str) -> bool:
+    # 區塊結尾可能切在多位元組字元中間：incremental decoder 不做 final 檢查
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(block, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _sniff_delimiter(text: str) -> str:
+    """前幾列（不含可能被截斷的最後一列）以各候選分隔符號切欄，欄數一致且最多者勝出"""
+    lines = text.splitlines()[:20]
+    if len(lines) > 1:
+        lines = lines[:-1]
+    best, best_fields = ",", 1
+    for sep in CANDIDATE_DELIMITERS:
+        counts = {len(row) for row in csv.reader(lines, delimiter=sep)}
+        fields = max(counts) if counts else 1
+        if fields > best_fields and len(counts) == 1:
+            best, best_fields = sep, fields
+    return best
+
+
+def sniff_csv(path, block_size: int = SNIFF_BYTES) -> dict:
+    """
+    只讀第一個區塊判斷編碼（utf-8-sig / big5 / cp950）與分隔符號。
+    回傳 {"encoding": 偵測結果, "parse_encoding": 解析用編碼, "sep": 分隔符號}
+    """
+    with open(path, "rb") as f:
+        block = f.read(block_size)
+
+    if block.startswith(codecs.BOM_UTF8) or _decodes(block, "utf-8"):
+        encoding = "utf-8-sig"
+    elif _decodes(block, "big5"):
+        encoding = "big5"
+    elif _decodes(block, "cp950"):
+        encoding = "cp950"
+    else:
+        raise ValueError(f"{path} 無法判斷編碼（utf-8 / big5 / cp950 皆無法解碼）")
+
+    parse_encoding = PARSE_ENCODING.get(encoding, encoding)
+    text = codecs.getincrementaldecoder(parse_encoding)().decode(block, final=False)
+    return {"encoding": encoding, "parse_encoding": parse_encoding, "sep": _sniff_delimiter(text)}
+
+
+def _is_invalid_utf8(error: Exception) -> bool:
+    """utf-8 解碼失敗：Python 的 UnicodeDecodeError，或 pyarrow 的 ArrowInvalid（"invalid UTF8 data"）"""
+    if isinstance(error, UnicodeDecodeError):
+        return True
+    message = str(error).lower()
+    return isinstance(error, pa.ArrowInvalid) and ("utf8" in message or "utf-8" in message)
+
+
+def _parse(path, encoding, sep, usecols, moi_schema, info, kwargs):
+    if moi_schema:
+        info["engine"] = "moi_schema"
+        return read_moi_csv(path, usecols=usecols, encoding=encoding, sep=sep, **kwargs)
+    try:
+        with pa.memory_map(str(path)) as source:
+            df = pd.read_csv(source, engine="pyarrow", encoding=encoding, sep=sep, usecols=usecols, **kwargs)
+        info["engine"] = "pyarrow (memory-mapped)"
+        return df
+    except (pa.ArrowInvalid, ValueError) as e:
+        if _is_invalid_utf8(e):
+            # 編碼問題交給 read_csv_auto 改用 cp950，C engine 一樣會解碼失敗
+            raise
+        # pyarrow 不接受的內容（例如欄數不一致的列）：改用 C engine
+        info["engine"] = f"c（pyarrow 失敗：{str(e).splitlines()[0][:80]}）"
+        return pd.read_csv(path, engine="c", encoding=encoding, sep=sep, usecols=usecols, low_memory=False, **kwargs)
+
+
+def read_csv_auto(path, usecols: Optional[Sequence[str]] = None, moi_schema: bool = False, **kwargs):
+    """
+    偵測編碼與分隔符號後只解析一次：pyarrow engine（多執行緒）讀 memory-mapped 檔案。
+    moi_schema=True 時交給 read_moi_csv（型別在解析時套用）。
+    回傳 (df, info)，info 記錄偵測結果、實際使用的 engine 與耗時。
+    """
+    start = time.perf_counter()
+    info = sniff_csv(path)
+    info["sniff_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    encoding, sep = info["parse_encoding"], info["sep"]
+
+    try:
+        df = _parse(path, encoding, sep, usecols, moi_schema, info, kwargs)
+    except (UnicodeDecodeError, pa.ArrowInvalid) as e:
+        # 檔頭區塊全是 ASCII、後段才出現 big5 字元：改以 cp950 重新解析（只有偵測失準時才會讀第二次）
+        if encoding != "utf-8-sig" or not _is_invalid_utf8(e):
+            raise
+        info["fallback"] = "utf-8 解碼失敗，改用 cp950"
+        info["encoding"] = info["parse_encoding"] = encoding = "cp950"
+        df = _parse(path, encoding, sep, usecols, moi_schema, info, kwargs)
+
+    info["seconds"] = round(time.perf_counter() - start, 3)
+    sep_name = {"\t": "tab"}.get(sep, sep)
+    print(f"[IOHandler] {os.path.basename(str(path))}: 編碼 {info['encoding']}"
+          + (f"（以 {encoding} 解析）" if encoding != info["encoding"] else "")
+          + f"，分隔符號 {sep_name}，{info['engine']}，{len(df):,} 筆，{info['seconds']}s")
+    return df, info
+
 
 class IOHandler:
-    def __init__(self, 
+    def __init__(self,
                  input_path : Optional[str] = None,
                  output_path : Optional[str] = None,
-                 encoding : str = "utf-8"
+                 encoding : str = "utf-8",
+                 moi_schema : bool = False,
+                 usecols : Optional[Sequence[str]] = None,
+                 compression : str = "uncompressed"
                  ):
         self.input_path = input_path
         self.output_path = output_path
+        # 輸出編碼；讀檔編碼由檔頭偵測
         self.encoding = encoding
+        # 路徑副檔名為 .arrow / .feather 時以 Arrow IPC 讀寫（compression 見 write_feather），否則為 CSV
+        self.compression = compression
+        # moi_schema=True：依 MOI 格式版本在讀檔時套用欄名與型別（見 moi_schema.read_moi_csv）
+        self.moi_schema = moi_schema
+        self.usecols = usecols
+        # 上次 load 的偵測結果與讀取方式（encoding / sep / engine / 耗時），MetricsRecorder 一併記錄
+        self.read_info = {}
+        self.step_metrics = {}
+
     def load(self):
         if not self.input_path:
             raise ValueError(f"{self.input_path}:路徑未提供")
-        try:
-            df = pd.read_csv(self.input_path, encoding =self.encoding, sep = ",")
-            print("使用utf-8儲存")
+        if is_feather(self.input_path):
+            start = time.perf_counter()
+            df = read_feather(self.input_path, self.usecols)
+            if self.moi_schema:
+                df = apply_moi_dtypes(df)
+            self.read_info = {"engine": "arrow ipc (memory-mapped)", "seconds": round(time.perf_counter() - start, 3)}
+            self.step_metrics = dict(self.read_info)
+            print(f"[IOHandler] {os.path.basename(str(self.input_path))}: Arrow IPC，{len(df):,} 筆，"
+                  f"{self.read_info['seconds']}s")
             return df
-        except UnicodeDecodeError:
-            df = pd.read_csv(self.input_path, encoding = "big5", sep = "\t")
-            print("使用big5儲存")
-            return df
-        
+        df, self.read_info = read_csv_auto(self.input_path, usecols=self.usecols, moi_schema=self.moi_schema)
+        self.step_metrics = dict(self.read_info)
+        return df
+
     def save(self,df):
         if not self.output_path:
             raise ValueError("未提供輸出路徑")
+        if is_feather(self.output_path):
+            write_feather(df, self.output_path, compression=self.compression)
+            print(f"已以 Arrow IPC（{self.compression}）儲存到{self.output_path}")
+            return
         df.to_csv(self.output_path,encoding = self.encoding, index = False, sep = ",")
         print(f"已utf-8儲存到{self.output_path}")
-    
+
 
 
 def main():
@@ -38,12 +223,12 @@ def main():
     output_csv_path = os.path.join(PROJECT_ROOT, "main_house_rawdata", "merged_cleaned.csv")
 
     io = IOHandler(
-        input_path=input_csv_path,   
-        output_path=output_csv_path  
+        input_path=input_csv_path,
+        output_path=output_csv_path
     )
-    
+
     df = io.load()
     io.save(df)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
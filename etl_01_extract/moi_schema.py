@@ -0,0 +1,179 @@
+import os
+import pandas as pd
+
+# 內政部實價登錄 不動產買賣（lvr_land_a）欄位型別，讀檔時直接套用：
+# - 低基數欄位用 category
+# - 地址、備註等高基數文字用 Arrow 字串
+# - 面積 float64（坪數換算與四捨五入需與原本 CSV 讀入結果一致）、金額 Int64、格局 Int16、日期（民國 YYYMMDD）Int32
+ARROW_STRING = "string[pyarrow]"
+
+# 原始檔第二列的英文欄名
+ENGLISH_HEADER_PATTERN = "transaction|total price|square meter"
+
+CATEGORY_COLUMNS = [
+    "鄉鎮市區", "交易標的", "都市土地使用分區", "非都市土地使用分區", "非都市土地使用編定",
+    "建物型態", "主要用途", "主要建材", "車位類別", "有無管理組織", "建物現況格局-隔間", "電梯", "來源檔名",
+]
+STRING_COLUMNS = ["土地位置建物門牌", "備註", "編號", "移轉編號", "交易筆棟數", "移轉層次", "總樓層數"]
+FLOAT_COLUMNS = [
+    "土地移轉總面積平方公尺", "建物移轉總面積平方公尺", "車位移轉總面積平方公尺",
+    "主建物面積", "附屬建物面積", "陽台面積",
+]
+NUMERIC_COLUMNS = {
+    "總價元": "Int64",
+    "車位總價元": "Int64",
+    "單價元平方公尺": "Float64",
+    "建物現況格局-房": "Int16",
+    "建物現況格局-廳": "Int16",
+    "建物現況格局-衛": "Int16",
+    "交易年月日": "Int32",
+    "建築完成年月": "Int32",
+}
+
+CANONICAL_DTYPES = {
+    **{c: "category" for c in CATEGORY_COLUMNS},
+    **{c: ARROW_STRING for c in STRING_COLUMNS},
+    **{c: "float64" for c in FLOAT_COLUMNS},
+    **NUMERIC_COLUMNS,
+}
+
+
+class MoiSchema:
+    """
+    單一 MOI 檔案格式版本：renames 為 原始欄名 → 標準欄名，
+    signature 為判斷版本用的欄位（全部存在才符合）。
+    """
+
+    def __init__(self, version: str, signature, renames=None, description: str = ""):
+        self.version = version
+        self.signature = list(signature)
+        self.renames = dict(renames or {})
+        self.description = description
+
+    def matches(self, columns) -> bool:
+        return all(c in columns for c in self.signature)
+
+    def canonical(self, column: str) -> str:
+        return self.renames.get(column, column)
+
+
+# 新版格式優先比對；都不符合時視為最新版（只套用型別，不改名）
+SCHEMA_VERSIONS = [
+    MoiSchema(
+        "v2",
+        signature=["車位移轉總面積平方公尺"],
+        description="民國 109 年起：車位面積欄名去括號，新增 主建物面積 / 附屬建物面積 / 陽台面積 / 電梯 / 移轉編號",
+    ),
+    MoiSchema(
+        "v1",
+        signature=["車位移轉總面積(平方公尺)"],
+        renames={"車位移轉總面積(平方公尺)": "車位移轉總面積平方公尺"},
+        description="民國 109 年以前：車位移轉總面積(平方公尺)",
+    ),
+]
+SCHEMAS = {s.version: s for s in SCHEMA_VERSIONS}
+LATEST = SCHEMA_VERSIONS[0]
+# 所有版本的改名（新舊欄並存的中繼檔也要能對應）
+ALL_RENAMES = {old: new for s in SCHEMA_VERSIONS for old, new in s.renames.items()}
+
+
+def canonical_name(column: str) -> str:
+    return ALL_RENAMES.get(column, column)
+
+
+def source_dtypes(columns):
+    """read_csv 用的 dtype（以原始欄名為 key）；未登錄的欄位讀成 Arrow 字串"""
+    return {c: CANONICAL_DTYPES.get(canonical_name(c), ARROW_STRING) for c in columns}
+
+
+def detect_schema(columns) -> MoiSchema:
+    columns = list(columns)
+    for schema in SCHEMA_VERSIONS:
+        if schema.matches(columns):
+            return schema
+    return LATEST
+
+
+def canonicalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    改成標準欄名。新舊欄名同時存在（例如合併過不同版本的中繼檔）時，
+    以新欄為主、舊欄補缺值後刪除舊欄。
+    """
+    for old, new in ALL_RENAMES.items():
+        if old not in df.columns:
+            continue
+        if new in df.columns:
+            df[new] = df[new].combine_first(df[old])
+            df = df.drop(columns=[old])
+        else:
+            df = df.rename(columns={old: new})
+    return df
+
+
+def apply_moi_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    已讀入的 MOI 資料（例如全為字串的 Arrow 中繼檔）改成標準欄名並套用 CANONICAL_DTYPES，
+    與 read_moi_csv 讀出的型別相同（無法轉換的數值為 NA）。
+    """
+    df = canonicalize_columns(df)
+    for col in df.columns:
+        # 未登錄的欄位與 read_moi_csv 相同讀成 Arrow 字串
+        dtype = CANONICAL_DTYPES.get(col, ARROW_STRING)
+        if str(df[col].dtype) == str(dtype):
+            continue
+        if dtype in ("category", ARROW_STRING):
+            df[col] = df[col].astype(dtype)
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+    return df
+
+
+def _has_english_header(path, encoding, sep) -> bool:
+    first = pd.read_csv(path, encoding=encoding, sep=sep, dtype=str, nrows=1)
+    if first.empty:
+        return False
+    return first.iloc[0].astype(str).str.lower().str.contains(ENGLISH_HEADER_PATTERN).any()
+
+
+def read_moi_csv(path, usecols=None, encoding: str = "utf-8-sig", sep: str = ",", version: str = None,
+                 **kwargs) -> pd.DataFrame:
+    """
+    依格式版本讀取 MOI CSV（原始檔或合併後的中繼檔）：型別在解析時套用，
+    usecols 以標準欄名指定，讀入後統一改成標準欄名。不支援 chunksize（分段讀取請用 source_dtypes）。
+    """
+    header = list(pd.read_csv(path, encoding=encoding, sep=sep, nrows=0).columns)
+    schema = SCHEMAS[version] if version else detect_schema(header)
+
+    source_cols = header
+    if usecols is not None:
+        wanted = set(usecols)
+        missing = wanted - {canonical_name(c) for c in header}
+        if missing:
+            raise ValueError(f"{path} 缺少欄位：{sorted(missing)}")
+        # 舊欄名對應到需要的標準欄名時也一併讀取
+        source_cols = [c for c in header if canonical_name(c) in wanted]
+
+    # 原始檔第二列為英文欄名時需跳過該列（pyarrow engine 不支援跳過指定列，改用 C engine）
+    english_header = _has_english_header(path, encoding, sep)
+    read_kwargs = dict(
+        encoding=encoding,
+        sep=sep,
+        usecols=source_cols,
+        engine="c" if english_header else "pyarrow",
+        **kwargs,
+    )
+    if english_header:
+        read_kwargs["skiprows"] = [1]
+    dtypes = source_dtypes(source_cols)
+    try:
+        df = pd.read_csv(path, dtype=dtypes, **read_kwargs)
+    except (ValueError, TypeError):
+        # 數值欄混有非數字內容：數值欄先讀成字串，再轉型（無法轉換者為 NA）
+        numeric = {c for c, t in dtypes.items() if t not in ("category", ARROW_STRING)}
+        df = pd.read_csv(path, dtype={c: (ARROW_STRING if c in numeric else t) for c, t in dtypes.items()},
+                         **read_kwargs)
+        for c in numeric:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(dtypes[c])
+
+    print(f"[MoiSchema] {os.path.basename(str(path))}: 格式 {schema.version}，{len(df):,} 筆 {len(df.columns)} 欄")
+    return canonicalize_columns(df)
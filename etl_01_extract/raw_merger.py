@@ -1,86 +1,324 @@
+import codecs
 import os
+import queue
+import threading
+import zipfile
+from contextlib import contextmanager
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from etl_01_extract.download_house_data import TARGET_CSV
+from etl_01_extract.ingest_ledger import IngestLedger, STATUS_LOADED, STATUS_MERGED
+from etl_01_extract.io_handler import feather_columns, is_feather, read_frame
+from etl_01_extract.moi_schema import ENGLISH_HEADER_PATTERN, canonical_name, canonicalize_columns
+from etl_03_load.master_store import read_master
+
+_DONE = object()
+
+
+def _drop_english_header(chunk: pd.DataFrame) -> pd.DataFrame:
+    # 移除重複英文標題（每個 chunk 檢查第一列）
+    if chunk.empty:
+        return chunk
+    first_row_str = chunk.iloc[0].astype(str).str.lower()
+    if first_row_str.str.contains(ENGLISH_HEADER_PATTERN).any():
+        return chunk.iloc[1:]
+    return chunk
+
+
+@contextmanager
+def open_raw(info):
+    """
+    開啟原始檔（binary）：zip 成員直接由壓縮檔串流解壓給 parser，不解壓到暫存檔。
+    """
+    if info.get("member"):
+        with zipfile.ZipFile(info["path"]) as zfile, zfile.open(info["member"]) as f:
+            yield f
+    else:
+        with open(info["path"], "rb") as f:
+            yield f
+
+
+class _CsvSink:
+    """
+    CSV 中繼檔：直接 append；讀取失敗的檔案截掉已寫出的部分。
+    replaced（內容已變更、重新匯入的檔案）的舊資料先由中繼檔移除再 append。
+    """
+    # 每個檔案寫完即生效（可立即登錄帳本）
+    durable_per_file = True
+
+    def __init__(self, path, header, compression=None, replaced=(), chunksize=100_000):
+        self.header = header
+        path = Path(path)
+        if replaced and path.exists() and path.stat().st_size > 0:
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "wb") as out:
+                out.write(codecs.BOM_UTF8)
+                pd.DataFrame(columns=header).to_csv(out, index=False, encoding="utf-8")
+                for chunk in pd.read_csv(path, encoding="utf-8-sig", dtype=str, chunksize=chunksize):
+                    chunk = chunk.loc[~chunk["來源檔名"].isin(replaced)]
+                    chunk.reindex(columns=header).to_csv(out, header=False, index=False, encoding="utf-8")
+            tmp.replace(path)
+        self.out = open(path, "ab")
+        if self.out.tell() == 0:
+            self.out.write(codecs.BOM_UTF8)
+            pd.DataFrame(columns=header).to_csv(self.out, index=False, encoding="utf-8")
+        self.start = self.out.tell()
+
+    def begin(self, name):
+        self.start = self.out.tell()
+
+    def write(self, chunk):
+        chunk.reindex(columns=self.header).to_csv(self.out, header=False, index=False, encoding="utf-8")
+
+    def discard(self):
+        self.out.truncate(self.start)
+        self.out.seek(self.start)
+
+    def close(self):
+        self.out.close()
+
+    abort = close
+
+
+class _ArrowSink:
+    """
+    Arrow IPC 中繼檔（全部欄位為字串，型別在 load_raw 套用）。IPC 檔無法 append：
+    既有內容（上次合併、尚未寫入主資料的部分）以 memory map 分批複製到新檔後再寫入新資料，完成後置換；
+    複製時略過 replaced（內容已變更、重新匯入的檔案）的舊資料，讀取失敗的檔案在結束時依 來源檔名 濾掉。
+    """
+    # close 置換後才生效
+    durable_per_file = False
+
+    def __init__(self, path, header, compression="uncompressed", replaced=()):
+        self.path = Path(path)
+        self.schema = pa.schema([(c, pa.string()) for c in header])
+        self.tmp = self.path.with_name(self.path.name + ".tmp")
+        options = pa.ipc.IpcWriteOptions(compression=None if compression == "uncompressed" else compression)
+        self.writer = pa.ipc.new_file(str(self.tmp), self.schema, options=options)
+        self.failed = set()
+        self.current = None
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with pa.memory_map(str(self.path)) as source:
+                reader = pa.ipc.open_file(source)
+                stale = pa.array(sorted(replaced), pa.string())
+                for i in range(reader.num_record_batches):
+                    batch = self._align(reader.get_batch(i))
+                    if len(stale):
+                        batch = batch.filter(pc.invert(pc.is_in(batch.column("來源檔名"), value_set=stale)))
+                    self.writer.write_batch(batch)
+
+    def _align(self, batch):
+        # 舊中繼檔的欄位對齊到新 header（新舊版欄名統一、缺少的欄位補 null）
+        columns = {canonical_name(name): batch.column(i) for i, name in enumerate(batch.schema.names)}
+        arrays = [columns[f.name].cast(pa.string()) if f.name in columns else pa.nulls(batch.num_rows, pa.string())
+                  for f in self.schema]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def begin(self, name):
+        self.current = name
+
+    def write(self, chunk):
+        table = pa.Table.from_pandas(chunk.reindex(columns=self.schema.names), schema=self.schema,
+                                     preserve_index=False)
+        self.writer.write_table(table)
+
+    def discard(self):
+        self.failed.add(self.current)
+
+    def close(self):
+        self.writer.close()
+        if self.failed:
+            with pa.memory_map(str(self.tmp)) as source:
+                table = pa.ipc.open_file(source).read_all()
+                keep = pc.invert(pc.is_in(table["來源檔名"], value_set=pa.array(sorted(self.failed), pa.string())))
+                table = table.filter(keep)
+            with pa.OSFile(str(self.tmp), "wb") as sink, pa.ipc.new_file(sink, self.schema) as writer:
+                writer.write_table(table)
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        # 中途失敗：保留原中繼檔，捨棄暫存檔
+        self.writer.close()
+        self.tmp.unlink(missing_ok=True)
+
 
 class RawMerger:
-    def __init__(self, raw_folder, merged_path, master_path=None):
+    def __init__(self, raw_folder, merged_path, master_path=None, workers=4, chunksize=100_000, queue_size=2,
+                 ledger_path=None, zip_members=None, compression="uncompressed"):
 
         self.raw_folder = Path(raw_folder)
         self.merged_path = Path(merged_path)
         self.master_path = Path(master_path) if master_path else None
-        
+        # 同時解析的檔案數、每次寫出的列數、每個檔案最多暫存的 chunk 數
+        # 記憶體上限約為 workers * queue_size * chunksize 列，與檔案數量無關
+        self.workers = workers
+        self.chunksize = chunksize
+        self.queue_size = queue_size
+        # 原始資料夾內的 zip（開放資料壓縮檔）中要匯入的成員，原始資料不需解壓即可保存
+        self.zip_members = list(zip_members or TARGET_CSV)
+        # merged_path 副檔名為 .arrow / .feather 時中繼檔為 Arrow IPC（compression 見 io_handler.write_feather）
+        self.compression = compression
 
         self.merged_path.parent.mkdir(parents=True, exist_ok=True)
 
-    def merge(self):
-
-        old_sources = set()
+        # 匯入帳本：記錄已處理的原始檔（檔名、大小、mtime、雜湊），取代每次掃描主檔的 來源檔名
+        self.ledger = IngestLedger(ledger_path or self.merged_path.parent / "ingest_ledger.sqlite")
 
+    def _bootstrap_ledger(self):
+        """帳本為空時（第一次使用）由中繼檔與主資料的 來源檔名 建立初始紀錄，只執行一次"""
+        sources = {}
         if self.merged_path.exists():
             try:
-                check_df = pd.read_csv(self.merged_path, usecols=["來源檔名"], encoding="utf-8-sig")
-                merged_sources = set(check_df["來源檔名"].unique())
-                old_sources.update(merged_sources)
-                print(f"[RawMerger] 中繼檔中已包含 {len(merged_sources)} 個檔案")
+                check_df = read_frame(self.merged_path, columns=["來源檔名"])
+                sources.update(dict.fromkeys(check_df["來源檔名"].unique(), STATUS_MERGED))
             except Exception as e:
                 print(f"[RawMerger] 讀取中繼檔檢查時發生錯誤: {e}")
 
-
         if self.master_path and self.master_path.exists():
             try:
-
-                master_df = pd.read_csv(self.master_path, usecols=["來源檔名"], encoding="utf-8-sig")
-                master_sources = set(master_df["來源檔名"].unique())
-                old_sources.update(master_sources)
-                print(f"[RawMerger] 最終主檔中已記錄 {len(master_sources)} 個檔案 (將跳過不處理)")
+                master_df = read_master(self.master_path, columns=["來源檔名"])
+                sources.update(dict.fromkeys(master_df["來源檔名"].unique(), STATUS_LOADED))
             except ValueError:
                 print("[RawMerger] 主檔存在但無 [來源檔名] 欄位，無法進行比對。")
             except Exception as e:
                 print(f"[RawMerger] 讀取主檔檢查時發生錯誤: {e}")
 
+        recorded = 0
+        for info in self.ledger.scan(self.raw_folder, zip_members=self.zip_members):
+            if info["name"] in sources:
+                self.ledger.record(info, status=sources[info["name"]])
+                recorded += 1
+        if recorded:
+            print(f"[RawMerger] 匯入帳本初始化：由既有資料登錄 {recorded} 個檔案")
+
+    def merge(self):
+
+        if len(self.ledger) == 0:
+            self._bootstrap_ledger()
+
+        merged_exists = self.merged_path.exists()
+        todo = self.ledger.scan(self.raw_folder, merged_exists=merged_exists, zip_members=self.zip_members)
+        for info in todo:
+            if info["reason"] == "changed":
+                print(f"[RawMerger] {info['name']} 內容已變更，重新匯入")
 
-        all_csv_files = [f for f in os.listdir(self.raw_folder) if f.endswith(".csv")]
-        new_files = [f for f in all_csv_files if f not in old_sources]
-        
-        if not new_files:
+        if not todo:
             print("[RawMerger] 沒有偵測到需處理的新檔案。")
             return str(self.merged_path)
 
-        print(f"[RawMerger] 偵測到 {len(new_files)} 個未處理檔案，準備 Append 到中繼檔...")
+        print(f"[RawMerger] 偵測到 {len(todo)} 個未處理檔案，準備 Append 到中繼檔...")
 
+        infos = {info["name"]: info for info in todo}
+        new_files = sorted(infos)
+        # 內容已變更的檔案：中繼檔內的舊版資料先移除，避免去重時舊資料（keep="first"）勝出
+        replaced = {info["name"] for info in todo if info["reason"] == "changed"}
+        header = self._output_header([infos[f] for f in new_files])
 
-        new_dfs = []
-        for f in new_files:
+        # 每個檔案一個有界 queue：worker 平行解析，寫出端依檔名順序消化
+        queues = {f: queue.Queue(maxsize=self.queue_size) for f in new_files}
+        cancel = threading.Event()
+        written_files = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for f in new_files:
+                executor.submit(self._read_file, infos[f], queues[f], cancel)
+
+            sink_cls = _ArrowSink if is_feather(self.merged_path) else _CsvSink
+            recorded = []
             try:
-                file_path = self.raw_folder / f
-
-                df = pd.read_csv(file_path, encoding="utf-8-sig", low_memory=False)
-                
-                if not df.empty:
-                    # 移除重複英文標題
-                    first_row_str = df.iloc[0].astype(str).str.lower()
-                    if first_row_str.str.contains("transaction|total price|square meter").any():
-                        df = df.iloc[1:]
-                
-
-                df["來源檔名"] = f
-                new_dfs.append(df)
-            except Exception as e:
-                print(f"讀取檔案 {f} 失敗: {e}") 
-
-
-        if new_dfs:
-            combined_new_df = pd.concat(new_dfs, ignore_index=True)
-            
-
-            combined_new_df.to_csv(
-                self.merged_path, 
-                mode='a', 
-                index=False, 
-                header=not self.merged_path.exists(), 
-                encoding="utf-8-sig"
-            )
-            
-            print(f"[RawMerger] 合併完成！本次新增 {len(new_files)} 個檔案到 merged_rawdata.csv")
-        
-        return str(self.merged_path)
\ No newline at end of file
+                sink = sink_cls(self.merged_path, header, self.compression, replaced=replaced)
+                try:
+                    for f in new_files:
+                        sink.begin(f)
+                        rows = 0
+                        while True:
+                            item = queues[f].get()
+                            if item is _DONE:
+                                written_files += 1
+                                if sink.durable_per_file:
+                                    self.ledger.record(infos[f], row_count=rows, status=STATUS_MERGED)
+                                else:
+                                    recorded.append((f, rows))
+                                print(f"[RawMerger]  - {f}: {rows:,} 筆")
+                                break
+                            if isinstance(item, Exception):
+                                # 讀取失敗：去掉這個檔案已寫出的部分，整檔略過
+                                sink.discard()
+                                print(f"讀取檔案 {f} 失敗: {item}")
+                                break
+                            sink.write(item)
+                            rows += len(item)
+                except BaseException:
+                    sink.abort()
+                    raise
+                sink.close()
+            finally:
+                cancel.set()
+            # Arrow IPC 中繼檔置換完成後才登錄帳本
+            for f, rows in recorded:
+                self.ledger.record(infos[f], row_count=rows, status=STATUS_MERGED)
+
+        print(f"[RawMerger] 合併完成！本次新增 {written_files} 個檔案到 {self.merged_path.name}")
+        return str(self.merged_path)
+
+    def _read_file(self, info, q, cancel):
+        """worker：分段讀取單一檔案放進 queue（queue 滿時阻塞，控制記憶體）"""
+
+        def put(item):
+            while not cancel.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            with open_raw(info) as f:
+                reader = pd.read_csv(f, encoding="utf-8-sig", dtype=str, chunksize=self.chunksize)
+                for chunk in reader:
+                    # 新舊版欄名在合併時就統一（例如 車位移轉總面積(平方公尺)）
+                    chunk = canonicalize_columns(_drop_english_header(chunk))
+                    chunk["來源檔名"] = info["name"]
+                    if not put(chunk):
+                        return
+            put(_DONE)
+        except Exception as e:
+            put(e)
+
+    def _output_header(self, new_infos):
+        """
+        輸出欄位：既有中繼檔欄位 + 新檔案欄位聯集（新舊版 MOI 欄位不同）。
+        CSV 中繼檔缺少新欄位時先以新欄位重寫中繼檔，確保 append 後欄位對齊。
+        """
+        existing = []
+        if self.merged_path.exists() and self.merged_path.stat().st_size > 0:
+            if is_feather(self.merged_path):
+                existing = feather_columns(self.merged_path)
+            else:
+                existing = list(pd.read_csv(self.merged_path, nrows=0, encoding="utf-8-sig").columns)
+        header = list(dict.fromkeys(canonical_name(c) for c in existing))
+
+        for info in new_infos:
+            try:
+                with open_raw(info) as f:
+                    cols = pd.read_csv(f, nrows=0, encoding="utf-8-sig").columns
+            except Exception:
+                continue
+            header += [c for c in dict.fromkeys(canonical_name(c) for c in cols) if c not in header]
+        if "來源檔名" in header:
+            header.remove("來源檔名")
+        header.append("來源檔名")
+
+        # Arrow IPC 中繼檔每次合併都會重寫，欄位在 _ArrowSink 對齊
+        if existing and existing != header and not is_feather(self.merged_path):
+            tmp = self.merged_path.with_name(self.merged_path.name + ".tmp")
+            with open(tmp, "wb") as out:
+                out.write(codecs.BOM_UTF8)
+                pd.DataFrame(columns=header).to_csv(out, index=False, encoding="utf-8")
+                for chunk in pd.read_csv(self.merged_path, encoding="utf-8-sig", dtype=str, chunksize=self.chunksize):
+                    canonicalize_columns(chunk).reindex(columns=header).to_csv(out, header=False, index=False, encoding="utf-8")
+            tmp.replace(self.merged_path)
+        return header
@@ -0,0 +1,129 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from typing import Callable, Optional
+
+from etl_01_extract.download_house_data import SEASON_URL, archive_zip
+from etl_01_extract.ingest_ledger import ZIP_PREFIX
+from etl_01_extract.http_downloader import HttpDownloader, verify_zip
+
+# 開放資料歷史季度從 101 年第 1 季開始
+FIRST_SEASON = "101S1"
+_SEASON_PATTERN = re.compile(r"^(\d{2,3})S([1-4])$")
+
+
+def parse_season(season: str):
+    """'112S3' → (112, 3)"""
+    m = _SEASON_PATTERN.match(season.strip().upper())
+    if not m:
+        raise ValueError(f"季度格式錯誤（應為 民國年S季，例如 101S1）：{season}")
+    return int(m.group(1)), int(m.group(2))
+
+
+def latest_season(today: Optional[date] = None) -> str:
+    """已發布的最新歷史季度（本季的上一季）"""
+    today = today or date.today()
+    year, season = today.year - 1911, (today.month - 1) // 3
+    if season == 0:
+        year, season = year - 1, 4
+    return f"{year}S{season}"
+
+
+def enumerate_seasons(start: str = FIRST_SEASON, end: Optional[str] = None):
+    """start ~ end（含）的所有季度，end 預設 latest_season()"""
+    year, season = parse_season(start)
+    end_year, end_season = parse_season(end or latest_season())
+    seasons = []
+    while (year, season) <= (end_year, end_season):
+        seasons.append(f"{year}S{season}")
+        year, season = (year + 1, 1) if season == 4 else (year, season + 1)
+    return seasons
+
+
+class SeasonBackfill:
+    """
+    歷史季度回補：各季 zip 以有上限的 thread pool 同時下載（I/O bound），
+    - 每季 zip 保留在 download_path/lvr_landcsv_{季度}.zip，中斷的 .part 下次續傳，已完成的以條件請求略過
+    - zip 通過完整性檢查後（不解壓）以 lvr_landcsv_{季度}.zip 放進原始資料夾，由 RawMerger / 匯入帳本直接讀取 zip 內的目標 CSV
+    """
+
+    def __init__(self, download_path, save_path, workers: int = 4, season_url: str = SEASON_URL,
+                 downloader_factory: Optional[Callable[[], HttpDownloader]] = None):
+        self.download_path = Path(download_path)
+        self.save_path = Path(save_path)
+        self.workers = max(1, int(workers))
+        self.season_url = season_url
+        # 每個工作各自一個 HttpDownloader（requests.Session 不跨 thread 共用）
+        self.downloader_factory = downloader_factory or (lambda: HttpDownloader(progress=None))
+        self.step_metrics = {}
+
+    def season_zip(self, season: str) -> Path:
+        return self.download_path / f"lvr_landcsv_{season}.zip"
+
+    def _archived(self, season: str) -> bool:
+        return (self.save_path / f"{ZIP_PREFIX}{season}.zip").exists()
+
+    def _fetch(self, season: str):
+        url = self.season_url.format(season=season)
+        zip_path = self.season_zip(season)
+        # 新下載的 zip 由 HttpDownloader 檢查完整性後才置換；未更新但尚未放進原始資料夾的舊 zip 再檢查一次
+        result = self.downloader_factory().download(url, zip_path)
+        written = []
+        if result.changed or not self._archived(season):
+            if not result.changed and not verify_zip(zip_path):
+                raise ValueError(f"{zip_path.name} 完整性檢查失敗")
+            written = [archive_zip(zip_path, self.save_path, season)]
+        return result, written
+
+    def run(self, seasons):
+        """下載各季資料，回傳本次放進原始資料夾的 zip 路徑（依季度排序）"""
+        seasons = list(seasons)
+        self.download_path.mkdir(parents=True, exist_ok=True)
+        print(f"[SeasonBackfill] 回補 {seasons[0]} ~ {seasons[-1]} 共 {len(seasons)} 季，{self.workers} 個同時下載")
+
+        start = time.perf_counter()
+        written, failed, statuses, total_bytes = {}, {}, {}, 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._fetch, season): season for season in seasons}
+            for future in as_completed(futures):
+                season = futures[future]
+                try:
+                    result, files = future.result()
+                except Exception as e:
+                    failed[season] = str(e)
+                    print(f"[SeasonBackfill]  - {season}: 失敗（{e}），下次執行時續傳")
+                    continue
+                statuses[result.status] = statuses.get(result.status, 0) + 1
+                if result.changed:
+                    total_bytes += result.size
+                written[season] = files
+                print(f"[SeasonBackfill]  - {season}: {result.status}，{result.size / 1024 / 1024:.1f} MB"
+                      + ("，已放進原始資料夾" if files else ""))
+
+        seconds = time.perf_counter() - start
+        self.step_metrics = {
+            "seasons": len(seasons),
+            "failed": sorted(failed),
+            "statuses": statuses,
+            "downloaded_mb": round(total_bytes / 1024 / 1024, 1),
+            "seconds": round(seconds, 2),
+        }
+        print(f"[SeasonBackfill] 完成：{statuses}，失敗 {len(failed)} 季，{seconds:.1f}s")
+        return [path for season in sorted(written, key=parse_season) for path in written[season]]
+
+
+def main():
+    CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+    PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+    backfill = SeasonBackfill(
+        download_path=os.path.join(PROJECT_ROOT, "downloads"),
+        save_path=os.path.join(PROJECT_ROOT, "house_rawdata"),
+    )
+    backfill.run(enumerate_seasons(FIRST_SEASON))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,154 @@
+import hashlib
 import os
+import pickle
 import pandas as pd
 import numpy as np
+import sklearn
 from sklearn.neighbors import BallTree
 
+from etl_01_extract.io_handler import read_csv_auto
+
+EARTH_RADIUS_KM = 6371
+
+# 捷運便利等級：距離(km) 分箱
+GRADE_BINS = [0, 0.3, 0.6, 1.0, 1.5, 3.0, float('inf')]
+GRADE_LABELS = [5, 4, 3, 2, 1, 0]
+# 索引內容（例如站名正規化）改變時遞增，讓既有的 pickle 失效
+INDEX_VERSION = 2
+
+
+def read_mrt_locations(mrt_path: str) -> pd.DataFrame:
+    # 編碼（big5 / utf-8）由檔頭偵測，只解析一次
+    mrt_df, _ = read_csv_auto(mrt_path)
+
+    mrt_df["緯度"] = pd.to_numeric(mrt_df["緯度"], errors="coerce")
+    mrt_df["經度"] = pd.to_numeric(mrt_df["經度"], errors="coerce")
+    return mrt_df.dropna(subset=["緯度", "經度"]).reset_index(drop=True)
+
+
+def station_names(exit_names: pd.Series) -> pd.Series:
+    """出入口名稱 → 站名：第一個「站」之後全部去掉（'頂埔站出口1' → '頂埔站'，'台北車站M1' → '台北車站'）"""
+    return exit_names.astype(str).str.replace(r"站.*$", "站", regex=True)
+
+
+def file_fingerprint(path: str) -> str:
+    """CSV 內容 hash + 索引版本 + scikit-learn 版本（BallTree pickle 與版本相關）"""
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return f"{digest}:v{INDEX_VERSION}:sklearn-{sklearn.__version__}"
+
+
+class MrtIndex:
+    """
+    捷運出入口 BallTree（haversine）。一次批次查詢同時得到最近出入口、距離與最近的 k 個不同車站：
+    同一站最多 max_exits 個出入口，查前 k * max_exits 個出入口必定含有最近的 k 個不同車站。
+    """
+
+    def __init__(self, mrt_df: pd.DataFrame, fingerprint: str = ""):
+        name_col = "出入口名稱" if "出入口名稱" in mrt_df.columns else mrt_df.columns[0]
+        self.fingerprint = fingerprint
+        self.exit_names = mrt_df[name_col].astype(str).to_numpy()
+        stations = station_names(mrt_df[name_col])
+        codes, self.station_names = pd.factorize(stations)
+        self.station_codes = codes
+        self.max_exits = int(np.bincount(codes).max()) if len(codes) else 0
+        self.tree = BallTree(np.deg2rad(mrt_df[["緯度", "經度"]].to_numpy()), metric="haversine")
+
+    def __len__(self):
+        return len(self.exit_names)
+
+    @classmethod
+    def from_csv(cls, mrt_path: str):
+        return cls(read_mrt_locations(mrt_path), fingerprint=file_fingerprint(mrt_path))
+
+    def query(self, lat, lng, k_stations: int = 1) -> dict:
+        """
+        回傳 dict：
+        - exit_km / exit_name：最近出入口與距離（km）
+        - station_km / station_name：最近 k 個不同車站（shape = (n, k)，依距離排序；車站距離 = 該站最近出入口）
+        """
+        coords = np.deg2rad(np.column_stack([np.asarray(lat, dtype=float), np.asarray(lng, dtype=float)]))
+        n = len(coords)
+        k_stations = max(1, min(k_stations, len(self.station_names)))
+        k_exits = min(len(self), k_stations * self.max_exits if k_stations > 1 else 1)
+
+        distances, indices = self.tree.query(coords, k=k_exits) if n else (
+            np.empty((0, k_exits)), np.empty((0, k_exits), dtype=int))
+        distances = distances * EARTH_RADIUS_KM
+        stations = self.station_codes[indices]
+
+        if k_exits == 1:
+            picked_km, picked = distances, stations
+        else:
+            # 每列保留各車站第一次出現（即最近的出入口），再取前 k 個
+            row = np.repeat(np.arange(n), k_exits)
+            key = row * len(self.station_names) + stations.ravel()
+            first = np.zeros(n * k_exits, dtype=bool)
+            first[np.unique(key, return_index=True)[1]] = True
+            first = first.reshape(n, k_exits)
+            keep = first & (np.cumsum(first, axis=1) <= k_stations)
+            picked_km = distances[keep].reshape(n, k_stations)
+            picked = stations[keep].reshape(n, k_stations)
+
+        return {
+            "exit_km": distances[:, 0],
+            "exit_name": self.exit_names[indices[:, 0]],
+            "station_km": picked_km,
+            "station_name": np.asarray(self.station_names, dtype=object)[picked],
+        }
+
+
+# 同一程序內共用（以 CSV 指紋為 key），多次建立 MrtDistance 不重建
+_INDEX_CACHE = {}
+
+
+def load_mrt_index(mrt_path: str, index_path: str = None) -> MrtIndex:
+    """
+    取得捷運出入口索引：程序內快取 → index_path 的 pickle（指紋相同才使用）→ 重建並寫回 index_path。
+    """
+    fingerprint = file_fingerprint(mrt_path)
+    if fingerprint in _INDEX_CACHE:
+        return _INDEX_CACHE[fingerprint]
+
+    index = None
+    if index_path and os.path.exists(index_path):
+        try:
+            with open(index_path, "rb") as f:
+                cached = pickle.load(f)
+            if getattr(cached, "fingerprint", None) == fingerprint:
+                index = cached
+                print(f"[MrtIndex] 使用既有索引: {index_path}")
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            print(f"[MrtIndex] 索引檔無法讀取，重建: {e}")
+
+    if index is None:
+        index = MrtIndex(read_mrt_locations(mrt_path), fingerprint=fingerprint)
+        print(f"[MrtIndex] 建立索引：{len(index)} 個出入口 / {len(index.station_names)} 站")
+        if index_path:
+            os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, index_path)
+
+    _INDEX_CACHE[fingerprint] = index
+    return index
+
+
 class MrtDistance:
 
-    def __init__(self, df: pd.DataFrame, mrt_path: str = "./mrt_location.csv"):
+    def __init__(self, df: pd.DataFrame, mrt_path: str = "./mrt_location.csv", index_path: str = None,
+                 k_stations: int = 0):
+        """
+        index_path：索引持久化位置（捷運座標檔變更時才重建）；
+        k_stations > 1 時另外輸出最近的 k 個不同車站與距離（第N近捷運站 / 第N近捷運站距離(km)）。
+        """
         self.df = df
         self.mrt_path = mrt_path
+        self.k_stations = k_stations
+        self.index = load_mrt_index(mrt_path, index_path)
 
-        try:
-            self.mrt_df = pd.read_csv(mrt_path, encoding="big5")
-        except:
-            self.mrt_df = pd.read_csv(mrt_path, encoding="utf-8")
-
-    def calculate_distance_to_mrt(self): 
+    def calculate_distance_to_mrt(self):
 
         print("[MrtDistance] 1. 開始計算捷運距離...")
 
@@ -25,71 +159,45 @@ class MrtDistance:
 
         self.df["緯度"] = pd.to_numeric(self.df["緯度"], errors="coerce")
         self.df["經度"] = pd.to_numeric(self.df["經度"], errors="coerce")
-        
-
-        self.df = self.df.dropna(subset=["緯度", "經度"])
-
-        self.mrt_df["緯度"] = pd.to_numeric(self.mrt_df["緯度"], errors="coerce")
-        self.mrt_df["經度"] = pd.to_numeric(self.mrt_df["經度"], errors="coerce")
-        self.mrt_df = self.mrt_df.dropna(subset=["緯度", "經度"])
-
-
-        house_coords_rad = np.deg2rad(self.df[["緯度", "經度"]].to_numpy())
-        mrt_coords_rad = np.deg2rad(self.mrt_df[["緯度", "經度"]].to_numpy())
-
-
-        tree = BallTree(mrt_coords_rad, metric="haversine")
 
 
-        distances_rad, indices = tree.query(house_coords_rad, k=1)
-
-
-        earth_radius_km = 6371
-        distances_km = distances_rad[:, 0] * earth_radius_km
+        self.df = self.df.dropna(subset=["緯度", "經度"])
 
+        # 單次批次查詢，所有捷運欄位一起寫入
+        result = self.index.query(self.df["緯度"].to_numpy(), self.df["經度"].to_numpy(),
+                                  k_stations=max(1, self.k_stations))
 
-        self.df["捷運距離(km)"] = distances_km.round(2)
+        self.df["捷運距離(km)"] = result["exit_km"].round(2)
+        # 最近捷運站 維持原意（最近的出入口名稱），車站另存 最近捷運車站
+        self.df["最近捷運站"] = result["exit_name"]
+        self.df["最近捷運車站"] = result["station_name"][:, 0]
+        if self.k_stations > 1:
+            for i in range(result["station_name"].shape[1]):
+                self.df[f"第{i + 1}近捷運站"] = result["station_name"][:, i]
+                self.df[f"第{i + 1}近捷運站距離(km)"] = result["station_km"][:, i].round(2)
 
-        print("   - 距離計算完成。")
+        print(f"   - 距離計算完成（{len(self.df):,} 筆，單次查詢）。")
         return self
-    
+
     def process_mrt_name_and_grade(self):
 
-        print("[MrtDistance] 2. 正在比對最近捷運站名稱與評分...")
-        
+        print("[MrtDistance] 2. 正在計算捷運便利等級...")
+
 
-        if '捷運距離(km)' not in self.df.columns:
+        if '捷運距離(km)' not in self.df.columns or '最近捷運站' not in self.df.columns:
             print("尚未計算距離，正在自動補算...")
             self.calculate_distance_to_mrt()
-        
-        # 檢查座標欄位
-        valid_rows = self.df.dropna(subset=["緯度", "經度"]).index
-        if len(valid_rows) == 0:
-            return self
-
-
-        house_rad = np.deg2rad(self.df.loc[valid_rows, ['緯度', '經度']].to_numpy())
-        mrt_rad = np.deg2rad(self.mrt_df[['緯度', '經度']].to_numpy())
-
-        tree = BallTree(mrt_rad, metric='haversine')
-        _, indices = tree.query(house_rad, k=1)
-
-        # 抓出站名
-        mrt_name_col = "出入口名稱" 
-        if mrt_name_col not in self.mrt_df.columns:
-            mrt_name_col = self.mrt_df.columns[0]
-            
-        self.df.loc[valid_rows, '最近捷運站'] = self.mrt_df.iloc[indices[:, 0]][mrt_name_col].values
 
+        if len(self.df) == 0:
+            return self
 
-        bins = [0, 0.3, 0.6, 1.0, 1.5, 3.0, float('inf')]
-        labels = [5, 4, 3, 2, 1, 0]
 
-        self.df["捷運便利等級"] = pd.cut(self.df["捷運距離(km)"], bins=bins, labels=labels, include_lowest=True)
-        self.df["捷運便利等級"] = self.df["捷運便利等級"].fillna(0).astype(int)
+        self.df["捷運便利等級"] = pd.cut(self.df["捷運距離(km)"], bins=GRADE_BINS, labels=GRADE_LABELS,
+                                   include_lowest=True)
+        self.df["捷運便利等級"] = self.df["捷運便利等級"].astype(float).fillna(0).astype(int)
 
 
-        self.df.loc[self.df["捷運便利等級"] == 0, "最近捷運站"] = "尚無捷運區"
+        self.df.loc[self.df["捷運便利等級"] == 0, ["最近捷運站", "最近捷運車站"]] = "尚無捷運區"
 
         print("處理完成！已將無捷運區域標記更新。")
         return self
@@ -108,13 +216,14 @@ def main():
     df = pd.read_csv(input_path, encoding="utf-8-sig")
 
 
-    mrtDistance = MrtDistance(df, mrt_path=r"C:\sideProject\mrt_location.csv")
+    mrtDistance = MrtDistance(df, mrt_path=os.path.join(PROJECT_ROOT, "mrt_location.csv"),
+                              index_path=os.path.join(PROJECT_ROOT, "main_house_rawdata", "mrt_index.pkl"))
     mrtDistance = mrtDistance.calculate_distance_to_mrt()
     mrtDistance = mrtDistance.process_mrt_name_and_grade()
     
 
-    cols = ["最近捷運站", "捷運便利等級", "捷運距離(km)"]  
+    cols = ["最近捷運站", "最近捷運車站", "捷運便利等級", "捷運距離(km)"]
     print(mrtDistance.df[cols].head(10))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
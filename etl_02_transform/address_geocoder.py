@@ -0,0 +1,218 @@
+import re
+from typing import Iterable
+import numpy as np
+import pandas as pd
+from etl_02_transform.geocode_cache import SOURCE_CONFIDENCE, normalize_address
+
+# 離線比對的信心值（低於主資料 1.0 與爬蟲 0.8），與快取的來源信心值一致
+BUILDING_CONFIDENCE = SOURCE_CONFIDENCE["offline_building"]
+INTERPOLATED_CONFIDENCE = SOURCE_CONFIDENCE["offline_interpolated"]
+# 前後門牌相差超過 NEAR_GAP 時信心值再降一級；超過 max_gap 不內插
+NEAR_GAP = 10
+FAR_CONFIDENCE = 0.5
+OFFLINE_SOURCES = ("offline_building", "offline_interpolated")
+
+_CN_DIGITS = {"〇": 0, "零": 0, "一": 1, "二": 2, "兩": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_CN_NUMERAL = "〇零一二兩三四五六七八九十百"
+
+# 段 / 巷 / 弄 / 號 / 之 前後的中文數字轉阿拉伯數字（路名本身的數字，例如 三民路，不受影響）
+_CN_NUMBER_PATTERN = re.compile(rf"[{_CN_NUMERAL}]+(?=段|巷|弄|號|之)|(?<=之)[{_CN_NUMERAL}]+")
+
+# 正規化後的地址：縣市 / 區 / 路街(段) / 巷 / 弄 / 號(之) / 其餘（樓層等，比對時忽略）
+ADDRESS_PATTERN = (
+    r"^(?P<city>[^\d]{2}[市縣])?"
+    r"(?P<district>[^\d]{1,4}?區)?"
+    r"(?P<road>[^\d]+?(?:路|街|大道)(?:\d+段)?|[^\d]+?[村里])?"
+    r"(?:(?P<lane>\d+)巷)?"
+    r"(?:(?P<alley>\d+)弄)?"
+    r"(?:(?P<number>\d+)(?:[~\-]\d+)?(?:之(?P<sub>\d+))?號(?:之(?P<sub2>\d+))?)?"
+    r"(?P<rest>.*)$"
+)
+ADDRESS_PARTS = ["city", "district", "road", "lane", "alley", "number", "sub", "floor"]
+
+
+def _cn_to_int(text: str) -> str:
+    """一 → 1、十二 → 12、二十 → 20、一百零五 → 105"""
+    if "十" not in text and "百" not in text:
+        return "".join(str(_CN_DIGITS[c]) for c in text)
+    total, current = 0, 0
+    for c in text:
+        if c == "百":
+            total += (current or 1) * 100
+            current = 0
+        elif c == "十":
+            total += (current or 1) * 10
+            current = 0
+        else:
+            current = _CN_DIGITS[c]
+    return str(total + current)
+
+
+def canonicalize_address(address) -> str:
+    """normalize_address（全形轉半形、台→臺、去空白）後，門牌相關的中文數字改為阿拉伯數字"""
+    return _CN_NUMBER_PATTERN.sub(lambda m: _cn_to_int(m.group(0)), normalize_address(address))
+
+
+def parse_addresses(addresses: Iterable) -> pd.DataFrame:
+    """
+    地址拆成 city / district / road / lane / alley / number / sub / floor（每個不同地址只解析一次），
+    另外產生 building_key（忽略樓層）與 segment_key（同一路段 / 巷弄）。
+    """
+    addresses = pd.Series(list(addresses), dtype=object)
+    codes, uniques = pd.factorize(addresses, use_na_sentinel=False)
+    canonical = pd.Series([canonicalize_address(a) for a in uniques], dtype=object)
+    parts = canonical.str.extract(ADDRESS_PATTERN)
+    parts["sub"] = parts["sub"].fillna(parts["sub2"])
+    parts = parts.rename(columns={"rest": "floor"})[ADDRESS_PARTS]
+
+    number = pd.to_numeric(parts["number"], errors="coerce")
+    sub = pd.to_numeric(parts["sub"], errors="coerce").fillna(0)
+    located = parts["road"].notna() & number.notna()
+    segment = (parts["district"].fillna("") + "|" + parts["road"].fillna("") + "|"
+               + parts["lane"].fillna("") + "|" + parts["alley"].fillna(""))
+    parts["segment_key"] = segment.where(located)
+    parts["building_key"] = (segment + "|" + parts["number"].fillna("") + "之" + parts["sub"].fillna("0")).where(located)
+    # 門牌位置：之N 介於 N 號與 N+1 號之間
+    parts["position"] = (number + sub / 1000).where(located)
+    parts["parity"] = (number % 2).where(located)
+
+    return parts.iloc[codes].reset_index(drop=True)
+
+
+def _parity_keys(segment_keys: pd.Series, parity: pd.Series) -> pd.Series:
+    """路段 + 單雙號（同一側的門牌較接近）"""
+    side = pd.Series(np.where(parity.to_numpy(dtype=float) == 1, "|1", "|0"), index=segment_keys.index, dtype=object)
+    return (segment_keys.astype(object) + side).where(segment_keys.notna())
+
+
+class _SegmentIndex:
+    """
+    路段內門牌的排序索引：(路段, 門牌位置) 編成單一遞增鍵，以 searchsorted 找前後最近的已知門牌。
+    """
+
+    def __init__(self, segment_keys: pd.Series, positions: pd.Series, lat, lng):
+        self.segments = pd.Index(pd.unique(segment_keys))
+        seg = self.segments.get_indexer(segment_keys)
+        order = np.lexsort((positions.to_numpy(dtype=float), seg))
+        self.seg = seg[order]
+        self.pos = positions.to_numpy(dtype=float)[order]
+        self.lat = np.asarray(lat, dtype=float)[order]
+        self.lng = np.asarray(lng, dtype=float)[order]
+        # 不同路段的門牌位置不會重疊：位置 < 1e6
+        self.keys = self.seg * 1e6 + self.pos
+
+    def interpolate(self, segment_keys: pd.Series, positions: np.ndarray, max_gap: float):
+        n = len(positions)
+        lat, lng, gap = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+        seg = self.segments.get_indexer(segment_keys)
+        ok = (seg >= 0) & ~np.isnan(positions)
+        if len(self.keys) == 0 or not ok.any():
+            return lat, lng, gap
+
+        keys = seg[ok] * 1e6 + positions[ok]
+        hi = np.searchsorted(self.keys, keys, side="left")
+        lo = hi - 1
+        hi_c, lo_c = np.minimum(hi, len(self.keys) - 1), np.maximum(lo, 0)
+        valid = ((lo >= 0) & (hi < len(self.keys)) & (self.seg[lo_c] == seg[ok]) & (self.seg[hi_c] == seg[ok]))
+        span = self.pos[hi_c] - self.pos[lo_c]
+        valid &= (span > 0) & (span <= max_gap)
+
+        w = np.where(valid, (positions[ok] - self.pos[lo_c]) / np.where(span > 0, span, 1), np.nan)
+        idx = np.flatnonzero(ok)
+        lat[idx] = self.lat[lo_c] + w * (self.lat[hi_c] - self.lat[lo_c])
+        lng[idx] = self.lng[lo_c] + w * (self.lng[hi_c] - self.lng[lo_c])
+        gap[idx] = np.where(valid, span, np.nan)
+        return lat, lng, gap
+
+
+class OfflineGeocoder:
+    """
+    以已知座標（主資料 / 經緯度快取）建立的離線地址比對：
+    1. 同一棟建物（路段 + 門牌 + 之N，忽略樓層）→ 該建物已知座標的中位數，信心 BUILDING_CONFIDENCE
+    2. 同一路段 / 巷弄前後最近的已知門牌線性內插（優先同側單雙號），信心 INTERPOLATED_CONFIDENCE
+    建物以 hash index、路段以排序鍵 + searchsorted 查詢，不逐列掃描已知資料。
+    """
+
+    def __init__(self, addresses: Iterable, lat, lng, max_gap: float = 30):
+        self.max_gap = max_gap
+        parts = parse_addresses(addresses)
+        known = pd.DataFrame({
+            "building_key": parts["building_key"],
+            "segment_key": parts["segment_key"],
+            "position": parts["position"],
+            "parity": parts["parity"],
+            "lat": pd.to_numeric(pd.Series(np.asarray(lat)), errors="coerce"),
+            "lng": pd.to_numeric(pd.Series(np.asarray(lng)), errors="coerce"),
+        }).dropna()
+
+        buildings = known.groupby("building_key", sort=False).agg(
+            segment_key=("segment_key", "first"),
+            position=("position", "first"),
+            parity=("parity", "first"),
+            lat=("lat", "median"),
+            lng=("lng", "median"),
+        )
+        self.buildings = buildings
+        self.building_index = buildings.index
+        self.segment_index = _SegmentIndex(buildings["segment_key"], buildings["position"],
+                                           buildings["lat"], buildings["lng"])
+        self.parity_index = _SegmentIndex(_parity_keys(buildings["segment_key"], buildings["parity"]),
+                                          buildings["position"], buildings["lat"], buildings["lng"])
+        print(f"[OfflineGeocoder] 已知建物 {len(buildings):,} 棟，路段 {len(self.segment_index.segments):,} 條")
+
+    def __len__(self):
+        return len(self.buildings)
+
+    @classmethod
+    def from_cache(cls, cache, **kwargs):
+        """由 GeocodeCache 的座標建立（不含離線比對寫入的推估座標）"""
+        placeholders = ",".join("?" * len(OFFLINE_SOURCES))
+        rows = cache.conn.execute(
+            f"SELECT address, lat, lng FROM geocode WHERE source NOT IN ({placeholders})", OFFLINE_SOURCES
+        ).fetchall()
+        known = pd.DataFrame(rows, columns=["address", "lat", "lng"])
+        return cls(known["address"], known["lat"], known["lng"], **kwargs)
+
+    @classmethod
+    def from_master(cls, master_path, chunksize: int = 200_000, **kwargs):
+        """由主資料（Parquet 目錄或 CSV）建立，只讀地址與經緯度，每批先去除重複地址"""
+        from etl_03_load.master_store import iter_master
+
+        cols = ["土地位置建物門牌", "緯度", "經度"]
+        chunks = [chunk.drop_duplicates(subset=cols) for chunk in iter_master(master_path, columns=cols,
+                                                                              chunksize=chunksize)]
+        known = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=cols)
+        return cls(known["土地位置建物門牌"], known["緯度"], known["經度"], **kwargs)
+
+    def geocode(self, addresses: Iterable) -> pd.DataFrame:
+        """
+        回傳與 addresses 同順序的 lat / lng / confidence / method
+        （method：building、interpolated；無法比對為 NaN / None）。
+        """
+        parts = parse_addresses(addresses)
+        n = len(parts)
+        lat, lng = np.full(n, np.nan), np.full(n, np.nan)
+        confidence = np.full(n, np.nan)
+        method = np.full(n, None, dtype=object)
+
+        loc = self.building_index.get_indexer(parts["building_key"])
+        hit = loc >= 0
+        lat[hit] = self.buildings["lat"].to_numpy()[loc[hit]]
+        lng[hit] = self.buildings["lng"].to_numpy()[loc[hit]]
+        confidence[hit] = BUILDING_CONFIDENCE
+        method[hit] = "building"
+
+        positions = parts["position"].to_numpy(dtype=float)
+        parity_key = _parity_keys(parts["segment_key"], parts["parity"])
+        for index, keys in ((self.parity_index, parity_key), (self.segment_index, parts["segment_key"])):
+            todo = np.flatnonzero(np.isnan(lat))
+            if len(todo) == 0:
+                break
+            i_lat, i_lng, gap = index.interpolate(keys.iloc[todo], positions[todo], self.max_gap)
+            found = ~np.isnan(i_lat)
+            rows = todo[found]
+            lat[rows], lng[rows] = i_lat[found], i_lng[found]
+            confidence[rows] = np.where(gap[found] <= NEAR_GAP, INTERPOLATED_CONFIDENCE, FAR_CONFIDENCE)
+            method[rows] = "interpolated"
+
+        return pd.DataFrame({"lat": lat, "lng": lng, "confidence": confidence, "method": method})
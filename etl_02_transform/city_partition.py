@@ -0,0 +1,172 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import pandas as pd
+
+from etl_02_transform.date_houseage import DateHouseAge
+from etl_02_transform.elevator_processing import ElevatorProcessing
+from etl_02_transform.filter_basic import FilterBasic
+from etl_02_transform.floor_processing import FloorProcessing
+from etl_02_transform.material_processing import MaterialProcessing, main_material_modes
+from etl_02_transform.parking_processing import (
+    ParkingProcessing,
+    fit_parking_price_model,
+    parking_type_modes,
+)
+from etl_02_transform.price_final_cleaning import PriceFinalCleaning
+
+# 原始檔名第一碼 → 縣市（A 臺北市、F 新北市、H 桃園市）
+CITY_CODES = {"A": "臺北市", "F": "新北市", "H": "桃園市"}
+
+
+def _identity(obj):
+    return obj
+
+
+def city_codes(df: pd.DataFrame) -> pd.Series:
+    if "來源檔名" not in df.columns:
+        return pd.Series("", index=df.index)
+    return df["來源檔名"].astype(str).str[0]
+
+
+def split_partitions(df: pd.DataFrame, max_rows=None):
+    """
+    依 來源檔名 縣市分區；max_rows 指定時同一縣市再切成不超過 max_rows 的區塊
+    （只適用逐列獨立的步驟，例如不含 編號 去重的步驟）。
+    """
+    parts = []
+    for _, part in df.groupby(city_codes(df), sort=True):
+        if max_rows is None or len(part) <= max_rows:
+            parts.append(part)
+        else:
+            parts.extend(part.iloc[i:i + max_rows] for i in range(0, len(part), max_rows))
+    return parts
+
+
+# ---- 各 stage 的分區步驟：step(df, stats, wrap) ----
+# stats 為分區前以整批資料算好的全域統計（廣播到每個分區）；wrap 用於單一程序時包裝 MetricsRecorder.instrument
+
+def filter_basic_step(df, stats=None, wrap=_identity):
+    # 編號 去重只在縣市內進行（不同縣市的 編號 不重複），屬分區內步驟
+    filter_basic = wrap(FilterBasic(df, owned=True))
+    filter_basic.apply_filter_plan()
+    filter_basic.add_city_from_source()
+    return filter_basic.df
+
+
+def house_age_step(df, stats=None, wrap=_identity):
+    house_age = wrap(DateHouseAge(df, owned=True))
+    house_age.parse_dates()
+    house_age.calculate_house_age()
+    house_age.drop_abnormal_houseage()
+    return house_age.df
+
+
+PARKING_STAT_COLUMNS = [
+    "建物移轉總面積平方公尺", "車位移轉總面積平方公尺", "總價元", "車位總價元", "交易筆棟數", "車位類別", "建物型態",
+]
+
+
+def fit_parking_stats(df, stats=None):
+    """
+    車位類別眾數與車位總價模型都是全域統計：以整批資料的必要欄位先跑 process_parking，
+    再計算眾數、補車位類別、訓練模型，結果廣播給各分區。
+    stats 已提供的項目（例如持久化的車位總價模型）不重新計算。
+    """
+    stats = dict(stats or {})
+    parking = ParkingProcessing(df[[c for c in PARKING_STAT_COLUMNS if c in df.columns]])
+    parking.process_parking()
+    if stats.get("parking_type_modes") is None:
+        stats["parking_type_modes"] = parking_type_modes(parking.df) if "建物型態" in parking.df.columns else None
+    if stats.get("parking_price_model") is None:
+        parking.impute_parking_type(stats["parking_type_modes"])
+        stats["parking_price_model"] = fit_parking_price_model(parking.df)
+    return stats
+
+
+def parking_step(df, stats=None, wrap=_identity):
+    stats = stats or {}
+    parking = wrap(ParkingProcessing(df, owned=True))
+    parking.process_parking()
+    parking.impute_parking_type(stats.get("parking_type_modes"))
+    parking.impute_parking_price_rf(stats.get("parking_price_model"))
+    parking.calculate_parking_price_per_ping()
+    return parking.df
+
+
+def fit_material_stats(df, stats=None):
+    stats = dict(stats or {})
+    if stats.get("main_material_modes") is None and "主要建材" in df.columns and "建物型態" in df.columns:
+        stats["main_material_modes"] = main_material_modes(df)
+    return stats
+
+
+def material_step(df, stats=None, wrap=_identity):
+    material = wrap(MaterialProcessing(df, owned=True))
+    material.impute_main_material((stats or {}).get("main_material_modes"))
+    return material.df
+
+
+def floor_step(df, stats=None, wrap=_identity):
+    floor = wrap(FloorProcessing(df))
+    floor.total_floor()
+    floor.count_transfer_floors()
+    floor.extract_highest_floor()
+    return floor.df
+
+
+def price_clean_step(df, stats=None, wrap=_identity):
+    price_clean = wrap(PriceFinalCleaning(df))
+    price_clean.price_ping()
+    price_clean.drop_missing_core_fields()
+    return price_clean.df
+
+
+def elevator_step(df, stats=None, wrap=_identity):
+    elevator = wrap(ElevatorProcessing(df, owned=True))
+    elevator.infer_elevator()
+    return elevator.df
+
+
+# stage 名稱 → (分區步驟, 全域統計, 是否可在縣市內再切塊)
+STEPS = {
+    "filter_basic": (filter_basic_step, None, False),
+    "house_age": (house_age_step, None, True),
+    "parking": (parking_step, fit_parking_stats, True),
+    "material": (material_step, fit_material_stats, True),
+    "floor": (floor_step, None, True),
+    "price_clean": (price_clean_step, None, True),
+    "elevator": (elevator_step, None, True),
+}
+
+
+def _run_part(step, part, stats):
+    import contextlib
+    import io
+
+    # 子程序的逐列訊息不輸出，避免多個分區交錯
+    with contextlib.redirect_stdout(io.StringIO()):
+        return step(part, stats)
+
+
+def run_step(name: str, df: pd.DataFrame, workers: int = 1, wrap=None, max_rows: int = 200_000, stats=None):
+    """
+    執行一個 transform stage。
+    workers <= 1：整批在本程序執行（與逐步呼叫各類別相同，可用 wrap 記錄各方法）。
+    workers > 1 ：先以整批資料計算全域統計，依縣市（及 max_rows 區塊）分區丟進 process pool，
+                  結果依原本列順序合併。
+    stats：預先準備的全域統計（例如持久化的模型），兩種模式都會使用，未提供的項目才由整批資料計算。
+    """
+    step, fit, chunkable = STEPS[name]
+    if workers <= 1:
+        return step(df, stats, wrap or _identity)
+
+    stats = fit(df, stats) if fit else stats
+    parts = split_partitions(df, max_rows if chunkable else None)
+    print(f"[CityPartition] {name}: {len(parts)} 個分區，{workers} 個 worker")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_run_part, repeat(step), parts, repeat(stats)))
+
+    out = pd.concat(results) if results else df.iloc[0:0]
+    if df.index.is_monotonic_increasing:
+        out = out.sort_index(kind="stable")
+    return out
@@ -0,0 +1,28 @@
+import pandas as pd
+
+PANDAS_MAJOR = int(pd.__version__.split(".")[0])
+
+
+def copy_on_write_enabled() -> bool:
+    # pandas 3 起固定為 copy-on-write；pandas 2.x 需手動開啟
+    return PANDAS_MAJOR >= 3 or pd.get_option("mode.copy_on_write") is True
+
+
+def enable_copy_on_write():
+    """pandas 2.x 開啟 copy-on-write（pandas 3 不需設定）"""
+    if not copy_on_write_enabled():
+        pd.set_option("mode.copy_on_write", True)
+
+
+def adopt(df: pd.DataFrame, owned: bool = False) -> pd.DataFrame:
+    """
+    stage 類別取得輸入 df 的方式（取代 __init__ 裡的 df.copy()）：
+    - owned=True：呼叫端把 df 交給 stage，之後不再使用原本的 df，直接沿用不複製
+    - copy-on-write 下淺複製即可，欄位被修改時才會各自複製，不影響呼叫端
+    - 兩者皆否（pandas 2.x 未開 CoW）時維持完整複製
+    """
+    if owned:
+        return df
+    if copy_on_write_enabled():
+        return df.copy(deep=False)
+    return df.copy()
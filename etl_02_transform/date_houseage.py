@@ -1,47 +1,34 @@
 import os
 import pandas as pd
+from etl_02_transform.copy_mode import adopt
+from etl_02_transform.roc_date import parse_roc_date, roc_parts_to_datetime
 
 class DateHouseAge:
 
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    def __init__(self, df: pd.DataFrame, owned: bool = False):
+        self.df = adopt(df, owned)
 
     def parse_dates(self):
-
-        def parse_date(date_str):
-            try:
-                s = str(date_str)
-                if len(s) == 7 and s.isdigit():
-                    y, m, d = int(s[:3]) + 1911, int(s[3:5]), int(s[5:7])
-                elif len(s) == 6 and s.isdigit():
-                    y, m, d = int(s[:2]) + 1911, int(s[2:4]), int(s[4:6])
-                else:
-                    return None, None, None
-                if not (1900 <= y <= 2100 and 1 <= m <= 12 and 1 <= d <= 31):
-                    return None, None, None
-                return y, m, d
-            except Exception:
-                return None, None, None
-
-        self.df[["交易年", "交易月", "交易日"]] = self.df["交易年月日"].astype(str).apply(
-            lambda x: pd.Series(parse_date(x))
-        )
-        self.df[["建築年", "建築月", "建築日"]] = self.df["建築完成年月"].astype(str).apply(
-            lambda x: pd.Series(parse_date(x))
-        )
+        """整欄向量化解析民國日期，同時產生 datetime64 欄位供屋齡計算"""
+        for src, prefix, date_col in [("交易年月日", "交易", "交易日期"), ("建築完成年月", "建築", "建築日期")]:
+            parts = parse_roc_date(self.df[src])
+            self.df[f"{prefix}年"] = parts["year"]
+            self.df[f"{prefix}月"] = parts["month"]
+            self.df[f"{prefix}日"] = parts["day"]
+            self.df[date_col] = roc_parts_to_datetime(parts)
         return self
 
     def calculate_house_age(self):
         """屋齡與預售屋欄位"""
-        # datetime 轉換
-        self.df["交易日期"] = pd.to_datetime(
-            dict(year=self.df["交易年"], month=self.df["交易月"], day=self.df["交易日"]),
-            errors="coerce"
-        )
-        self.df["建築日期"] = pd.to_datetime(
-            dict(year=self.df["建築年"], month=self.df["建築月"], day=self.df["建築日"]),
-            errors="coerce"
-        )
+        # datetime 轉換（parse_dates 已產生時直接沿用）
+        for prefix, date_col in [("交易", "交易日期"), ("建築", "建築日期")]:
+            if date_col not in self.df.columns:
+                parts = pd.DataFrame({
+                    "year": self.df[f"{prefix}年"],
+                    "month": self.df[f"{prefix}月"],
+                    "day": self.df[f"{prefix}日"],
+                }).astype("float64")
+                self.df[date_col] = roc_parts_to_datetime(parts)
 
         # 屋齡（年）
         self.df["屋齡"] = (self.df["交易日期"] - self.df["建築日期"]).dt.days / 365
@@ -62,8 +49,8 @@ class DateHouseAge:
     def drop_abnormal_houseage(self):
         # 移除缺屋齡
         self.df['屋齡'] = self.df['屋齡'].fillna(-10)
-        # -5 > 屋齡 清除         
-        self.df = self.df.loc[self.df["屋齡"] <= -5].copy() 
+        # -5 > 屋齡 清除（保留 屋齡 > -5）
+        self.df = self.df.loc[self.df["屋齡"] > -5]
 
         return self
 
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+
+def map_distinct(series: pd.Series, func, n_out: int = 1, dtype=None):
+    """
+    只對欄位中的相異值呼叫 func，再依 factorize 代碼廣播回整欄（NaN 以 None 呼叫一次）。
+    回傳與 series 同 index 的 Series（dtype 未指定時為 object）；
+    n_out > 1 時 func 回傳長度 n_out 的 tuple，回傳 n_out 個 Series。
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    # codes 為 -1 (NaN) 時取最後一格 func(None)
+    results = [func(v) for v in uniques] + [func(None)]
+    if n_out == 1:
+        results = [(r,) for r in results]
+
+    outputs = []
+    for i in range(n_out):
+        values = [r[i] for r in results]
+        table = pd.array(values, dtype=dtype) if dtype is not None else np.array(values, dtype=object)
+        outputs.append(pd.Series(table[codes], index=series.index))
+    return outputs[0] if n_out == 1 else outputs
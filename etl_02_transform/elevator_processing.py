@@ -1,10 +1,11 @@
 import os
 import pandas as pd
+from etl_02_transform.copy_mode import adopt
 
 class ElevatorProcessing:
 
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    def __init__(self, df: pd.DataFrame, owned: bool = False):
+        self.df = adopt(df, owned)
 
     def infer_elevator(self):
         
@@ -13,20 +14,22 @@ class ElevatorProcessing:
             self.df["電梯"] = pd.NA
 
         s = self.df["電梯"].astype(str)
-        self.df.loc[s.str.contains("有", na=False), "電梯"] = 1
-        self.df.loc[s.str.contains("無", na=False), "電梯"] = 0
+        # 另建數值欄再寫回：pandas 3 的字串欄不能直接填入 0 / 1
+        elevator = pd.to_numeric(self.df["電梯"], errors="coerce").astype("Float64")
+        elevator[s.str.contains("有", na=False)] = 1
+        elevator[s.str.contains("無", na=False)] = 0
 
-        mask = self.df["電梯"].isna()
+        mask = elevator.isna()
         if "建物型態" in self.df.columns:
             t = self.df["建物型態"].astype(str)
             no_elev = (
                 t.str.contains(r"公寓", na=False)
                 | t.str.contains("透天厝", na=False)
             )
-            self.df.loc[mask & no_elev, "電梯"] = 0
-            self.df.loc[mask & ~no_elev, "電梯"] = 1
+            elevator[mask & no_elev] = 0
+            elevator[mask & ~no_elev] = 1
 
-        self.df["電梯"] = self.df["電梯"].astype("Int64")
+        self.df["電梯"] = elevator.astype("Int64")
         return self
     
 
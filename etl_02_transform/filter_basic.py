@@ -1,37 +1,134 @@
 import os
-import pandas as pd
 import re
+import numpy as np
+import pandas as pd
+from etl_01_extract.io_handler import IOHandler
+from etl_02_transform.copy_mode import adopt
+from etl_02_transform.distinct_values import map_distinct
+
+# 私有區（PUA）字元；非 raw string：直接放入實際字元，pyarrow 字串（RE2）不支援 \u 跳脫
+PUA_CHAR_PATTERN = '[\uE000-\uF8FF]'
+
+# filter plan 預設規則（依序計算每條規則新刪除的筆數）
+FILTER_PLAN = (
+    "remove_pua_chars_from_address",
+    "drop_duplicates_by_id",
+    "filter_out_transaction_targets",
+    "keep_residential_usage",
+    "keep_urban_zone_residential",
+    "filter_out_non_urban_zones",
+    "remove_notes_with_keywords",
+    "cleaning_house_type",
+)
+
+
+def isin_mask(series: pd.Series, values) -> np.ndarray:
+    """類別式 isin：只比對相異值（categorical 直接用 codes），再依代碼廣播；NaN 一律 False"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    hit = np.append(pd.Index(uniques).isin(list(values)), False)
+    return hit[codes]
+
+
+def strip_house_type(value):
+    """'住宅大樓(11層含以上有電梯)' → '住宅大樓'"""
+    return None if value is None else str(value).split('(')[0]
+
 
 class FilterBasic:
+    """
+    基礎過濾。各過濾方法可單獨呼叫（每次套用一次）；apply_filter_plan 則在原始欄位上
+    計算所有規則的 boolean mask，最後只套用一次合併後的 mask，仍會回報每條規則刪除的筆數。
+    """
+
+    def __init__(self, df: pd.DataFrame, owned: bool = False):
+        # owned=True：呼叫端交出 df 所有權，不做防禦性複製（見 copy_mode.adopt）
+        self.df = adopt(df, owned)
+        # 最近一次 apply_filter_plan 的各規則刪除筆數（MetricsRecorder.instrument 會一併記錄）
+        self.step_metrics = {}
+
+    def _apply(self, keep):
+        self.df = self.df[keep]
+        return self
 
+    # ---- 各規則的保留 mask（numpy bool，對齊 self.df；欄位不存在且可略過時回傳 None）----
 
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    def _keep_remove_pua_chars_from_address(self, keep, address_column: str = "土地位置建物門牌"):
+        if address_column not in self.df.columns:
+            print(f"[FilterBasic]  地址欄位 '{address_column}' 不存在，跳過清理。")
+            return None
+        pattern = re.compile(PUA_CHAR_PATTERN)
+        return ~map_distinct(self.df[address_column], lambda v: v is not None and bool(pattern.search(str(v)))).astype(bool)
 
+    def _keep_drop_duplicates_by_id(self, keep):
+        if "編號" not in self.df.columns:
+            return None
+        # 只在前面規則保留的列中判斷重複（與逐步套用時相同：保留第一筆）
+        mask = np.ones(len(self.df), dtype=bool)
+        mask[keep] = ~self.df["編號"][keep].duplicated(keep="first").to_numpy()
+        return mask
 
+    def _keep_filter_out_transaction_targets(self, keep, banned=("土地", "車位")):
+        return ~isin_mask(self.df["交易標的"], banned)
 
-    def remove_pua_chars_from_address(self, address_column: str = "土地位置建物門牌"):
-        before_len = len(self.df)
-        
-        if address_column in self.df.columns:
-            PUA_CHAR_PATTERN = r'[\uE000-\uF8FF]'
-            rows_to_drop_mask = self.df[address_column].astype(str).str.contains(
-                PUA_CHAR_PATTERN, 
-                regex=True,
-                na=False
-            )
+    def _keep_keep_residential_usage(self, keep, allowed=("住家用", "國民住宅", "集合住宅")):
+        return isin_mask(self.df["主要用途"], allowed)
 
+    def _keep_keep_urban_zone_residential(self, keep, allowed=("住",)):
+        return isin_mask(self.df["都市土地使用分區"], allowed)
 
-            self.df = self.df[~rows_to_drop_mask].copy()
+    def _keep_filter_out_non_urban_zones(self, keep, exclude=("一般農業區", "鄉村區", "山坡地保育區", "特定農業區")):
+        col = "非都市土地使用分區"
+        if col not in self.df.columns:
+            return None
+        return ~isin_mask(self.df[col], exclude)
+
+    def _keep_remove_notes_with_keywords(self, keep, keywords=("親友", "親戚", "朋友", "員工", "特殊")):
+        if "備註" not in self.df.columns:
+            return None
+        # 所有關鍵字合併成單一 pattern，每個相異備註只比對一次
+        pattern = re.compile("|".join(re.escape(str(k)) for k in keywords))
+        return ~map_distinct(self.df["備註"], lambda v: v is not None and bool(pattern.search(str(v)))).astype(bool)
+
+    def _keep_cleaning_house_type(self, keep, target_types=('住宅大樓', '華廈', '公寓', '透天厝', '套房')):
+        return isin_mask(map_distinct(self.df['建物型態'], strip_house_type), target_types)
+
+    def apply_filter_plan(self, rules=FILTER_PLAN):
+        """
+        依 rules 順序計算各規則的保留 mask 並累積（每條規則只計入前面規則尚未刪除的列），
+        最後一次套用。cleaning_house_type 的型態整理只對保留下來的列進行。
+        """
+        before = len(self.df)
+        keep = np.ones(before, dtype=bool)
+        drop_counts = {}
+        for rule in rules:
+            mask = getattr(self, f"_keep_{rule}")(keep)
+            if mask is None:
+                continue
+            drop_counts[rule] = int((keep & ~mask).sum())
+            keep &= mask
+
+        self._apply(keep)
+        if "cleaning_house_type" in rules:
+            self.df['建物型態'] = map_distinct(self.df['建物型態'], strip_house_type)
+
+        for rule, n in drop_counts.items():
+            print(f"[FilterBasic]  {rule}: 刪除 {n:,} 筆")
+        print(f"[FilterBasic] 過濾完成：{before:,} → {len(self.df):,} 筆")
+        self.step_metrics = {"drop_counts": drop_counts}
+        return self
 
+    # ---- 單一規則（逐步套用）----
+
+    def remove_pua_chars_from_address(self, address_column: str = "土地位置建物門牌"):
+        before_len = len(self.df)
+        mask = self._keep_remove_pua_chars_from_address(None, address_column)
+        if mask is not None:
+            self._apply(mask)
             num_dropped = before_len - len(self.df)
             if num_dropped > 0:
                 print(f"[FilterBasic]  地址清理: 刪除 {num_dropped} 筆包含 PUA 亂碼的資料。")
             else:
                 print("[FilterBasic]  地址清理: 未發現需要刪除的 PUA 亂碼。")
-        else:
-            print(f"[FilterBasic]  地址欄位 '{address_column}' 不存在，跳過清理。")
-            
         return self
 
     def drop_duplicates_by_id(self):
@@ -70,32 +167,25 @@ class FilterBasic:
 
     # 過濾欄位
     def filter_out_transaction_targets(self, banned=("土地", "車位")):
-        self.df = self.df[~self.df["交易標的"].isin(list(banned))]
-        return self
+        return self._apply(self._keep_filter_out_transaction_targets(None, banned))
 
     def keep_residential_usage(self, allowed=("住家用", "國民住宅", "集合住宅")):
-        self.df = self.df[self.df["主要用途"].isin(list(allowed))]
-        return self
+        return self._apply(self._keep_keep_residential_usage(None, allowed))
 
     def keep_urban_zone_residential(self, allowed=("住",)):
-        self.df = self.df[self.df["都市土地使用分區"].isin(list(allowed))]
-        return self
+        return self._apply(self._keep_keep_urban_zone_residential(None, allowed))
 
     def filter_out_non_urban_zones(self, exclude=("一般農業區", "鄉村區", "山坡地保育區", "特定農業區")):
-        col = "非都市土地使用分區"
-        if col in self.df.columns:
-            self.df = self.df[~self.df[col].isin(list(exclude))]
-        return self
+        mask = self._keep_filter_out_non_urban_zones(None, exclude)
+        return self if mask is None else self._apply(mask)
 
     def remove_notes_with_keywords(self, keywords=("親友", "親戚", "朋友", "員工", "特殊")):
-        if "備註" in self.df.columns:
-            pattern = "|".join(map(str, keywords))
-            self.df = self.df[~self.df["備註"].astype(str).str.contains(pattern, na=False)]
-        return self
-        
-    def cleaning_house_type(self,target_types =('住宅大樓', '華廈', '公寓', '透天厝','套房') ):
-        self.df['建物型態'] = self.df['建物型態'].astype(str).str.split('(').str[0]
-        self.df = self.df[self.df['建物型態'].isin(target_types)].copy()
+        mask = self._keep_remove_notes_with_keywords(None, keywords)
+        return self if mask is None else self._apply(mask)
+
+    def cleaning_house_type(self, target_types=('住宅大樓', '華廈', '公寓', '透天厝', '套房')):
+        self.df['建物型態'] = map_distinct(self.df['建物型態'], strip_house_type)
+        self.df = self.df[isin_mask(self.df['建物型態'], target_types)]
         return self
 
     def add_city_from_source(self):
@@ -110,28 +200,15 @@ def main():
     PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
     input_path = os.path.join(PROJECT_ROOT, "main_house_rawdata", "merged_rawdata.csv")
     
-    # 建議先處理編碼問題，再讀取 CSV
-    # 這是為了避免在讀取檔案時，特殊字元就變成無法修復的亂碼
-    try:
-        # 假設您的 CSV 是 UTF-8 編碼 (推薦)
-        df = pd.read_csv(input_path, encoding="utf-8-sig")
-    except UnicodeDecodeError:
-        # 如果不是 UTF-8，則嘗試 CP950
-        df = pd.read_csv(input_path, encoding="cp950")
+    # 編碼（UTF-8 / big5 / CP950）與分隔符號由檔頭偵測，只解析一次
+    df = IOHandler(input_path=input_path).load()
 
 
     filter_basic = FilterBasic(df)
-    filter_basic = filter_basic.drop_duplicates_by_id()
+
+    # 🌟 亂碼地址、重複編號與各欄位過濾一次套用
+    filter_basic = filter_basic.apply_filter_plan()
     filter_basic = filter_basic.unify_columns()
-    
-    # 🌟 在其他篩選之前先移除亂碼地址
-    filter_basic = filter_basic.remove_pua_chars_from_address()
-    
-    filter_basic = filter_basic.filter_out_transaction_targets()
-    filter_basic = filter_basic.keep_residential_usage()
-    filter_basic = filter_basic.keep_urban_zone_residential()
-    filter_basic = filter_basic.filter_out_non_urban_zones()
-    filter_basic = filter_basic.remove_notes_with_keywords()
     filter_basic = filter_basic.add_city_from_source()
 
     df = filter_basic.df
@@ -1,83 +1,83 @@
 import os
 import re
-import numpy as np
 import pandas as pd
+from etl_02_transform.distinct_values import map_distinct
+
+CN_DIGITS = {'零': 0, '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+
+# 單一數字：阿拉伯數字 / 零~九 / [X]十[Y]
+NUMERAL_PATTERN = re.compile(r'^(?:([0-9]+)|([零一二三四五六七八九])|([一二三四五六七八九])?十([一二三四五六七八九])?)$')
+
+# 移轉層次 樓層 token：(地下)(數字)層，其他如 夾層、騎樓、陽台、屋頂突出物 不計入
+FLOOR_TOKEN_PATTERN = re.compile(r'(地下)?([一二三四五六七八九十]+|[0-9]+)層')
+
+
+def numeral_to_int(s: str):
+    """中文 / 阿拉伯數字轉整數，無法解析回傳 None"""
+    m = NUMERAL_PATTERN.match(s)
+    if not m:
+        return None
+    arabic, single, tens, ones = m.groups()
+    if arabic is not None:
+        return int(arabic)
+    if single is not None:
+        return CN_DIGITS[single]
+    return (CN_DIGITS[tens] if tens else 1) * 10 + (CN_DIGITS[ones] if ones else 0)
+
+
+def parse_total_floor(value):
+    """總樓層數：'十二層' / '12' → 12，0 或無法解析 → None"""
+    num = numeral_to_int(str(value).strip().replace('層', ''))
+    return None if not num else num
+
+
+def parse_transfer_floors(text):
+    """
+    移轉層次一次解析：回傳 (移轉樓層總數, 最高交易樓層)。
+    '全' → (0, 0)；地下樓層為負數；無任何樓層 token → (None, None)
+    """
+    t = str(text)
+    if '全' in t:
+        return 0, 0
+    levels = []
+    for basement, numeral in FLOOR_TOKEN_PATTERN.findall(t):
+        num = numeral_to_int(numeral)
+        if num is None:
+            continue
+        levels.append(-num if basement else num)
+    if not levels:
+        return None, None
+    return len(levels), max(levels)
+
 
 class FloorProcessing:
 
     def __init__(self, df: pd.DataFrame):
         self.df = df
+        self._transfer_parsed = None
 
-    def total_floor(self): 
-        cn = {'零':0,'一':1,'二':2,'三':3,'四':4,'五':5,'六':6,'七':7,'八':8,'九':9}
-        def _convert(value):
-            try:
-                s = str(value).strip().replace('層', '')
-                if s.isdigit():
-                    num = int(s)
-                    return np.nan if num == 0 else num
-                if s == '十':
-                    return 10
-                if s.startswith('十'):
-                    return 10 + cn.get(s[1:], 0)
-                if s.endswith('十'):
-                    return cn.get(s[0], 0) * 10
-                m = re.match(r'^([一二三四五六七八九])十([一二三四五六七八九])$', s)
-                if m:
-                    return cn[m.group(1)] * 10 + cn[m.group(2)]
-                if s in cn:
-                    num = cn[s]
-                    return np.nan if num == 0 else num
-            except:
-                pass
-            return np.nan
+    def _parse_transfer_column(self):
+        # 移轉層次只掃描一次，count_transfer_floors / extract_highest_floor 共用結果
+        if self._transfer_parsed is None or not self._transfer_parsed[0].index.equals(self.df.index):
+            self._transfer_parsed = map_distinct(self.df['移轉層次'], parse_transfer_floors, n_out=2, dtype='Int64')
+        return self._transfer_parsed
 
+    def total_floor(self):
         if '總樓層數' in self.df.columns:
-            self.df['總樓層數'] = self.df['總樓層數'].apply(_convert).astype('Int64')
+            self.df['總樓層數'] = map_distinct(self.df['總樓層數'], parse_total_floor, dtype='Int64')
         return self
 
     def count_transfer_floors(self):
-        
-        def _count(text): 
-            if pd.isnull(text): return pd.NA
-            t = str(text)
-            if '全' in t: return 0
-            basement = re.findall(r'地下([一二三四五六七八九十]{1,5})層', t)
-            normal   = re.findall(r'(?<!地下)([一二三四五六七八九十]{1,5})層', t)
-            total = len(basement) + len(normal)
-            return total if total > 0 else pd.NA
-
-        if '移轉層次' in self.df.columns: 
-            self.df['移轉樓層總數'] = self.df['移轉層次'].apply(_count).astype('Int64')
+        if '移轉層次' in self.df.columns:
+            counts, _ = self._parse_transfer_column()
+            self.df['移轉樓層總數'] = counts
         return self
 
     def extract_highest_floor(self):
-        
-        def cn2int(s: str) -> int: 
-            cn = {'一':1,'二':2,'三':3,'四':4,'五':5,'六':6,'七':7,'八':8,'九':9,'十':10}
-            if s.isdigit(): return int(s)
-            if s in cn: return cn[s]
-            if '十' in s:
-                left, right = s.split('十') if '十' in s else (s, '')
-                if left == '':
-                    return 10 + (cn.get(right, 0) if right != '' else 0)
-                else:
-                    return cn.get(left, 0) * 10 + (cn.get(right, 0) if right != '' else 0)
-            return 0
-
-        def _highest(text):
-            if pd.isnull(text): return pd.NA
-            t = str(text)
-            if '全' in t: return 0
-            basement = [-cn2int(x) for x in re.findall(r'地下([一二三四五六七八九十0-9]+)層', t)]
-            above    = [ cn2int(x) for x in re.findall(r'(?<!地下)([一二三四五六七八九十0-9]+)層', t)]
-            all_lvls = basement + above
-            return max(all_lvls) if all_lvls else pd.NA
-
         if '移轉層次' in self.df.columns:
-            self.df['最高交易樓層'] = self.df['移轉層次'].apply(_highest)
+            _, highest = self._parse_transfer_column()
+            self.df['最高交易樓層'] = highest
             self.df = self.df[(self.df['最高交易樓層'].isna()) | (self.df['最高交易樓層'] >= 0)]
-            self.df['最高交易樓層'] = self.df['最高交易樓層'].astype('Int64')
         return self
 
 
@@ -0,0 +1,113 @@
+import sqlite3
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+import pandas as pd
+from etl_03_load.master_store import iter_master
+
+# 各來源預設信心值：離線比對低於爬蟲，爬到的座標可覆蓋離線結果
+SOURCE_CONFIDENCE = {
+    "master": 1.0,
+    "google_maps": 0.8,
+    "http_geocoder": 0.8,
+    "offline_building": 0.75,
+    "offline_interpolated": 0.6,
+}
+
+# SQLite 單一語句變數上限 999，批次查詢分段
+_BATCH_SIZE = 500
+
+
+def normalize_address(address) -> str:
+    """地址正規化：全形轉半形、台→臺、去除空白"""
+    if address is None or (not isinstance(address, str) and pd.isna(address)):
+        return ""
+    s = unicodedata.normalize("NFKC", str(address))
+    return "".join(s.replace("台", "臺").split())
+
+
+class GeocodeCache:
+    """
+    以正規化地址為 key 的經緯度快取（SQLite）。
+    每筆記錄來源、時間與信心值，爬到的座標即時寫入。
+    """
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = cache_path or ":memory:"
+        if self.cache_path != ":memory:":
+            Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.cache_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocode (
+                address    TEXT PRIMARY KEY,
+                lat        REAL NOT NULL,
+                lng        REAL NOT NULL,
+                source     TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def lookup_many(self, addresses: Iterable) -> pd.DataFrame:
+        """批次查詢，回傳 address / lat / lng / source / confidence / updated_at（address 為正規化後）"""
+        keys = sorted({normalize_address(a) for a in addresses} - {""})
+        rows = []
+        for i in range(0, len(keys), _BATCH_SIZE):
+            chunk = keys[i:i + _BATCH_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(self.conn.execute(
+                f"SELECT address, lat, lng, source, confidence, updated_at FROM geocode WHERE address IN ({placeholders})",
+                chunk,
+            ).fetchall())
+        return pd.DataFrame(rows, columns=["address", "lat", "lng", "source", "confidence", "updated_at"])
+
+    def put(self, address, lat, lng, source: str = "google_maps", confidence: Optional[float] = None):
+        """寫入單筆座標並立即 commit；既有記錄信心值較高時不覆蓋"""
+        self.put_many([(address, lat, lng)], source=source, confidence=confidence)
+
+    def put_many(self, records, source: str, confidence: Optional[float] = None):
+        if confidence is None:
+            confidence = SOURCE_CONFIDENCE.get(source, 0.5)
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [
+            (key, float(lat), float(lng), source, confidence, now)
+            for key, lat, lng in ((normalize_address(a), lat, lng) for a, lat, lng in records)
+            if key and pd.notna(lat) and pd.notna(lng)
+        ]
+        self.conn.executemany(
+            """
+            INSERT INTO geocode (address, lat, lng, source, confidence, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(address) DO UPDATE SET
+                lat = excluded.lat, lng = excluded.lng, source = excluded.source,
+                confidence = excluded.confidence, updated_at = excluded.updated_at
+            WHERE excluded.confidence >= geocode.confidence
+            """,
+            rows,
+        )
+        self.conn.commit()
+        return len(rows)
+
+    def import_master(self, master_path, chunksize: int = 200_000):
+        """由主資料（Parquet 目錄或 CSV）匯入已知座標，只讀地址與經緯度三欄並分段處理"""
+        cols = ["土地位置建物門牌", "緯度", "經度"]
+        total = 0
+        for chunk in iter_master(master_path, columns=cols, chunksize=chunksize):
+            chunk["緯度"] = pd.to_numeric(chunk["緯度"], errors="coerce")
+            chunk["經度"] = pd.to_numeric(chunk["經度"], errors="coerce")
+            chunk = chunk.dropna(subset=["緯度", "經度"])
+            total += self.put_many(chunk[cols].itertuples(index=False, name=None), source="master")
+        print(f"[GeocodeCache] 由主資料匯入 {total:,} 筆座標")
+        return total
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,209 @@
+import abc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Optional
+from urllib.parse import unquote_plus
+import requests
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from etl_02_transform.geocode_cache import normalize_address
+
+
+def extract_coordinates_from_url(url: str):
+    """Google Maps 網址 '.../@緯度,經度,17z' 取出座標字串"""
+    try:
+        parts = url.split("@")
+        if len(parts) > 1:
+            coords = parts[1].split(",")[:2]
+            if len(coords) == 2:
+                return coords[0], coords[1]
+    except Exception as e:
+        print("擷取經緯度錯誤：", e)
+    return None, None
+
+
+def extract_place_from_url(url: str):
+    """Google Maps 網址 '.../maps/place/地點名稱/@...' 取出地點名稱（已解碼），不是地點頁時回傳 None"""
+    if "/place/" not in url:
+        return None
+    return unquote_plus(url.split("/place/", 1)[1].split("/", 1)[0]) or None
+
+
+class TokenBucket:
+    """執行緒安全的 token bucket，所有 worker 共用同一個速率上限"""
+
+    def __init__(self, max_per_minute: float, burst: Optional[int] = None):
+        self.rate = max_per_minute / 60.0
+        self.capacity = burst or 1
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Geocoder(abc.ABC):
+    """geocoder 介面：geocode(address) 回傳 (lat, lng)，查無結果回傳 (None, None)"""
+
+    source = "geocoder"
+
+    @abc.abstractmethod
+    def geocode(self, address: str):
+        ...
+
+    def close(self):
+        pass
+
+
+class SeleniumGeocoder(Geocoder):
+    """Google Maps 搜尋框查詢，以網址換成本次查詢的地點頁（/place/）判斷完成，不使用固定 sleep"""
+
+    source = "google_maps"
+    SEARCH_BOX = "input.fontBodyMedium.searchboxinput.xiQnY"
+
+    def __init__(self, timeout: float = 10):
+        self.timeout = timeout
+
+        my_options = webdriver.ChromeOptions()
+        my_options.add_argument("--start-maximized")
+        my_options.add_argument("--incognito")
+        my_options.add_argument("--disable-popup-blocking")
+        my_options.add_argument("--disable-notifications")
+        my_options.add_argument("--lang=zh-TW")
+        self.driver = webdriver.Chrome(options=my_options)
+        self.driver.get("https://www.google.com/maps")
+
+    def geocode(self, address: str):
+        wait = WebDriverWait(self.driver, self.timeout)
+        txtInput = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, self.SEARCH_BOX)))
+
+        prev_url = self.driver.current_url
+        prev_place = extract_place_from_url(prev_url)
+        query = normalize_address(address)
+
+        txtInput.clear()
+        txtInput.send_keys(address)
+        txtInput.send_keys(Keys.ENTER)
+
+        def arrived(d):
+            # 換到另一個地點頁（/place/ 段落為本次查詢或 Google 改寫的正式名稱）即完成；
+            # 連續查同一地址時網址不變，地點名稱與查詢相同即可（不再要求座標改變）
+            url = d.current_url
+            place = extract_place_from_url(url)
+            if place is None or extract_coordinates_from_url(url) == (None, None):
+                return False
+            return (url != prev_url and place != prev_place) or normalize_address(place) == query
+
+        wait.until(arrived)
+        return extract_coordinates_from_url(self.driver.current_url)
+
+    def close(self):
+        self.driver.quit()
+
+
+class HttpGeocoder(Geocoder):
+    """
+    Nominatim 相容的 HTTP geocoder：GET {base_url}?q=地址&format=json&limit=1，
+    回傳 [{"lat": "...", "lon": "..."}]。
+    """
+
+    source = "http_geocoder"
+
+    def __init__(self, base_url: str, timeout: float = 10, user_agent: str = "house_data_ETL"):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+
+    def geocode(self, address: str):
+        resp = self.session.get(
+            self.base_url,
+            params={"q": address, "format": "json", "limit": 1},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        results = resp.json()
+        if not results:
+            return None, None
+        return results[0]["lat"], results[0]["lon"]
+
+    def close(self):
+        self.session.close()
+
+
+class GeocoderPool:
+    """
+    多個 geocoder 同時查詢。每個 worker 執行緒各自建立一個 geocoder（factory），
+    共用 token bucket 限速；結果在呼叫端執行緒依完成順序回呼 on_result。
+    """
+
+    def __init__(self, factory: Callable[[], Geocoder], workers: int = 1,
+                 max_per_minute: float = 60, burst: Optional[int] = None):
+        self.factory = factory
+        self.workers = workers
+        self.max_per_minute = max_per_minute
+        self.bucket = TokenBucket(max_per_minute, burst=burst or workers)
+        self._local = threading.local()
+        self._geocoders = []
+        self._lock = threading.Lock()
+
+    def _geocoder(self) -> Geocoder:
+        if not hasattr(self._local, "geocoder"):
+            self._local.geocoder = self.factory()
+            with self._lock:
+                self._geocoders.append(self._local.geocoder)
+        return self._local.geocoder
+
+    def _lookup(self, address: str):
+        self.bucket.acquire()
+        return self._geocoder().geocode(address)
+
+    def geocode_many(self, addresses: Iterable[str], on_result: Optional[Callable] = None):
+        """回傳 {address: (lat, lng)}；on_result(address, lat, lng, error) 每筆完成即呼叫"""
+        addresses = list(dict.fromkeys(a for a in addresses if a))
+        results = {}
+        if not addresses:
+            return results
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._lookup, addr): addr for addr in addresses}
+            for future in as_completed(futures):
+                addr = futures[future]
+                lat, lng, error = None, None, None
+                try:
+                    lat, lng = future.result()
+                except Exception as e:
+                    error = e
+                results[addr] = (lat, lng)
+                if on_result:
+                    on_result(addr, lat, lng, error)
+
+        elapsed = time.perf_counter() - start
+        per_minute = len(addresses) / elapsed * 60 if elapsed > 0 else float("inf")
+        print(f"[GeocoderPool] {len(addresses)} 筆，{self.workers} workers，"
+              f"{per_minute:,.0f} 筆/分鐘（上限 {self.max_per_minute:,.0f}）")
+        return results
+
+    def close(self):
+        with self._lock:
+            geocoders, self._geocoders = self._geocoders, []
+        for geocoder in geocoders:
+            try:
+                geocoder.close()
+            except Exception as e:
+                print(f" 關閉 geocoder 時發生錯誤：{e}")
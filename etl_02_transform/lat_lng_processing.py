@@ -1,64 +1,63 @@
 import os
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from time import sleep
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from etl_02_transform.address_geocoder import OfflineGeocoder
+from etl_02_transform.copy_mode import adopt
+from etl_02_transform.geocode_cache import GeocodeCache, normalize_address
+from etl_02_transform.geocoder import GeocoderPool, SeleniumGeocoder, extract_coordinates_from_url
 
 class LatLngUpdate:
-    def __init__(self, df: pd.DataFrame, main_data_path=None, test_mode=True):
+    def __init__(self, df: pd.DataFrame, main_data_path=None, test_mode=True, cache_path=None,
+                 geocoder_factory=None, workers=1, max_per_minute=60, owned=False, offline_geocode=True):
         
         #test_mode=True 僅爬前 50 筆
         #test_mode=False 正常模式
+        #geocoder_factory 未提供時使用 Google Maps (Selenium)，每個 worker 一個瀏覽器
+        #owned=True 呼叫端交出 df 所有權，不複製
+        #offline_geocode=True 快取未命中的地址先以已知座標做同棟 / 路段內插比對，仍找不到才爬蟲
         
-        self.df = df.copy()
+        self.df = adopt(df, owned)
         self.main_data_path = main_data_path
         self.test_mode = test_mode
-
-        # 讀取主資料作為比對來源
-        if main_data_path and Path(main_data_path).exists():
-            self.main_data = pd.read_csv(main_data_path, encoding="utf-8-sig", low_memory=False)
-            print(f"[LatLngUpdate] 已載入主資料檔：{len(self.main_data):,} 筆")
-        else:
-            self.main_data = pd.DataFrame()
+        self.geocoder_factory = geocoder_factory or SeleniumGeocoder
+        self.geocoder_source = getattr(self.geocoder_factory, "source", "geocoder")
+        self.workers = workers
+        self.max_per_minute = max_per_minute
+        self.pool = None
+        self.offline_geocode = offline_geocode
+        self.step_metrics = {}
+
+        # 經緯度快取：cache_path 未提供時使用記憶體內快取
+        self.cache = GeocodeCache(cache_path)
+        if len(self.cache) == 0 and main_data_path and Path(main_data_path).exists():
+            # 快取為空才讀主資料（僅地址與經緯度欄位）建立快取
+            self.cache.import_master(main_data_path)
+        elif len(self.cache) == 0:
             print("[LatLngUpdate] 未提供 main_data.csv 或檔案不存在，略過比對")
+        else:
+            print(f"[LatLngUpdate] 已載入經緯度快取：{len(self.cache):,} 筆")
 
         # 標準化地址
-        for df_ in [self.df, self.main_data]:
-            if "土地位置建物門牌" in df_.columns:
-                df_["土地位置建物門牌"] = (
-                    df_["土地位置建物門牌"].astype(str).str.replace("台", "臺", regex=False).str.strip()
-                )
+        if "土地位置建物門牌" in self.df.columns:
+            self.df["土地位置建物門牌"] = (
+                self.df["土地位置建物門牌"].astype(str).str.replace("台", "臺", regex=False).str.strip()
+            )
 
         # 清空字串 → NaN
         for col in ["緯度", "經度"]:
             if col in self.df.columns:
-                self.df[col].replace("", np.nan, inplace=True)
-
-        my_options = webdriver.ChromeOptions()
-        my_options.add_argument("--start-maximized")
-        my_options.add_argument("--incognito")
-        my_options.add_argument("--disable-popup-blocking")
-        my_options.add_argument("--disable-notifications")
-        my_options.add_argument("--lang=zh-TW")
-        self.driver = webdriver.Chrome(options=my_options)
+                self.df[col] = self.df[col].replace("", np.nan)
 
     def _extract_coordinates_from_url(self, url: str):
-        try:
-            parts = url.split("@")
-            if len(parts) > 1:
-                coords = parts[1].split(",")[:2]
-                if len(coords) == 2:
-                    return coords[0], coords[1]
-        except Exception as e:
-            print("擷取經緯度錯誤：", e)
-        return None, None
+        return extract_coordinates_from_url(url)
 
     def visit(self):
-        self.driver.get("https://www.google.com/maps")
-        sleep(5)
+        # geocoder 由各 worker 第一次查詢時建立
+        if self.pool is None:
+            self.pool = GeocoderPool(
+                self.geocoder_factory, workers=self.workers, max_per_minute=self.max_per_minute
+            )
         return self
 
     def update_lat_lng(self):
@@ -71,24 +70,24 @@ class LatLngUpdate:
 
 
         miss_mask = self.df["緯度"].isna() | self.df["經度"].isna()
-        target_df = self.df.loc[miss_mask].copy()
-        print(f" 共有 {len(target_df)} 筆需要補經緯度")
+        print(f" 共有 {int(miss_mask.sum())} 筆需要補經緯度")
 
 
-        if not self.main_data.empty:
-            ref = (
-                self.main_data.dropna(subset=["緯度", "經度"])
-                .drop_duplicates(subset=["土地位置建物門牌"], keep="last")
-            )
-            lat_map = dict(zip(ref["土地位置建物門牌"], ref["緯度"]))
-            lng_map = dict(zip(ref["土地位置建物門牌"], ref["經度"]))
+        # 批次查詢快取
+        addr_key = self.df.loc[miss_mask, "土地位置建物門牌"].map(normalize_address)
+        found = self.cache.lookup_many(addr_key.unique())
+        if not found.empty:
+            lat_map = dict(zip(found["address"], found["lat"]))
+            lng_map = dict(zip(found["address"], found["lng"]))
 
             before = self.df["緯度"].notna().sum()
-            self.df["緯度"] = self.df["緯度"].fillna(self.df["土地位置建物門牌"].map(lat_map))
-            self.df["經度"] = self.df["經度"].fillna(self.df["土地位置建物門牌"].map(lng_map))
+            self.df.loc[miss_mask, "緯度"] = self.df.loc[miss_mask, "緯度"].fillna(addr_key.map(lat_map))
+            self.df.loc[miss_mask, "經度"] = self.df.loc[miss_mask, "經度"].fillna(addr_key.map(lng_map))
             after = self.df["緯度"].notna().sum()
-            print(f"向量化比對補上 {after - before:,} 筆經緯度")
+            print(f"快取比對補上 {after - before:,} 筆經緯度")
 
+        if self.offline_geocode:
+            self.update_lat_lng_offline()
 
         still_missing = self.df[self.df["緯度"].isna() | self.df["經度"].isna()]
         print(f" 仍有 {len(still_missing)} 筆缺少經緯度")
@@ -104,30 +103,24 @@ class LatLngUpdate:
         else:
             print(" 一般：對所有缺值資料執行爬蟲")
 
-        for idx, row in still_missing.iterrows():
-            addr = row.get("土地位置建物門牌", "")
-            if not addr:
-                continue
-            try:
-                txtInput = self.driver.find_element(
-                    By.CSS_SELECTOR, "input.fontBodyMedium.searchboxinput.xiQnY"
-                )
-                txtInput.clear()
-                sleep(0.7)
-                txtInput.send_keys(addr)
-                sleep(0.7)
-                txtInput.send_keys(Keys.ENTER)
-                sleep(1.5)
-
-                url = self.driver.current_url
-                lat, lng = self._extract_coordinates_from_url(url)
-                if lat and lng:
-                    self.df.loc[idx, ["緯度", "經度"]] = lat, lng
-                    print(f" {addr} → 緯度:{lat}, 經度:{lng}")
-                else:
-                    print(f" {addr} → 無法取得經緯度")
-            except Exception as e:
-                print(f" 搜尋失敗：{addr}，錯誤：{e}")
+        def on_result(addr, lat, lng, error):
+            if error is not None:
+                print(f" 搜尋失敗：{addr}，錯誤：{error}")
+            elif lat and lng:
+                self.cache.put(addr, lat, lng, source=self.geocoder_source)
+                print(f" {addr} → 緯度:{lat}, 經度:{lng}")
+            else:
+                print(f" {addr} → 無法取得經緯度")
+
+        self.visit()
+        addrs = still_missing["土地位置建物門牌"].dropna()
+        results = self.pool.geocode_many(addrs.unique(), on_result=on_result)
+
+        # 同地址多筆一次回填
+        lat_map = {a: float(lat) for a, (lat, lng) in results.items() if lat and lng}
+        lng_map = {a: float(lng) for a, (lat, lng) in results.items() if lat and lng}
+        self.df.loc[addrs.index, "緯度"] = self.df.loc[addrs.index, "緯度"].fillna(addrs.map(lat_map))
+        self.df.loc[addrs.index, "經度"] = self.df.loc[addrs.index, "經度"].fillna(addrs.map(lng_map))
 
 
         if self.test_mode:
@@ -138,12 +131,47 @@ class LatLngUpdate:
         print("[LatLngUpdate] 經緯度更新完成。")
         return self.quit()
 
+    def update_lat_lng_offline(self):
+        """以快取中的已知座標離線比對（同棟不同樓層、全半形、之N、路段門牌內插），結果寫回快取"""
+        miss_mask = self.df["緯度"].isna() | self.df["經度"].isna()
+        if not miss_mask.any() or len(self.cache) == 0:
+            return self
+
+        addrs = self.df.loc[miss_mask, "土地位置建物門牌"]
+        unique_addrs = pd.Series(addrs.unique())
+        result = OfflineGeocoder.from_cache(self.cache).geocode(unique_addrs)
+        found = result["lat"].notna().to_numpy()
+        if not found.any():
+            print("離線比對無結果")
+            return self
+
+        matched = result[found].assign(address=unique_addrs[found].to_numpy())
+        # 依逐筆信心值寫入（門牌相差較遠的內插為 FAR_CONFIDENCE）
+        for (method, confidence), group in matched.groupby(["method", "confidence"]):
+            self.cache.put_many(group[["address", "lat", "lng"]].itertuples(index=False, name=None),
+                                source=f"offline_{method}", confidence=float(confidence))
+
+        lat_map = dict(zip(matched["address"], matched["lat"]))
+        lng_map = dict(zip(matched["address"], matched["lng"]))
+        self.df.loc[miss_mask, "緯度"] = self.df.loc[miss_mask, "緯度"].fillna(addrs.map(lat_map))
+        self.df.loc[miss_mask, "經度"] = self.df.loc[miss_mask, "經度"].fillna(addrs.map(lng_map))
+
+        method_by_addr = addrs.map(dict(zip(matched["address"], matched["method"])))
+        counts = method_by_addr.value_counts().to_dict()
+        self.step_metrics = {"offline_geocode": {k: int(v) for k, v in counts.items()}}
+        print(f"離線比對補上 {int(method_by_addr.notna().sum()):,} 筆經緯度"
+              f"（同棟 {counts.get('building', 0):,}、路段內插 {counts.get('interpolated', 0):,}）")
+        return self
+
     def quit(self):
         try:
-            self.driver.quit()
-            print("[LatLngUpdate] 瀏覽器已關閉。")
+            self.cache.close()
         except Exception as e:
-            print(f" 關閉瀏覽器時發生錯誤：{e}")
+            print(f" 關閉經緯度快取時發生錯誤：{e}")
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+            print("[LatLngUpdate] 瀏覽器已關閉。")
         return self
 
 
@@ -1,22 +1,32 @@
 import os
 import pandas as pd
-import numpy as np
+from etl_02_transform.copy_mode import adopt
+from etl_02_transform.mode_tables import group_mode
+
+def main_material_modes(df: pd.DataFrame) -> pd.Series:
+    """各 建物型態 的 主要建材 眾數；分區執行時先以整批資料計算再廣播"""
+    return group_mode(df['建物型態'], df['主要建材'])
+
 
 class MaterialProcessing:
 
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    def __init__(self, df: pd.DataFrame, owned: bool = False):
+        self.df = adopt(df, owned)
 
-    def impute_main_material(self):
+    def impute_main_material(self, mode_by_type: pd.Series = None):
+        # mode_by_type：預先計算的 建物型態 → 主要建材 眾數（ModeTableStore 的主資料眾數，或分區執行時廣播）；
+        # 未提供時以 self.df 計算
         if '主要建材' not in self.df.columns or '建物型態' not in self.df.columns:
             print(" 缺少欄位，跳過 impute_main_material")
             return self
 
-        mode_by_type = self.df.groupby('建物型態')['主要建材'].apply(
-            lambda x: x.mode().iloc[0] if not x.mode().empty else np.nan
-        )
+        if mode_by_type is None:
+            mode_by_type = main_material_modes(self.df)
 
+        missing = self.df['主要建材'].isna()
         self.df['主要建材'] = self.df['主要建材'].fillna(self.df['建物型態'].map(mode_by_type))
+        # 補值旗標：眾數表只計實際觀測值
+        self.df['主要建材補值'] = missing & self.df['主要建材'].notna()
         print("[MainMaterialProcessing] 完成主要建材補值")
         return self
     
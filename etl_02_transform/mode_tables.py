@@ -0,0 +1,218 @@
+import hashlib
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import pandas as pd
+
+# 眾數表名稱 → (分組欄位, 眾數欄位, 不計入眾數的值, 補值旗標欄位)
+# 補值旗標為 True 的列是以眾數補上的值，不計入眾數表（避免眾數表強化自己的補值）
+MODE_TABLES = {
+    "main_material": ("建物型態", "主要建材", (), "主要建材補值"),
+    "parking_type": ("建物型態", "車位類別", ("無車位",), "車位類別補值"),
+}
+KEY_COLUMN = "編號"
+
+
+def group_counts(keys: pd.Series, values: pd.Series, exclude=(), imputed: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    各 (分組, 值) 的筆數（不含缺值、exclude 與 imputed 為 True 的補值），依 分組、值 排序。
+    回傳欄位 key / value / n。
+    """
+    mask = keys.notna() & values.notna()
+    if imputed is not None:
+        mask &= ~imputed.fillna(False).astype(bool)
+    if exclude:
+        mask &= ~values.isin(list(exclude))
+    counts = values[mask].groupby([keys[mask], values[mask]], observed=True, sort=True).size()
+    counts = counts[counts > 0]
+    counts.index.names = ["key", "value"]
+    return counts.rename("n").reset_index()
+
+
+def modes_from_counts(counts: pd.DataFrame) -> pd.Series:
+    """
+    各分組筆數最多的值；同票時取排序較前的值（與 Series.mode().iloc[0] 相同）。
+    counts 需依 key、value 排序（group_counts 的輸出）。
+    """
+    if counts.empty:
+        return pd.Series(dtype=object)
+    top = counts.sort_values(["key", "n"], ascending=[True, False], kind="stable").drop_duplicates("key")
+    return pd.Series(top["value"].to_numpy(), index=pd.Index(top["key"].to_numpy()))
+
+
+def group_mode(keys: pd.Series, values: pd.Series, exclude=()) -> pd.Series:
+    """向量化分組眾數：一次 groupby size 取代每組呼叫 mode()"""
+    return modes_from_counts(group_counts(keys, values, exclude))
+
+
+def frame_counts(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """df 中眾數表 name 的 (分組, 值) 筆數；有補值旗標欄位時只計實際觀測值"""
+    key_col, value_col, exclude, flag_col = MODE_TABLES[name]
+    imputed = df[flag_col] if flag_col in df.columns else None
+    return group_counts(df[key_col].astype(object), df[value_col].astype(object), exclude, imputed)
+
+
+class ModeTableStore:
+    """
+    分組眾數表（SQLite 儲存各 (分組, 值) 的累計筆數）：
+    - 第一次使用時由主資料分批計算（只讀分組與眾數欄位）
+    - 每批寫入主資料後以 add 累加該批筆數，被 upsert 取代的舊列（replaced_rows）先扣除
+    只計實際觀測值（補值旗標為 True 的列不計）。
+    補值時眾數 = 累計筆數 + 本批已知值筆數，季度小批次也與主資料一致。
+    """
+
+    def __init__(self, store_path: Optional[str] = None, master_path=None):
+        self.store_path = str(store_path or ":memory:")
+        if self.store_path != ":memory:":
+            Path(self.store_path).parent.mkdir(parents=True, exist_ok=True)
+        self.master_path = master_path
+
+        self.conn = sqlite3.connect(self.store_path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mode_counts (
+                name      TEXT NOT NULL,
+                group_key TEXT NOT NULL,
+                value     TEXT NOT NULL,
+                n         INTEGER NOT NULL,
+                PRIMARY KEY (name, group_key, value)
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mode_tables (
+                name       TEXT PRIMARY KEY,
+                rows       INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def _initialized(self, name: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM mode_tables WHERE name = ?", (name,)).fetchone() is not None
+
+    def _add_counts(self, name: str, counts: pd.DataFrame, rows: int):
+        self.conn.executemany(
+            """
+            INSERT INTO mode_counts (name, group_key, value, n) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name, group_key, value) DO UPDATE SET n = n + excluded.n
+            """,
+            ((name, str(k), str(v), int(n)) for k, v, n in counts.itertuples(index=False, name=None)),
+        )
+        self.conn.execute(
+            """
+            INSERT INTO mode_tables (name, rows, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET rows = rows + excluded.rows, updated_at = excluded.updated_at
+            """,
+            (name, int(rows), datetime.now().isoformat(timespec="seconds")),
+        )
+        self.conn.execute("DELETE FROM mode_counts WHERE name = ? AND n <= 0", (name,))
+        self.conn.commit()
+
+    def _master_columns(self):
+        from etl_03_load.master_store import MasterStore
+
+        path = Path(self.master_path)
+        if path.is_dir():
+            return MasterStore(path).columns()
+        return list(pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns)
+
+    def rebuild(self, name: str, chunksize: int = 200_000):
+        """由主資料重新計算（分批 groupby 後合併筆數）"""
+        from etl_03_load.master_store import iter_master
+
+        key_col, value_col, exclude, flag_col = MODE_TABLES[name]
+        self.conn.execute("DELETE FROM mode_counts WHERE name = ?", (name,))
+        self.conn.execute("DELETE FROM mode_tables WHERE name = ?", (name,))
+        self.conn.commit()
+        if self.master_path is None or not Path(self.master_path).exists():
+            # 尚無主資料：不標記為已建立，主資料建立後第一次使用時再計算
+            return self
+
+        # 舊主資料沒有補值旗標欄位時無法區分，全部計入
+        columns = [key_col, value_col] + ([flag_col] if flag_col in self._master_columns() else [])
+        parts, rows = [], 0
+        for chunk in iter_master(self.master_path, columns=columns, chunksize=chunksize):
+            parts.append(frame_counts(chunk, name))
+            rows += len(chunk)
+        counts = (pd.concat(parts).groupby(["key", "value"], as_index=False)["n"].sum()
+                  if parts else pd.DataFrame(columns=["key", "value", "n"]))
+        self._add_counts(name, counts, rows)
+        print(f"[ModeTable] {name}: 由主資料 {rows:,} 筆建立，{len(counts):,} 組 (分組, 值)")
+        return self
+
+    def replaced_rows(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """
+        主資料中會被本批 upsert 取代的列（同 編號），只讀眾數表用到的欄位；
+        需在寫入主資料之前呼叫，結果交給 add 扣除舊筆數。
+        """
+        from etl_03_load.master_store import iter_master, read_master
+
+        if self.master_path is None or not Path(self.master_path).exists() or KEY_COLUMN not in df.columns:
+            return None
+        available = self._master_columns()
+        wanted = [KEY_COLUMN] + [c for spec in MODE_TABLES.values() for c in (spec[0], spec[1], spec[3])]
+        columns = [c for c in dict.fromkeys(wanted) if c in available]
+        if KEY_COLUMN not in columns:
+            return None
+        ids = df[KEY_COLUMN].dropna().astype(str).unique().tolist()
+        if Path(self.master_path).is_dir():
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+
+            condition = ds.field(KEY_COLUMN).cast(pa.string()).isin(pa.array(ids, pa.string()))
+            return read_master(self.master_path, columns=columns, filters=condition)
+        parts = [chunk[chunk[KEY_COLUMN].astype(str).isin(ids)] for chunk in iter_master(self.master_path, columns)]
+        return pd.concat(parts, ignore_index=True) if parts else None
+
+    def add(self, df: pd.DataFrame, replaced: Optional[pd.DataFrame] = None):
+        """
+        已寫入主資料的批次：累加各眾數表的筆數，replaced（replaced_rows 的結果）的舊筆數扣除。
+        尚未初始化的表留待第一次使用時由主資料建立。
+        """
+        if KEY_COLUMN in df.columns:
+            # 與 upsert 相同：同一 編號 以最後一筆為準
+            df = df.drop_duplicates(subset=[KEY_COLUMN], keep="last")
+        for name, (key_col, value_col, exclude, flag_col) in MODE_TABLES.items():
+            if key_col in df.columns and value_col in df.columns and self._initialized(name):
+                counts = frame_counts(df, name)
+                rows = len(df)
+                if replaced is not None and key_col in replaced.columns and value_col in replaced.columns:
+                    old = frame_counts(replaced, name).assign(n=lambda c: -c["n"])
+                    counts = pd.concat([counts, old], ignore_index=True).groupby(
+                        ["key", "value"], as_index=False, sort=True)["n"].sum()
+                    rows -= len(replaced)
+                self._add_counts(name, counts, rows)
+        return self
+
+    def counts(self, name: str) -> pd.DataFrame:
+        if not self._initialized(name):
+            self.rebuild(name)
+        rows = self.conn.execute(
+            "SELECT group_key, value, n FROM mode_counts WHERE name = ? ORDER BY group_key, value", (name,)
+        ).fetchall()
+        return pd.DataFrame(rows, columns=["key", "value", "n"])
+
+    def version(self, name: str) -> str:
+        """眾數表 name 目前累計筆數的雜湊（pipeline checkpoint key 用，主資料寫入後即改變）"""
+        counts = self.counts(name)
+        h = hashlib.sha256()
+        for k, v, n in counts.itertuples(index=False, name=None):
+            h.update(f"{k}\t{v}\t{n}\n".encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    def modes(self, name: str, batch: Optional[pd.DataFrame] = None) -> pd.Series:
+        """分組 → 眾數；batch 提供時加入本批已知值（缺值不計）"""
+        counts = self.counts(name)
+        key_col, value_col, exclude, flag_col = MODE_TABLES[name]
+        if batch is not None and key_col in batch.columns and value_col in batch.columns:
+            batch_counts = frame_counts(batch, name)
+            counts = (pd.concat([counts, batch_counts], ignore_index=True)
+                      .groupby(["key", "value"], as_index=False, sort=True)["n"].sum())
+        return modes_from_counts(counts)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+from etl_02_transform.parking_processing import PRICE_FEATURES, ParkingProcessing
+
+TARGET = "車位總價元"
+# 車位總價為模型補值的旗標；重新訓練時排除，避免以自己的預測值訓練
+IMPUTED_FLAG = "車位總價元補值"
+# 由原始欄位計算 PRICE_FEATURES 需要的欄位
+RAW_COLUMNS = ["建物移轉總面積平方公尺", "車位移轉總面積平方公尺", "總價元", "車位總價元", "交易筆棟數", "車位類別"]
+
+ESTIMATORS = {
+    # 與原本 impute_parking_price_rf 相同設定
+    "rf": (RandomForestRegressor, dict(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1)),
+    # 直方圖梯度提升：大量資料時 fit / predict 快很多
+    "hgb": (HistGradientBoostingRegressor, dict(max_iter=200, learning_rate=0.1, random_state=42)),
+}
+
+MIN_TRAIN_ROWS = 10
+HOLDOUT_FRACTION = 0.1
+PSI_BINS = 10
+
+
+def training_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    取出 PRICE_FEATURES + 車位類別 + 車位總價元（數值化）；尚未經過 process_parking 的資料先以必要欄位計算特徵。
+    """
+    cols = PRICE_FEATURES + ["車位類別", TARGET] + ([IMPUTED_FLAG] if IMPUTED_FLAG in df.columns else [])
+    if not all(c in df.columns for c in PRICE_FEATURES):
+        parking = ParkingProcessing(df[[c for c in RAW_COLUMNS if c in df.columns]])
+        parking.process_parking()
+        df = parking.df
+    frame = df[[c for c in cols if c in df.columns]].copy()
+    for col in PRICE_FEATURES + [TARGET]:
+        frame[col] = pd.to_numeric(frame[col], errors="coerce")
+    return frame
+
+
+def labeled_rows(frame: pd.DataFrame):
+    """有車位、有實際成交車位總價（非補值）且特徵完整的資料 → (X, y)"""
+    mask = (frame["車位類別"] != "無車位") & frame[TARGET].notna() & (frame[TARGET] > 0)
+    if IMPUTED_FLAG in frame.columns:
+        mask &= ~frame[IMPUTED_FLAG].fillna(False).astype(bool)
+    mask &= frame[PRICE_FEATURES].notna().all(axis=1)
+    return frame.loc[mask, PRICE_FEATURES].astype(float), frame.loc[mask, TARGET].astype(float)
+
+
+def population_stability(reference: dict, values: pd.Series) -> float:
+    """PSI：以訓練資料的分位數切箱，比較新資料落在各箱的比例"""
+    values = values.dropna().to_numpy(dtype=float)
+    if len(values) == 0:
+        return 0.0
+    edges = np.asarray(reference["edges"])
+    counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+    actual = np.clip(counts / counts.sum(), 1e-4, None)
+    expected = np.clip(np.asarray(reference["share"]), 1e-4, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _reference_bins(values: pd.Series) -> dict:
+    edges = np.unique(np.quantile(values.to_numpy(dtype=float), np.linspace(0, 1, PSI_BINS + 1)[1:-1]))
+    counts = np.bincount(np.searchsorted(edges, values.to_numpy(dtype=float), side="right"), minlength=len(edges) + 1)
+    return {"edges": edges.tolist(), "share": (counts / counts.sum()).tolist()}
+
+
+class ParkingPriceModel:
+    """已訓練的車位總價模型與其訓練資訊（指紋、特徵中位數、分布、holdout 誤差）"""
+
+    def __init__(self, estimator: str, fingerprint: str, model, medians: pd.Series, reference: dict,
+                 holdout_mae: float, holdout_mape: float, train_rows: int, master_rows: int, fit_seconds: float):
+        self.estimator = estimator
+        self.fingerprint = fingerprint
+        self.model = model
+        self.medians = medians
+        self.reference = reference
+        self.holdout_mae = holdout_mae
+        self.holdout_mape = holdout_mape
+        self.train_rows = train_rows
+        self.master_rows = master_rows
+        self.fit_seconds = fit_seconds
+        self.trained_at = datetime.now().isoformat(timespec="seconds")
+
+    def as_stats(self):
+        """impute_parking_price_rf(model=...) 使用的 (model, 特徵中位數)"""
+        return self.model, self.medians
+
+    def describe(self) -> dict:
+        return {
+            "estimator": self.estimator, "trained_at": self.trained_at, "train_rows": self.train_rows,
+            "master_rows": self.master_rows, "holdout_mae": round(self.holdout_mae, 1),
+            "holdout_mape": round(self.holdout_mape, 4), "fit_seconds": round(self.fit_seconds, 3),
+        }
+
+
+def fit_price_model(X: pd.DataFrame, y: pd.Series, estimator: str = "rf", fingerprint: str = "",
+                    master_rows: int = 0) -> Optional[ParkingPriceModel]:
+    """切出 holdout 記錄誤差後訓練；資料不足 MIN_TRAIN_ROWS 回傳 None"""
+    if len(X) < MIN_TRAIN_ROWS:
+        return None
+    rng = np.random.default_rng(42)
+    holdout = rng.random(len(X)) < HOLDOUT_FRACTION if len(X) >= 10 * MIN_TRAIN_ROWS else np.zeros(len(X), bool)
+
+    cls, params = ESTIMATORS[estimator]
+    model = cls(**params)
+    start = time.perf_counter()
+    model.fit(X[~holdout], y[~holdout])
+    fit_seconds = time.perf_counter() - start
+
+    if holdout.any():
+        pred = model.predict(X[holdout])
+        err = np.abs(pred - y[holdout].to_numpy())
+        mae, mape = float(err.mean()), float((err / y[holdout].to_numpy()).mean())
+    else:
+        mae, mape = float("nan"), float("nan")
+
+    return ParkingPriceModel(
+        estimator, fingerprint, model, X.median(), {c: _reference_bins(X[c]) for c in PRICE_FEATURES},
+        mae, mape, int((~holdout).sum()), master_rows, fit_seconds,
+    )
+
+
+def _master_rows(master_path) -> int:
+    from etl_03_load.master_store import MasterStore, iter_master
+
+    if Path(master_path).is_dir():
+        return MasterStore(master_path).count_rows()
+    return sum(len(chunk) for chunk in iter_master(master_path, columns=[TARGET]))
+
+
+def _read_master_training(master_path, chunksize: int = 200_000):
+    """分批讀主資料的特徵與車位總價欄位，每批只保留可訓練的列"""
+    from etl_03_load.master_store import MasterStore, iter_master
+
+    if Path(master_path).is_dir():
+        available = MasterStore(master_path).columns()
+    else:
+        available = list(pd.read_csv(master_path, nrows=0, encoding="utf-8-sig").columns)
+    cols = [c for c in PRICE_FEATURES + ["車位類別", TARGET, IMPUTED_FLAG] if c in available]
+    if not all(c in cols for c in PRICE_FEATURES + [TARGET]):
+        print("[ParkingPriceModel] 主資料缺少車位特徵欄位，改以本批資料訓練")
+        return pd.DataFrame(columns=PRICE_FEATURES), pd.Series(dtype=float)
+
+    parts = [labeled_rows(training_frame(chunk)) for chunk in iter_master(master_path, columns=cols,
+                                                                          chunksize=chunksize)]
+    if not parts:
+        return pd.DataFrame(columns=PRICE_FEATURES), pd.Series(dtype=float)
+    return pd.concat([p[0] for p in parts], ignore_index=True), pd.concat([p[1] for p in parts], ignore_index=True)
+
+
+class ParkingPriceModelStore:
+    """
+    車位總價補值模型的持久化：以主資料（+ 本批有成交價的資料）訓練後存成 pickle，之後的批次直接沿用，
+    以下情況才重新訓練：
+    - 指紋不同（特徵 / 目標欄位 / 模型種類與參數 / scikit-learn 版本變更）
+    - 主資料筆數成長超過 growth_threshold（例如 0.2 = 20%）
+    - 本批特徵分布漂移（任一特徵 PSI > psi_threshold），或本批有成交價資料的誤差超過 holdout 誤差的 error_ratio 倍
+    """
+
+    def __init__(self, model_path: str, estimator: str = "rf", growth_threshold: float = 0.2,
+                 psi_threshold: float = 0.25, error_ratio: float = 1.5, min_check_rows: int = 50):
+        if estimator not in ESTIMATORS:
+            raise ValueError(f"estimator 必須是 {list(ESTIMATORS)} 之一")
+        self.model_path = Path(model_path)
+        self.estimator = estimator
+        self.growth_threshold = growth_threshold
+        self.psi_threshold = psi_threshold
+        self.error_ratio = error_ratio
+        self.min_check_rows = min_check_rows
+        self.last_decision = None
+
+    @property
+    def fingerprint(self) -> str:
+        _, params = ESTIMATORS[self.estimator]
+        spec = {"features": PRICE_FEATURES, "target": TARGET, "estimator": self.estimator, "params": params,
+                "sklearn": sklearn.__version__}
+        return hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+
+    def stored_fingerprint(self) -> Optional[str]:
+        """已存模型的指紋與訓練時間（pipeline checkpoint key 用，重新訓練後即改變）；尚無模型時為 None"""
+        bundle = self.load()
+        if bundle is None:
+            return None
+        return f"{bundle.fingerprint}:{bundle.trained_at}:{bundle.master_rows}"
+
+    def load(self) -> Optional[ParkingPriceModel]:
+        if not self.model_path.exists():
+            return None
+        try:
+            with open(self.model_path, "rb") as f:
+                return pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            print(f"[ParkingPriceModel] 模型檔無法讀取，重新訓練: {e}")
+            return None
+
+    def save(self, bundle: ParkingPriceModel):
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.model_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.model_path)
+
+    def retrain_reason(self, bundle: Optional[ParkingPriceModel], batch: pd.DataFrame, master_rows: int):
+        """回傳需要重新訓練的原因；可沿用時回傳 None"""
+        if bundle is None:
+            return "尚無模型"
+        if bundle.fingerprint != self.fingerprint:
+            return "特徵 / 模型設定變更"
+        if master_rows > bundle.master_rows * (1 + self.growth_threshold):
+            return f"主資料筆數成長 {bundle.master_rows:,} → {master_rows:,}"
+
+        # 只比較有車位的列（與訓練 / 預測對象相同）
+        candidates = batch.loc[batch["車位類別"] != "無車位", PRICE_FEATURES].dropna()
+        if len(candidates) >= self.min_check_rows:
+            psi = {c: population_stability(bundle.reference[c], candidates[c]) for c in PRICE_FEATURES}
+            drifted = {c: round(v, 3) for c, v in psi.items() if v > self.psi_threshold}
+            if drifted:
+                return f"特徵分布漂移 PSI {drifted}"
+
+        X, y = labeled_rows(batch)
+        if len(X) >= self.min_check_rows and np.isfinite(bundle.holdout_mae):
+            mae = float(np.abs(bundle.model.predict(X) - y.to_numpy()).mean())
+            if mae > self.error_ratio * bundle.holdout_mae:
+                return f"本批誤差 {mae:,.0f} > {self.error_ratio} × holdout {bundle.holdout_mae:,.0f}"
+        return None
+
+    def model_for(self, df: pd.DataFrame, master_path=None):
+        """
+        取得本批使用的 (model, 特徵中位數)：可沿用時直接讀取，否則以主資料 + 本批重新訓練並存檔。
+        無法訓練（資料不足）時回傳 None（由 impute_parking_price_rf 以本批資料訓練）。
+        """
+        batch = training_frame(df)
+        has_master = master_path is not None and Path(master_path).exists()
+        master_rows = _master_rows(master_path) if has_master else 0
+
+        bundle = self.load()
+        reason = self.retrain_reason(bundle, batch, master_rows)
+        if reason is None:
+            self.last_decision = "reuse"
+            print(f"[ParkingPriceModel] 沿用既有模型（{bundle.trained_at}，{bundle.train_rows:,} 筆訓練）")
+            return bundle.as_stats()
+
+        print(f"[ParkingPriceModel] 重新訓練（{reason}）")
+        parts = [_read_master_training(master_path)] if has_master else []
+        parts = [p for p in parts + [labeled_rows(batch)] if len(p[0])]
+        X = pd.concat([p[0] for p in parts], ignore_index=True) if parts else pd.DataFrame(columns=PRICE_FEATURES)
+        y = pd.concat([p[1] for p in parts], ignore_index=True) if parts else pd.Series(dtype=float)
+
+        new_bundle = fit_price_model(X, y, self.estimator, self.fingerprint, master_rows)
+        if new_bundle is None:
+            self.last_decision = "insufficient"
+            print("[ParkingPriceModel] 訓練資料不足，略過")
+            return bundle.as_stats() if bundle is not None and bundle.fingerprint == self.fingerprint else None
+
+        self.save(new_bundle)
+        self.last_decision = "retrain"
+        print(f"[ParkingPriceModel] 已儲存模型: {new_bundle.describe()}")
+        return new_bundle.as_stats()
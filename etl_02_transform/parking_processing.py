@@ -1,14 +1,49 @@
 import os
-import re
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
+from etl_02_transform.copy_mode import adopt
+from etl_02_transform.mode_tables import group_mode
+
+PRICE_FEATURES = ["總價元", "建物總坪數", "車位數"]
+
+
+def parking_type_modes(df: pd.DataFrame) -> pd.Series:
+    """各 建物型態 的 車位類別 眾數（不含 無車位）；分區執行時先以整批資料計算再廣播"""
+    return group_mode(df["建物型態"], df["車位類別"], exclude=("無車位",))
+
+
+def fit_parking_price_model(df: pd.DataFrame):
+    """
+    以有車位且有車位總價的資料訓練隨機森林，回傳 (model, 特徵中位數)；訓練資料不足 10 筆回傳 None。
+    分區執行時先以整批資料訓練再廣播，各分區預測結果與單一程序相同。
+    """
+    price = pd.to_numeric(df["車位總價元"], errors="coerce")
+    mask_train = (df["車位類別"] != "無車位") & price.notna()
+    if mask_train.sum() < 10:
+        return None
+
+    X_train = df.loc[mask_train, PRICE_FEATURES].apply(pd.to_numeric, errors="coerce")
+    y_train = price[mask_train]
+
+    ok = (~X_train.isna().any(axis=1)) & (~y_train.isna())
+    X_train, y_train = X_train[ok], y_train[ok]
+
+    if len(X_train) < 10:
+        return None
+
+    med = X_train.median(numeric_only=True)
+    model = RandomForestRegressor(
+        n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
+    )
+    model.fit(X_train, y_train)
+    return model, med
 
 
 class ParkingProcessing:
 
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    def __init__(self, df: pd.DataFrame, owned: bool = False):
+        self.df = adopt(df, owned)
 
     def _to_numeric(self, col: str):
         if col not in self.df.columns:
@@ -29,14 +64,11 @@ class ParkingProcessing:
         ).round(2)
 
 
-        def extract_parking_num(text):
-            text = str(text) if pd.notna(text) else ""
-            m = re.search(r"車位(\d+)", text)
-            return int(m.group(1)) if m else 0
-
         if "交易筆棟數" in self.df.columns:
+            # 交易筆棟數 例：土地1建物1車位2 → 2；無 車位N 時為 0
             self.df["車位數"] = (
-                self.df["交易筆棟數"].apply(extract_parking_num).astype("Int64")
+                self.df["交易筆棟數"].astype(str).str.extract(r"車位(\d+)", expand=False)
+                .fillna("0").astype("int64").astype("Int64")
             )
         else:
             self.df["車位數"] = pd.Series(0, index=self.df.index, dtype="Int64")
@@ -58,59 +90,50 @@ class ParkingProcessing:
         return self
 
 
-    def impute_parking_type(self):
+    def impute_parking_type(self, mode_by_type: pd.Series = None):
+        # mode_by_type：預先計算的 建物型態 → 車位類別 眾數（ModeTableStore 的主資料眾數，或分區執行時廣播）；
+        # 未提供時以 self.df 計算
 
         if "建物型態" not in self.df.columns or "車位類別" not in self.df.columns:
             return self
 
-        tmp = self.df.copy()
-        tmp.loc[tmp["車位類別"] == "無車位", "車位類別"] = np.nan
-
-
-        mode_by_type = tmp.groupby("建物型態")["車位類別"].transform(
-            lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else np.nan
-        )
-
+        if mode_by_type is None:
+            mode_by_type = parking_type_modes(self.df)
 
         mask_need = self.df["車位類別"].isna()
-        self.df.loc[mask_need, "車位類別"] = mode_by_type[mask_need].values
+        self.df.loc[mask_need, "車位類別"] = self.df.loc[mask_need, "建物型態"].map(mode_by_type).values
+        # 補值旗標：眾數表只計實際觀測值
+        self.df["車位類別補值"] = mask_need & self.df["車位類別"].notna()
 
         print("[ParkingProcessing] 車位類別補值完成。")
         return self
 
 
-    def impute_parking_price_rf(self):
+    def impute_parking_price_rf(self, model=None):
         #隨機森林補車位總價
+        #model：預先訓練的 (model, 特徵中位數)（分區執行時廣播，或 ParkingPriceModelStore 持久化的模型）；
+        #       未提供時以 self.df 訓練
         for col in ["總價元", "建物總坪數", "車位數", "車位總價元"]:
             self._to_numeric(col)
 
         mask_has = self.df["車位類別"] != "無車位"
-        mask_train = mask_has & self.df["車位總價元"].notna()
         mask_pred = mask_has & self.df["車位總價元"].isna()
+        # 補值旗標：主資料重新訓練模型時排除補值的車位總價
+        self.df["車位總價元補值"] = False
 
-        if mask_pred.sum() == 0 or mask_train.sum() < 10:
+        if mask_pred.sum() == 0:
             return self
 
-        feats = ["總價元", "建物總坪數", "車位數"]
-        X_train = self.df.loc[mask_train, feats].copy()
-        y_train = self.df.loc[mask_train, "車位總價元"].copy()
-        X_test = self.df.loc[mask_pred, feats].copy()
-
-        ok = (~X_train.isna().any(axis=1)) & (~y_train.isna())
-        X_train, y_train = X_train[ok].copy(), y_train[ok].copy()
+        if model is None:
+            model = fit_parking_price_model(self.df)
+            if model is None:
+                return self
 
-        if len(X_train) < 10:
-            return self
-
-        med = X_train.median(numeric_only=True)
-        X_test = X_test.fillna(med)
-
-        model = RandomForestRegressor(
-            n_estimators=100, max_depth=10, random_state=42, n_jobs=-1
-        )
-        model.fit(X_train, y_train)
+        model, med = model
+        X_test = self.df.loc[mask_pred, PRICE_FEATURES].fillna(med)
         pred = model.predict(X_test)
         self.df.loc[X_test.index, "車位總價元"] = np.round(pred)
+        self.df.loc[X_test.index, "車位總價元補值"] = True
         print("[ParkingProcessing] 車位總價補值完成。")
         return self
 
@@ -0,0 +1,170 @@
+import os
+from typing import Iterable, Optional
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from etl_01_extract.io_handler import read_csv_auto
+from etl_02_transform.MRT_distance import EARTH_RADIUS_KM, file_fingerprint
+
+# 半徑內點數的預設半徑（公尺）
+DEFAULT_RADII_M = (300, 500, 1000)
+# 每次查詢的房屋筆數上限：query 的暫存陣列為 chunk_size × k，記憶體與總筆數無關
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def read_point_csv(path: str, lat_col: str = "緯度", lng_col: str = "經度") -> pd.DataFrame:
+    """讀取點位 CSV（編碼 / 分隔符號由檔頭偵測），座標轉數值並去除缺值"""
+    points, _ = read_csv_auto(path)
+
+    missing = {lat_col, lng_col} - set(points.columns)
+    if missing:
+        raise ValueError(f"{path} 缺少座標欄位：{sorted(missing)}")
+    points[lat_col] = pd.to_numeric(points[lat_col], errors="coerce")
+    points[lng_col] = pd.to_numeric(points[lng_col], errors="coerce")
+    return points.dropna(subset=[lat_col, lng_col]).reset_index(drop=True)
+
+
+class PoiLayer:
+    """
+    單一 POI 點位圖層（學校、公園、醫院、公車站…）與其 haversine BallTree。
+    - k：輸出最近 k 個點的距離（k = 0 不輸出距離）
+    - radii_m：輸出各半徑內的點數
+    - name_col：有指定時一併輸出最近點的名稱
+    """
+
+    def __init__(self, name: str, points: pd.DataFrame, lat_col: str = "緯度", lng_col: str = "經度",
+                 name_col: Optional[str] = None, k: int = 1, radii_m: Iterable[int] = DEFAULT_RADII_M,
+                 fingerprint: str = ""):
+        self.name = name
+        self.k = max(0, min(int(k), len(points)))
+        self.radii_m = tuple(int(r) for r in radii_m)
+        self.fingerprint = fingerprint
+        self.names = points[name_col].astype(str).to_numpy(dtype=object) if name_col else None
+        self.tree = BallTree(np.deg2rad(points[[lat_col, lng_col]].to_numpy(dtype=float)), metric="haversine")
+        self.size = len(points)
+
+    @classmethod
+    def from_spec(cls, spec: dict, base_dir: str = ""):
+        """
+        spec 範例：
+        {"name": "學校", "path": "schools.csv", "name_col": "學校名稱", "k": 1, "radii_m": [300, 500, 1000]}
+        lat_col / lng_col 預設 緯度 / 經度。
+        """
+        path = os.path.join(base_dir, spec["path"])
+        lat_col, lng_col = spec.get("lat_col", "緯度"), spec.get("lng_col", "經度")
+        return cls(
+            spec["name"],
+            read_point_csv(path, lat_col, lng_col),
+            lat_col=lat_col,
+            lng_col=lng_col,
+            name_col=spec.get("name_col"),
+            k=spec.get("k", 1),
+            radii_m=spec.get("radii_m", DEFAULT_RADII_M),
+            fingerprint=file_fingerprint(path),
+        )
+
+    def feature_columns(self):
+        cols = []
+        if self.k:
+            if self.names is not None:
+                cols.append(f"最近{self.name}")
+            cols.append(f"{self.name}距離(km)")
+            cols.extend(f"{self.name}第{i}近距離(km)" for i in range(2, self.k + 1))
+        cols.extend(f"{self.name}數_{r}m" for r in self.radii_m)
+        return cols
+
+
+def load_poi_layers(specs, base_dir: str = ""):
+    """依設定載入圖層；檔案不存在的圖層略過"""
+    layers = []
+    for spec in specs:
+        path = os.path.join(base_dir, spec["path"])
+        if not os.path.exists(path):
+            print(f"[PoiFeatures] 找不到 {spec['name']} 點位檔，略過: {path}")
+            continue
+        layer = PoiLayer.from_spec(spec, base_dir)
+        print(f"[PoiFeatures] {layer.name}: {layer.size:,} 個點，k={layer.k}，半徑 {list(layer.radii_m)} m")
+        layers.append(layer)
+    return layers
+
+
+class PoiFeatures:
+    """
+    對所有房屋計算各圖層的最近距離與半徑內點數。
+    查詢依 chunk_size 分批，結果寫入預先配置的陣列；無座標的列輸出缺值。
+    """
+
+    def __init__(self, df: pd.DataFrame, layers, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.df = df
+        self.layers = list(layers)
+        self.chunk_size = chunk_size
+        self.step_metrics = {}
+
+    def _coords(self):
+        if "緯度" not in self.df.columns or "經度" not in self.df.columns:
+            raise ValueError("缺少必要欄位：緯度 / 經度")
+        lat = pd.to_numeric(self.df["緯度"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        lng = pd.to_numeric(self.df["經度"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lng)))
+        return np.deg2rad(np.column_stack([lat[valid], lng[valid]])), valid
+
+    def add_features(self):
+        print("[PoiFeatures] 計算 POI 距離與半徑內數量...")
+        coords, valid = self._coords()
+        n = len(self.df)
+
+        for layer in self.layers:
+            distances = np.full((n, layer.k), np.nan)
+            nearest = np.full(n, None, dtype=object) if layer.names is not None and layer.k else None
+            counts = {r: np.zeros(n, dtype=np.int32) for r in layer.radii_m}
+
+            for start in range(0, len(valid), self.chunk_size):
+                rows = valid[start:start + self.chunk_size]
+                chunk = coords[start:start + self.chunk_size]
+                if layer.k:
+                    dist, idx = layer.tree.query(chunk, k=layer.k)
+                    distances[rows] = dist * EARTH_RADIUS_KM
+                    if nearest is not None:
+                        nearest[rows] = layer.names[idx[:, 0]]
+                for r in layer.radii_m:
+                    counts[r][rows] = layer.tree.query_radius(chunk, r=r / 1000 / EARTH_RADIUS_KM, count_only=True)
+
+            if layer.k:
+                if nearest is not None:
+                    self.df[f"最近{layer.name}"] = nearest
+                self.df[f"{layer.name}距離(km)"] = distances[:, 0].round(3)
+                for i in range(1, layer.k):
+                    self.df[f"{layer.name}第{i + 1}近距離(km)"] = distances[:, i].round(3)
+            missing = np.ones(n, dtype=bool)
+            missing[valid] = False
+            for r in layer.radii_m:
+                self.df[f"{layer.name}數_{r}m"] = pd.arrays.IntegerArray(counts[r], missing)
+
+            print(f"   - {layer.name}: {', '.join(layer.feature_columns())}")
+
+        self.step_metrics = {"layers": [layer.name for layer in self.layers], "rows_with_coords": int(len(valid))}
+        return self
+
+
+def main():
+    CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+    PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+    input_path = os.path.join(PROJECT_ROOT, "main_house_rawdata", "merged_cleaned.csv")
+
+    if not os.path.exists(input_path):
+        print(f"找不到檔案: {input_path}")
+        return
+
+    df = pd.read_csv(input_path, encoding="utf-8-sig")
+    layers = load_poi_layers([
+        {"name": "捷運出口", "path": "mrt_location.csv", "name_col": "出入口名稱", "k": 1},
+    ], base_dir=PROJECT_ROOT)
+
+    poi = PoiFeatures(df, layers).add_features()
+    cols = [c for layer in layers for c in layer.feature_columns()]
+    print(poi.df[cols].head(10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+ROC_OFFSET = 1911
+
+
+def parse_roc_date(values: pd.Series) -> pd.DataFrame:
+    """
+    整欄解析民國日期（6 碼 YYMMDD / 7 碼 YYYMMDD）為西元 年/月/日。
+    無效值（長度不符、非數字、年月日超出範圍）三欄皆為 NaN。
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        # 整數欄位：與 astype(str) 後判斷 6/7 碼相同，即 100000 ~ 9999999
+        num = pd.to_numeric(values, errors="coerce").astype("float64")
+        num = num.where((num % 1 == 0) & (num >= 100000) & (num <= 9999999))
+    else:
+        s = values.astype(str).str.strip()
+        valid = s.str.fullmatch(r"[0-9]{6,7}").fillna(False).astype(bool)
+        num = pd.to_numeric(s.where(valid), errors="coerce").astype("float64")
+
+    arr = num.to_numpy()
+    year = arr // 10000 + ROC_OFFSET
+    month = arr // 100 % 100
+    day = arr % 100
+
+    ok = (year >= 1900) & (year <= 2100) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+    year = np.where(ok, year, np.nan)
+    month = np.where(ok, month, np.nan)
+    day = np.where(ok, day, np.nan)
+
+    return pd.DataFrame({"year": year, "month": month, "day": day}, index=values.index)
+
+
+def roc_parts_to_datetime(parts: pd.DataFrame) -> pd.Series:
+    """年/月/日 三欄轉 datetime64，不存在的日期（如 2/30）為 NaT"""
+    year = parts["year"].to_numpy()
+    month = parts["month"].to_numpy()
+    day = parts["day"].to_numpy()
+
+    ok = ~(np.isnan(year) | np.isnan(month) | np.isnan(day))
+    y = np.where(ok, year, 1970).astype("int64")
+    m = np.where(ok, month, 1).astype("int64")
+    d = np.where(ok, day, 1).astype("int64")
+
+    # 以月初 + (日-1) 組合日期，再檢查是否跨到下個月（例如 2/30）
+    month_start = (y - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (m - 1)
+    dates = month_start.astype("datetime64[D]") + (d - 1)
+    ok &= dates.astype("datetime64[M]") == month_start
+
+    dates = np.where(ok, dates, np.datetime64("NaT")).astype("datetime64[ns]")
+    return pd.Series(dates, index=parts.index)
+
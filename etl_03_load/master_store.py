@@ -0,0 +1,500 @@
+import functools
+import operator
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Iterator, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from arrow_tables import to_arrow_table
+from etl_02_transform.roc_date import parse_roc_date
+
+PARTITION_SCHEMA = pa.schema([
+    ("標的縣市", pa.string()),
+    ("交易年", pa.int32()),
+    ("交易季", pa.int8()),
+])
+PARTITION_COLUMNS = PARTITION_SCHEMA.names
+
+
+def _unify_schemas(schemas) -> pa.Schema:
+    """合併 schema；型別無法共同提升的欄位（例如數字與字串混雜）統一成字串，與 to_arrow_table 一致"""
+    try:
+        return pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        fields = {}
+        for schema in schemas:
+            for field in schema:
+                current = fields.get(field.name)
+                if current is None or current == field.type:
+                    fields[field.name] = field.type
+                    continue
+                try:
+                    fields[field.name] = pa.unify_schemas(
+                        [pa.schema([(field.name, current)]), pa.schema([field])], promote_options="permissive"
+                    ).field(0).type
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    fields[field.name] = pa.string()
+        return pa.schema(list(fields.items()))
+
+
+def _conform(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """依 schema 排列欄位並轉型，缺少的欄位補 null"""
+    columns = [
+        table.column(f.name).cast(f.type) if f.name in table.column_names else pa.nulls(table.num_rows, f.type)
+        for f in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def _remove_empty_dirs(root: Path):
+    for path in sorted((p for p in root.rglob("*") if p.is_dir()), key=lambda p: len(p.parts), reverse=True):
+        if not any(path.iterdir()):
+            path.rmdir()
+
+
+def add_partition_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """補上分區欄位：交易年（西元）與交易季；缺 交易年/交易月 時由 交易年月日 解析"""
+    df = df.copy()
+    if "交易年" in df.columns and "交易月" in df.columns:
+        year = pd.to_numeric(df["交易年"], errors="coerce")
+        month = pd.to_numeric(df["交易月"], errors="coerce")
+    elif "交易年月日" in df.columns:
+        parts = parse_roc_date(df["交易年月日"])
+        year, month = parts["year"], parts["month"]
+    else:
+        year = month = pd.Series(float("nan"), index=df.index)
+
+    df["交易年"] = year.astype("Int64")
+    df["交易季"] = ((month - 1) // 3 + 1).astype("Int64")
+    if "標的縣市" not in df.columns:
+        df["標的縣市"] = pd.NA
+    return df
+
+
+class MasterStore:
+    """
+    主資料 Parquet 儲存：依 標的縣市 / 交易年 / 交易季 分區（hive 目錄），
+    讀取支援欄位投影與 filters 條件下推（分區剪枝 + row group 統計）。
+
+    目錄結構：
+        root/標的縣市=.../交易年=.../交易季=.../part-*.parquet   base（compaction 後的完整資料）
+        root/_delta/seg-000001.parquet                          每次 upsert 的 delta（依 編號 排序）
+        root/_keys.sqlite                                       編號 → 所在 segment（0 = base）
+    同一 編號 以序號最大的 segment 為準；底線開頭的路徑不會被當成 base 分區讀取。
+    """
+
+    KEY = "編號"
+
+    def __init__(self, root: str, row_group_size: int = 128_000, compression: str = "zstd",
+                 max_deltas: int = 8, max_delta_ratio: float = 0.2):
+        self.root = Path(root)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.max_deltas = max_deltas
+        self.max_delta_ratio = max_delta_ratio
+
+    @property
+    def delta_dir(self) -> Path:
+        return self.root / "_delta"
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "_keys.sqlite"
+
+    def exists(self) -> bool:
+        return self.root.is_dir() and any(self.root.rglob("*.parquet"))
+
+    def _has_base(self) -> bool:
+        return self.root.is_dir() and any(
+            p for p in self.root.rglob("*.parquet") if not p.relative_to(self.root).parts[0].startswith("_")
+        )
+
+    def _dataset(self):
+        return ds.dataset(
+            self.root,
+            format="parquet",
+            partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+        )
+
+    def _delta_files(self) -> List[Path]:
+        return sorted(self.delta_dir.glob("seg-*.parquet")) if self.delta_dir.is_dir() else []
+
+    def _write_dataset(self, table: pa.Table, root: Path, existing="overwrite_or_ignore", basename="part-{i}.parquet"):
+        file_options = ds.ParquetFileFormat().make_write_options(
+            compression=self.compression, write_statistics=True
+        )
+        ds.write_dataset(
+            table,
+            root,
+            format="parquet",
+            partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+            file_options=file_options,
+            basename_template=basename,
+            max_rows_per_group=self.row_group_size,
+            min_rows_per_group=min(self.row_group_size, 16_384),
+            existing_data_behavior=existing,
+        )
+
+    # ---------- key index ----------
+
+    def _connect_index(self, path: Optional[Path] = None):
+        conn = sqlite3.connect(str(path or self.index_path))
+        conn.execute("CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY, seq INTEGER NOT NULL)")
+        return conn
+
+    def _build_index(self, root: Path):
+        """由 root 下的 base 分區重建 key index（compaction / 整份覆寫時）"""
+        conn = self._connect_index(root / "_keys.sqlite")
+        dataset = ds.dataset(root, format="parquet", partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"))
+        if self.KEY in dataset.schema.names:
+            for batch in dataset.to_batches(columns=[self.KEY], batch_size=200_000):
+                keys = batch.column(0).cast(pa.string()).to_pylist()
+                conn.executemany("INSERT OR REPLACE INTO keys VALUES (?, 0)", ((k,) for k in keys if k is not None))
+        conn.commit()
+        conn.close()
+
+    def rebuild_index(self):
+        """index 與檔案不一致時（例如中斷）重建：base → 0，delta 依序覆蓋"""
+        if self.index_path.exists():
+            self.index_path.unlink()
+        self._build_index(self.root)
+        conn = self._connect_index()
+        for path in self._delta_files():
+            seq = int(path.stem.split("-")[1])
+            keys = pq.read_table(path, columns=[self.KEY]).column(0).cast(pa.string()).to_pylist()
+            conn.executemany("INSERT OR REPLACE INTO keys VALUES (?, ?)", ((k, seq) for k in keys if k is not None))
+        conn.commit()
+        conn.close()
+        return self
+
+    # ---------- 寫入 ----------
+
+    def write(self, df: pd.DataFrame):
+        """整份覆寫：先寫到暫存目錄再置換，舊版保留為 .bak"""
+        table = to_arrow_table(add_partition_columns(df))
+
+        tmp = self.root.with_name(self.root.name + ".tmp")
+        bak = self.root.with_name(self.root.name + ".bak")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        self._write_dataset(table, tmp)
+        self._build_index(tmp)
+
+        if self.root.exists():
+            if bak.exists():
+                shutil.rmtree(bak)
+            self.root.rename(bak)
+        tmp.rename(self.root)
+        print(f"[MasterStore] 已寫入 {table.num_rows:,} 筆至 {self.root}")
+        return self
+
+    def upsert(self, df: pd.DataFrame):
+        """
+        以 編號 為 key 寫入一個 delta segment，成本與本批筆數成正比，不讀取既有主資料。
+        回傳 (新增筆數, 更新筆數)。
+        """
+        if self.KEY not in df.columns:
+            raise ValueError(f"upsert 需要 [{self.KEY}] 欄位")
+        if not self.exists():
+            self.write(df)
+            return len(df), 0
+
+        df = df.dropna(subset=[self.KEY]).drop_duplicates(subset=[self.KEY], keep="last")
+        df = add_partition_columns(df)
+        df[self.KEY] = df[self.KEY].astype(str)
+        df = df.sort_values(self.KEY)
+        table = to_arrow_table(df)
+
+        files = self._delta_files()
+        seq = int(files[-1].stem.split("-")[1]) + 1 if files else 1
+        self.delta_dir.mkdir(parents=True, exist_ok=True)
+        path = self.delta_dir / f"seg-{seq:06d}.parquet"
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(
+            table, tmp,
+            compression=self.compression, row_group_size=self.row_group_size, write_statistics=True,
+        )
+        tmp.replace(path)
+
+        keys = df[self.KEY].tolist()
+        conn = self._connect_index()
+        existing = 0
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            existing += conn.execute(
+                f"SELECT COUNT(*) FROM keys WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchone()[0]
+        conn.executemany(
+            "INSERT INTO keys VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET seq = excluded.seq",
+            ((k, seq) for k in keys),
+        )
+        conn.commit()
+        conn.close()
+
+        inserted, updated = len(keys) - existing, existing
+        print(f"[MasterStore] upsert segment {seq}：新增 {inserted:,} 筆，更新 {updated:,} 筆")
+        return inserted, updated
+
+    def needs_compaction(self) -> bool:
+        files = self._delta_files()
+        if not files:
+            return False
+        if len(files) >= self.max_deltas:
+            return True
+        delta_rows = sum(pq.ParquetFile(f).metadata.num_rows for f in files)
+        base_rows = self._dataset().count_rows() if self._has_base() else 0
+        return delta_rows >= self.max_delta_ratio * max(base_rows, 1)
+
+    def _partition_expression(self, values: dict):
+        expr = None
+        for col in PARTITION_COLUMNS:
+            cond = ds.field(col).is_null() if values[col] is None else ds.field(col) == values[col]
+            expr = cond if expr is None else expr & cond
+        return expr
+
+    def compact(self):
+        """
+        逐分區合併 base 與所有 delta：只重寫有 delta 或含被取代 編號 的分區，
+        其餘分區檔以 hard link 沿用；delta 帶來新欄位或型別改變時所有分區依序重寫。
+        """
+        files = self._delta_files()
+        if not files:
+            return self
+        print(f"[MasterStore] compaction：合併 {len(files)} 個 delta segment")
+        tables, delta_keys = self._delta_tables(None, None)
+        deltas = pa.concat_tables(tables, promote_options="permissive")
+        for field in PARTITION_SCHEMA:
+            i = deltas.schema.get_field_index(field.name)
+            deltas = deltas.set_column(i, field, deltas.column(i).cast(field.type))
+        if not self._has_base():
+            return self.write(deltas.to_pandas())
+
+        base = self._dataset()
+        schema = _unify_schemas([base.schema, deltas.schema])
+        stale = ds.field(self.KEY).cast(pa.string()).isin(pa.array(sorted(delta_keys), pa.string()))
+        if schema.equals(base.schema):
+            touched = base.to_table(columns=PARTITION_COLUMNS, filter=stale)
+            parts = pa.concat_tables([touched, deltas.select(PARTITION_COLUMNS)], promote_options="permissive")
+        else:
+            parts = pa.concat_tables([base.to_table(columns=PARTITION_COLUMNS), deltas.select(PARTITION_COLUMNS)],
+                                     promote_options="permissive")
+        parts = parts.group_by(PARTITION_COLUMNS).aggregate([]).to_pylist()
+        delta_rows = {tuple(r[c] for c in PARTITION_COLUMNS): r["rows"] for r in
+                      deltas.group_by(PARTITION_COLUMNS).aggregate([([], "count_all")])
+                      .rename_columns(PARTITION_COLUMNS + ["rows"]).to_pylist()}
+        for values in parts:
+            values["rows"] = delta_rows.get(tuple(values[c] for c in PARTITION_COLUMNS), 0)
+
+        tmp = self.root.with_name(self.root.name + ".tmp")
+        bak = self.root.with_name(self.root.name + ".bak")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        shutil.copytree(self.root, tmp, ignore=shutil.ignore_patterns("_*"), copy_function=_link_or_copy)
+
+        fragments = {}
+        for fragment in base.get_fragments():
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            fragments.setdefault(tuple(keys.get(c) for c in PARTITION_COLUMNS), []).append(fragment)
+
+        # 分區依筆數合併成批（約 row_group_size 筆）一起讀寫，記憶體上限與整份主資料大小無關
+        group, group_fragments, group_rows = [], [], 0
+        for i, values in enumerate(parts):
+            for fragment in fragments.get(tuple(values[c] for c in PARTITION_COLUMNS), []):
+                group_rows += fragment.metadata.num_rows
+                group_fragments.append(fragment)
+                (tmp / Path(fragment.path).relative_to(self.root)).unlink()
+            group.append(self._partition_expression(values))
+            group_rows += values["rows"]
+            if group_rows < self.row_group_size and i < len(parts) - 1:
+                continue
+            old = ds.FileSystemDataset(group_fragments, base.schema, base.format, base.filesystem)
+            table = pa.concat_tables([
+                _conform(old.to_table(filter=~stale), schema),
+                _conform(deltas.filter(functools.reduce(operator.or_, group)), schema),
+            ])
+            if table.num_rows:
+                self._write_dataset(table, tmp)
+            group, group_fragments, group_rows = [], [], 0
+        _remove_empty_dirs(tmp)
+        self._build_index(tmp)
+
+        if bak.exists():
+            shutil.rmtree(bak)
+        self.root.rename(bak)
+        tmp.rename(self.root)
+        print(f"[MasterStore] compaction 完成：重寫 {len(parts)} 個分區，清除 delta")
+        return self
+
+    # ---------- 讀取 ----------
+
+    def _check_columns(self, columns):
+        missing = [c for c in (columns or []) if c not in self.columns()]
+        if missing:
+            raise ValueError(f"主資料缺少欄位：{missing}")
+
+    def _to_expression(self, filters):
+        if filters is None or isinstance(filters, ds.Expression):
+            return filters
+        return pq.filters_to_expression(filters)
+
+    def _delta_tables(self, columns, expr):
+        """
+        依 key index 先決定每個 編號 的最新 segment，只在各 segment 的最新列上套用 filters；
+        回傳 (Arrow table 清單, 所有 delta 的 編號)。
+        """
+        files = self._delta_files()
+        if not files:
+            return [], set()
+        if not self.index_path.exists():
+            self.rebuild_index()
+        latest = {}
+        conn = self._connect_index()
+        for key, seq in conn.execute("SELECT key, seq FROM keys WHERE seq > 0"):
+            latest.setdefault(seq, []).append(key)
+        conn.close()
+
+        tables, keys = [], set()
+        for path in files:
+            current = latest.get(int(path.stem.split("-")[1]))
+            if not current:
+                continue
+            keys.update(current)
+            seg_expr = ds.field(self.KEY).cast(pa.string()).isin(pa.array(current, pa.string()))
+            seg_expr = seg_expr if expr is None else seg_expr & expr
+            dataset = ds.dataset(path, format="parquet")
+            cols = None if columns is None else [c for c in columns if c in dataset.schema.names]
+            try:
+                tables.append(dataset.to_table(columns=cols, filter=seg_expr))
+            except pa.ArrowInvalid:
+                # filters 用到此 segment 沒有的欄位，視同全部不符合
+                continue
+        return tables, keys
+
+    def _read_deltas(self, columns, expr) -> pd.DataFrame:
+        """讀取 delta 中各 編號 的最新版本（符合 filters 者）；回傳 (資料, 所有 delta 的 編號)"""
+        tables, keys = self._delta_tables(columns, expr)
+        frames = [t.to_pandas() for t in tables if t.num_rows]
+        if not frames:
+            return pd.DataFrame(columns=columns or []), keys
+        return pd.concat(frames, ignore_index=True), keys
+
+    def _read_columns(self, columns):
+        # 解析 delta 需要 編號，讀完再移除
+        if columns is None or self.KEY in columns:
+            return columns, False
+        return list(columns) + [self.KEY], True
+
+    def read(self, columns: Optional[List[str]] = None, filters=None) -> pd.DataFrame:
+        """
+        columns：只讀取指定欄位
+        filters：pyarrow Expression 或 [("標的縣市", "=", "臺北市"), ("交易年", ">=", 2023)] 形式
+        """
+        if not self.exists():
+            return pd.DataFrame(columns=columns or [])
+        frames = list(self.iter_batches(columns=columns, filters=filters, batch_size=None))
+        if not frames:
+            return pd.DataFrame(columns=columns or self.columns())
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_batches(self, columns: Optional[List[str]] = None, filters=None,
+                     batch_size: Optional[int] = 200_000) -> Iterator[pd.DataFrame]:
+        """分批讀取 base（排除已被 delta 取代的 編號），最後輸出 delta 的最新版本"""
+        if not self.exists():
+            return
+        self._check_columns(columns)
+        read_cols, drop_key = self._read_columns(columns)
+        expr = self._to_expression(filters)
+        deltas, delta_keys = self._read_deltas(read_cols, expr)
+
+        if self._has_base():
+            base_expr = expr
+            if delta_keys:
+                stale = ds.field(self.KEY).cast(pa.string()).isin(pa.array(sorted(delta_keys), pa.string()))
+                base_expr = ~stale if base_expr is None else base_expr & ~stale
+            dataset = self._dataset()
+            base_cols = None if read_cols is None else [c for c in read_cols if c in dataset.schema.names]
+            try:
+                if batch_size is None:
+                    batches = [dataset.to_table(columns=base_cols, filter=base_expr)]
+                else:
+                    batches = dataset.scanner(columns=base_cols, filter=base_expr, batch_size=batch_size).to_batches()
+            except pa.ArrowInvalid:
+                # filters 用到 base 沒有的欄位，視同全部不符合
+                batches = []
+            for batch in batches:
+                if batch.num_rows:
+                    frame = batch.to_pandas()
+                    yield frame.drop(columns=[self.KEY]) if drop_key else frame
+
+        if len(deltas):
+            yield deltas.drop(columns=[self.KEY]) if drop_key else deltas
+
+    def columns(self) -> List[str]:
+        if not self.exists():
+            return []
+        names = list(self._dataset().schema.names) if self._has_base() else []
+        for path in self._delta_files():
+            names += [c for c in pq.read_schema(path).names if c not in names]
+        return names
+
+    def count_rows(self, filters=None) -> int:
+        if not self.exists():
+            return 0
+        return sum(len(frame) for frame in self.iter_batches(columns=[self.KEY], filters=filters))
+
+    def import_csv(self, csv_path, encoding: str = "utf-8-sig"):
+        """由舊版 cleaning_main_data.csv 建立分區 Parquet"""
+        df = pd.read_csv(csv_path, encoding=encoding, low_memory=False)
+        print(f"[MasterStore] 由 CSV 匯入 {len(df):,} 筆：{csv_path}")
+        return self.write(df)
+
+    def export_csv(self, csv_path, encoding: str = "utf-8-sig"):
+        """輸出 CSV（選用產物），分批寫入"""
+        csv_path = Path(csv_path)
+        csv_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = csv_path.with_name(csv_path.name + ".tmp")
+        header = True
+        for chunk in self.iter_batches():
+            chunk.to_csv(tmp, mode="w" if header else "a", header=header, index=False, encoding=encoding)
+            header = False
+        if header:
+            pd.DataFrame(columns=self.columns()).to_csv(tmp, index=False, encoding=encoding)
+        tmp.replace(csv_path)
+        print(f"[MasterStore] 已匯出 CSV：{csv_path}")
+        return csv_path
+
+
+def read_master(path, columns: Optional[List[str]] = None, filters=None) -> pd.DataFrame:
+    """主資料讀取入口：目錄為 Parquet 分區儲存，否則視為 CSV"""
+    path = Path(path)
+    if path.is_dir():
+        return MasterStore(path).read(columns=columns, filters=filters)
+    if filters is not None:
+        raise ValueError("CSV 主資料不支援 filters")
+    if columns is not None:
+        header = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"主資料缺少欄位：{missing}")
+    return pd.read_csv(path, usecols=columns, encoding="utf-8-sig", low_memory=False)
+
+
+def iter_master(path, columns: Optional[List[str]] = None, chunksize: int = 200_000) -> Iterator[pd.DataFrame]:
+    """主資料分批讀取入口（Parquet 目錄或 CSV）"""
+    path = Path(path)
+    if path.is_dir():
+        yield from MasterStore(path).iter_batches(columns=columns, batch_size=chunksize)
+    else:
+        yield from pd.read_csv(path, usecols=columns, encoding="utf-8-sig", chunksize=chunksize, low_memory=False)
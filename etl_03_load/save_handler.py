@@ -1,24 +1,43 @@
 import pandas as pd
 from pathlib import Path
+from typing import Optional
+from etl_01_extract.io_handler import read_frame
+from etl_03_load.master_store import MasterStore
 
 class MainDataLoader:
 
-    def __init__(self, main_data_path: str, new_data_path: str, output_path: str):
+    def __init__(self, main_data_path: str, new_data_path: str, output_path: Optional[str] = None):
+        # main_data_path 為目錄時視為 Parquet 分區主資料（MasterStore），以 編號 upsert
+        # 否則維持 CSV 模式，輸出至 output_path
         self.main_data_path = Path(main_data_path)
         self.new_data_path = Path(new_data_path)
-        self.output_path = Path(output_path)
-
-    def load(self):
-        
-
-        old_main = pd.read_csv(self.main_data_path, encoding="utf-8-sig")
-        new_cleaned = pd.read_csv(self.new_data_path, encoding="utf-8-sig")
+        self.output_path = Path(output_path) if output_path else None
 
+    def _merge(self, old_main, new_cleaned):
         merged = pd.concat([old_main, new_cleaned], ignore_index=True)
         if "編號" in merged.columns:
             merged.drop_duplicates(subset=["編號"], keep="last", inplace=True)
         else:
             print("找不到『編號』欄位")
+        return merged
+
+    def load(self):
+        # 清整結果為 Arrow IPC 中繼檔（memory-mapped 讀取、型別保留）或 CSV
+        new_cleaned = read_frame(self.new_data_path)
+
+        if self.main_data_path.is_dir():
+            # 只寫入本批 delta，不讀取整份主資料；delta 累積到門檻才 compaction
+            store = MasterStore(self.main_data_path)
+            if "編號" not in new_cleaned.columns:
+                print("找不到『編號』欄位")
+                return self.main_data_path
+            store.upsert(new_cleaned)
+            if store.needs_compaction():
+                store.compact()
+            return self.main_data_path
+
+        old_main = pd.read_csv(self.main_data_path, encoding="utf-8-sig")
+        merged = self._merge(old_main, new_cleaned)
 
         merged.to_csv(self.output_path, index=False, encoding="utf-8-sig")
         print(f" 已更新 main_data，筆數：{len(merged):,}")
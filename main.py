@@ -1,225 +1,376 @@
 # 這是修正後的 main.py，讓邏輯順暢且不會讀到舊資料
+# 各步驟登錄為 pipeline stage，可用 --from-stage / --to-stage 續跑或只跑部分流程
 
+import argparse
 import os
-import shutil
 import pandas as pd
 
 # 引用您的自定義模組
 from etl_01_extract.download_house_data import HouseDownload
+from etl_01_extract.season_backfill import SeasonBackfill, enumerate_seasons
 from etl_01_extract.raw_merger import RawMerger
-from etl_01_extract.io_handler import IOHandler
-from etl_02_transform.filter_basic import FilterBasic
-from etl_02_transform.date_houseage import DateHouseAge
-from etl_02_transform.material_processing import MaterialProcessing
-from etl_02_transform.parking_processing import ParkingProcessing
-from etl_02_transform.floor_processing import FloorProcessing
-from etl_02_transform.price_final_cleaning import PriceFinalCleaning
-from etl_02_transform.elevator_processing import ElevatorProcessing
+from etl_01_extract.io_handler import IOHandler, feather_num_rows, is_feather, read_frame
+from etl_01_extract.ingest_ledger import IngestLedger
+from etl_01_extract import moi_schema as moi_schema_module
+from etl_02_transform import (
+    filter_basic as filter_basic_module,
+    date_houseage as date_houseage_module,
+    roc_date as roc_date_module,
+    parking_processing as parking_processing_module,
+    parking_price_model as parking_price_model_module,
+    material_processing as material_processing_module,
+    mode_tables as mode_tables_module,
+    floor_processing as floor_processing_module,
+    price_final_cleaning as price_final_cleaning_module,
+    elevator_processing as elevator_processing_module,
+    lat_lng_processing as lat_lng_processing_module,
+    geocode_cache as geocode_cache_module,
+    MRT_distance as mrt_distance_module,
+    poi_features as poi_features_module,
+    city_partition as city_partition_module,
+)
+from etl_02_transform.copy_mode import enable_copy_on_write
+from etl_02_transform.city_partition import run_step
 from etl_02_transform.lat_lng_processing import LatLngUpdate
 from etl_02_transform.MRT_distance import MrtDistance
+from etl_02_transform.parking_price_model import ParkingPriceModelStore
+from etl_02_transform.mode_tables import ModeTableStore
+from etl_02_transform.poi_features import PoiFeatures, load_poi_layers
 from etl_03_load.save_handler import MainDataLoader
+from etl_03_load.master_store import MasterStore
+from pipeline import PipelineRunner, Stage, StopPipeline
+from run_metrics import MetricsRecorder
 
 def check_file_has_data(filepath):
     """檢查檔案是否存在且有資料 (不包含 header)"""
     if not os.path.exists(filepath):
         return False
     try:
+        if is_feather(filepath):
+            return feather_num_rows(filepath) > 0
         df = pd.read_csv(filepath, nrows=1)
         return not df.empty
     except:
         return False
 
-def main():
+
+def build_pipeline(profile=False, trace_memory=False, transform_workers=1, backfill_from=None, backfill_workers=4):
     # ==========================================
     # 1. 路徑設定 (Parent Directory 修正版)
     # ==========================================
     CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
     PROJECT_ROOT = os.path.dirname(CURRENT_DIR)  # 指向上一層 C:\sideProject
 
+    # 主資料以 Parquet 分區儲存；CSV 僅為選用的匯出檔
+    MASTER_STORE_PATH = os.path.join(PROJECT_ROOT, "cleaning_house_rawdata", "main_data_parquet")
     MASTER_DATA_PATH = os.path.join(PROJECT_ROOT, "cleaning_house_rawdata", "cleaning_main_data.csv")
-    TEMP_OUTPUT_PATH = os.path.join(PROJECT_ROOT, "cleaning_house_rawdata", "main_data_updated.csv")
+    EXPORT_MASTER_CSV = False
+    # transform_workers > 1：filter_basic ~ elevator 依縣市分區以 process pool 執行
+    # 免複製模式：stage 之間以所有權交接 DataFrame（上游輸出交給下游後不再使用），各類別不做防禦性複製
+    # （city_partition 的步驟一律接手輸入的 df）
+    COPY_FREE = True
     RAW_FOLDER = os.path.join(PROJECT_ROOT, "house_rawdata")
-    MERGED_RAW_PATH = os.path.join(PROJECT_ROOT, "main_house_rawdata", "merged_rawdata.csv")
-    MERGED_CLEANED_PATH = os.path.join(PROJECT_ROOT, "main_house_rawdata", "merged_cleaned.csv")
+    # 開放資料 zip 下載區（保留 zip 與 ETag / Last-Modified，本期未更新時不重新下載）
+    DOWNLOAD_DIR = os.path.join(PROJECT_ROOT, "downloads")
+    # 階段之間的中繼檔為 Arrow IPC：型別保留、memory-mapped 讀取（"zstd" 檔案較小但讀取需解壓）
+    MERGED_RAW_PATH = os.path.join(PROJECT_ROOT, "main_house_rawdata", "merged_rawdata.arrow")
+    MERGED_CLEANED_PATH = os.path.join(PROJECT_ROOT, "main_house_rawdata", "merged_cleaned.arrow")
+    INTERMEDIATE_COMPRESSION = "uncompressed"
+    # 清整結果另外匯出 CSV（選用產物，cleanup 不刪除）
+    EXPORT_CLEANED_CSV = False
+    CLEANED_CSV_PATH = os.path.join(PROJECT_ROOT, "main_house_rawdata", "merged_cleaned.csv")
+    CHECKPOINT_DIR = os.path.join(PROJECT_ROOT, "main_house_rawdata", "checkpoints")
     MRT_LOCATION_PATH = os.path.join(CURRENT_DIR, "mrt_location.csv")
+    # 捷運出入口 BallTree 持久化，mrt_location.csv 內容變更時才重建
+    MRT_INDEX_PATH = os.path.join(PROJECT_ROOT, "main_house_rawdata", "mrt_index.pkl")
+    # 另外輸出最近 k 個不同車站（> 1 時才輸出）
+    MRT_K_STATIONS = 0
+    # POI 點位圖層（放在 poi_data/，缺檔的圖層略過）：最近距離與 300m / 500m / 1km 內數量
+    POI_DIR = os.path.join(PROJECT_ROOT, "poi_data")
+    POI_LAYERS = [
+        {"name": "學校", "path": "schools.csv", "name_col": "學校名稱", "k": 1},
+        {"name": "公園", "path": "parks.csv", "name_col": "公園名稱", "k": 1},
+        {"name": "醫院", "path": "hospitals.csv", "name_col": "醫院名稱", "k": 1},
+        {"name": "公車站", "path": "bus_stops.csv", "k": 3},
+    ]
+    # 車位總價補值模型：以主資料訓練後持久化，特徵漂移或主資料成長超過門檻才重新訓練（"rf" 或 "hgb"）
+    PARKING_MODEL_PATH = os.path.join(PROJECT_ROOT, "cleaning_house_rawdata", "models", "parking_price_model.pkl")
+    PARKING_PRICE_ESTIMATOR = "rf"
+    # 建物型態 → 主要建材 / 車位類別 眾數表：由主資料建立，每批寫入主資料後累加
+    MODE_TABLE_PATH = os.path.join(PROJECT_ROOT, "cleaning_house_rawdata", "mode_tables.sqlite")
+    GEOCODE_CACHE_PATH = os.path.join(PROJECT_ROOT, "cleaning_house_rawdata", "geocode_cache.sqlite")
+    INGEST_LEDGER_PATH = os.path.join(PROJECT_ROOT, "cleaning_house_rawdata", "ingest_ledger.sqlite")
+    RUN_HISTORY_PATH = os.path.join(PROJECT_ROOT, "cleaning_house_rawdata", "run_history.jsonl")
+    PROFILE_DIR = os.path.join(PROJECT_ROOT, "main_house_rawdata", "profiles")
 
-    MASTER_EXISTS = os.path.exists(MASTER_DATA_PATH)
+    master_store = MasterStore(MASTER_STORE_PATH)
+    parking_price_store = ParkingPriceModelStore(PARKING_MODEL_PATH, estimator=PARKING_PRICE_ESTIMATOR)
+    mode_store = ModeTableStore(MODE_TABLE_PATH, master_path=MASTER_STORE_PATH)
+    enable_copy_on_write()
 
     print(f"專案根目錄: {PROJECT_ROOT}")
-    print(f"主資料檔: {MASTER_DATA_PATH}")
+    print(f"主資料: {MASTER_STORE_PATH}")
     print(f"原始檔下載區: {RAW_FOLDER}")
 
+    # 每個 stage 與各 stage 類別的每個方法都記錄時間 / 記憶體 / 筆數，append 到 run_history.jsonl
+    recorder = MetricsRecorder(
+        history_path=RUN_HISTORY_PATH,
+        trace_memory=trace_memory,
+        profile_dir=PROFILE_DIR if profile else None,
+    )
+    pipeline = PipelineRunner(CHECKPOINT_DIR, recorder=recorder, profile=profile)
+
     # ==========================================
     # 2. Extract: 下載最新資料
     # ==========================================
-    print("\n[Step 1] 開始下載資料")
-    try:
-        rawdata_download = HouseDownload()
-        rawdata_download.visit()
-        rawdata_download.search()
-        rawdata_download.save_csv()
-    except Exception as e:
-        print(f"下載過程發生錯誤: {e}")
+    def download():
+        print("[Step 1] 開始下載資料")
+        if not master_store.exists() and os.path.exists(MASTER_DATA_PATH):
+            # 第一次執行：由舊版 CSV 主檔建立 Parquet 分區
+            master_store.import_csv(MASTER_DATA_PATH)
+        try:
+            rawdata_download = HouseDownload(download_path=DOWNLOAD_DIR, save_path=RAW_FOLDER)
+            rawdata_download.download_current()
+        except Exception as e:
+            print(f"下載過程發生錯誤: {e}")
+        if backfill_from:
+            # 歷史季度回補：各季 zip 放進原始資料夾，由 merge 的匯入帳本判斷新檔
+            SeasonBackfill(DOWNLOAD_DIR, RAW_FOLDER, workers=backfill_workers).run(enumerate_seasons(backfill_from))
 
     # ==========================================
-    # 3. Merge: 智慧合併判斷 (讓 RawMerger 負責清除舊中繼檔)
+    # 3. Merge: 依匯入帳本判斷新檔案並合併
     # ==========================================
-    print("\n[Step 2] 檢查新檔案並合併...")
-    
-    if not os.path.exists(RAW_FOLDER):
-        print(f"錯誤: 找不到原始資料夾 {RAW_FOLDER}")
-        return
+    def merge(_):
+        print("[Step 2] 檢查新檔案並合併...")
 
-    # 執行 RawMerger，它內部會先刪除舊的 merged_rawdata.csv，然後比對 Master，寫入新資料。
-    raw_merger = RawMerger(
-        raw_folder=RAW_FOLDER,
-        merged_path=MERGED_RAW_PATH,
-        master_path=MASTER_DATA_PATH  # 傳入 Master Data 進行比對
-    )
-    merged_path = raw_merger.merge()
+        if not os.path.exists(RAW_FOLDER):
+            raise StopPipeline(f"錯誤: 找不到原始資料夾 {RAW_FOLDER}")
 
-    # 檢查是否產生資料 (這才是 Step 3 該讀取的內容)
-    if not check_file_has_data(merged_path):
-        print("最終檢查：沒有產生任何新資料，程式結束 (無需 ETL)。")
-        return
+        # 執行 RawMerger：依匯入帳本判斷新檔或內容變更的檔案，寫入中繼檔。
+        raw_merger = RawMerger(
+            raw_folder=RAW_FOLDER,
+            merged_path=MERGED_RAW_PATH,
+            master_path=MASTER_STORE_PATH if master_store.exists() else None,  # 僅第一次建立帳本時使用
+            ledger_path=INGEST_LEDGER_PATH,
+            compression=INTERMEDIATE_COMPRESSION,
+        )
+        merged_path = raw_merger.merge()
+        raw_merger.ledger.close()
+
+        # 檢查是否產生資料 (這才是 Step 3 該讀取的內容)
+        if not check_file_has_data(merged_path):
+            raise StopPipeline("最終檢查：沒有產生任何新資料，程式結束 (無需 ETL)。")
+        return merged_path
 
     # ==========================================
     # 4. Transform: ETL 清整流程
     # ==========================================
-    print(f"\n[Step 3] 開始 ETL 清整")
-    
-    os.makedirs(os.path.dirname(MERGED_CLEANED_PATH), exist_ok=True)
-
-    # 這裡的 io.load() 現在會讀取一個乾淨的 merged_rawdata.csv (只包含本次新資料)
-    io = IOHandler(input_path=merged_path, output_path=MERGED_CLEANED_PATH)
-    df = io.load()
-    print(f"載入資料筆數: {len(df)}") # 這裡應該是 A/F/H 的實際筆數
-
-    # --- 各項清洗邏輯 ---
-    print("執行基礎過濾")
-    filter_basic = FilterBasic(df)
-    filter_basic.remove_pua_chars_from_address()
-    filter_basic.drop_duplicates_by_id()
-    filter_basic.unify_columns()
-    filter_basic.filter_out_transaction_targets()
-    filter_basic.keep_residential_usage()
-    filter_basic.keep_urban_zone_residential()
-    filter_basic.filter_out_non_urban_zones()
-    filter_basic.remove_notes_with_keywords()
-    filter_basic.cleaning_house_type()
-    filter_basic.add_city_from_source()
-    df = filter_basic.df
-
-    print("計算屋齡")
-    house_age = DateHouseAge(df)
-    house_age.parse_dates()
-    house_age.calculate_house_age()
-    house_age.drop_abnormal_houseage()
-    df = house_age.df
-
-    print("處理車位資訊")
-    parking_process = ParkingProcessing(df)
-    parking_process.process_parking()
-    parking_process.impute_parking_type()
-    parking_process.impute_parking_price_rf()
-    parking_process.calculate_parking_price_per_ping()
-    df = parking_process.df
-
-    print("填補主要建材")
-    material_process = MaterialProcessing(df)
-    material_process.impute_main_material()
-    df = material_process.df
-
-    print("處理樓層資訊")
-    floor_process = FloorProcessing(df)
-    floor_process.total_floor()
-    floor_process.count_transfer_floors()
-    floor_process.extract_highest_floor()
-    df = floor_process.df
-
-    print("計算單價與清除缺失值")
-    price_clean = PriceFinalCleaning(df)
-    price_clean.price_ping()
-    price_clean.drop_missing_core_fields()
-    df = price_clean.df
-
-    print("推論電梯")
-    elevator_process = ElevatorProcessing(df)
-    elevator_process.infer_elevator()
-    df = elevator_process.df
-
-    print("補經緯度")
-    lat_lng_master_path = MASTER_DATA_PATH if MASTER_EXISTS else None
-    
-    try:
-        lat_lng_update = LatLngUpdate(df, main_data_path=lat_lng_master_path)
-        lat_lng_update.visit()
-        lat_lng_update.update_lat_lng()
-        lat_lng_update.quit()
-        df = lat_lng_update.df
-    except Exception as e:
-        print(f"經緯度更新發生例外: {e}")
-
-    print("  -> 計算捷運距離")
-    if os.path.exists(MRT_LOCATION_PATH):
-        mrt_distance = MrtDistance(df, mrt_path=MRT_LOCATION_PATH)
+    def load_raw(merged_path):
+        print("[Step 3] 開始 ETL 清整")
+        # 讀取 merged_rawdata.arrow (只包含本次新資料)
+        # 讀檔時即套用 MOI 欄名 / 型別（category、Arrow 字串、數值降階）
+        io = recorder.instrument(IOHandler(input_path=MERGED_RAW_PATH, moi_schema=True))
+        df = io.load()
+        print(f"載入資料筆數: {len(df)}") # 這裡應該是 A/F/H 的實際筆數
+        return df
+
+    # 各 transform 由 city_partition 的步驟執行：TRANSFORM_WORKERS > 1 時依縣市分區平行處理，
+    # 全域統計由持久化的主資料統計提供：車位類別 / 主要建材 眾數來自 mode_store（主資料 + 本批已知值），
+    # 車位總價模型來自 parking_price_store；無法取得時才以整批資料計算再廣播
+    def run_transform(name, df, stats=None):
+        return run_step(name, df, workers=transform_workers, wrap=recorder.instrument, stats=stats)
+
+    def filter_basic(df):
+        print("執行基礎過濾")
+        # 亂碼地址 / 重複編號 / 各欄位條件合併成一個 mask 套用，各規則刪除筆數記錄在 run history
+        # 新舊欄名已在讀檔時統一，不需 unify_columns
+        return run_transform("filter_basic", df)
+
+    def house_age(df):
+        print("計算屋齡")
+        return run_transform("house_age", df)
+
+    def parking(df):
+        print("處理車位資訊")
+        price_model = parking_price_store.model_for(df, MASTER_STORE_PATH if master_store.exists() else None)
+        return run_transform("parking", df, {
+            "parking_type_modes": mode_store.modes("parking_type", df),
+            "parking_price_model": price_model,
+        })
+
+    def material(df):
+        print("填補主要建材")
+        return run_transform("material", df, {"main_material_modes": mode_store.modes("main_material", df)})
+
+    def floor(df):
+        print("處理樓層資訊")
+        return run_transform("floor", df)
+
+    def price_clean(df):
+        print("計算單價與清除缺失值")
+        return run_transform("price_clean", df)
+
+    def elevator(df):
+        print("推論電梯")
+        return run_transform("elevator", df)
+
+    def lat_lng(df):
+        # 失敗時直接中斷，不寫 checkpoint；修正後以 --from-stage lat_lng 續跑
+        print("補經緯度")
+        lat_lng_update = recorder.instrument(LatLngUpdate(
+            df,
+            main_data_path=MASTER_STORE_PATH if master_store.exists() else None,
+            cache_path=GEOCODE_CACHE_PATH,
+            workers=3,
+            max_per_minute=90,
+            owned=COPY_FREE,
+        ))
+        try:
+            lat_lng_update.visit()
+            lat_lng_update.update_lat_lng()
+        finally:
+            lat_lng_update.quit()
+        return lat_lng_update.df
+
+    def mrt(df):
+        print("  -> 計算捷運距離")
+        if not os.path.exists(MRT_LOCATION_PATH):
+            print(f"警告: 找不到捷運座標檔，跳過。")
+            return df
+        mrt_distance = recorder.instrument(MrtDistance(
+            df, mrt_path=MRT_LOCATION_PATH, index_path=MRT_INDEX_PATH, k_stations=MRT_K_STATIONS))
         mrt_distance.calculate_distance_to_mrt()
         mrt_distance.process_mrt_name_and_grade()
-        df = mrt_distance.df
-    else:
-        print(f"警告: 找不到捷運座標檔，跳過。")
+        return mrt_distance.df
 
-    io.save(df)
-    print(f"ETL 清整完成。")
+    def poi(df):
+        print("  -> 計算周邊 POI 特徵")
+        layers = load_poi_layers(POI_LAYERS, base_dir=POI_DIR)
+        if not layers:
+            print(f"警告: {POI_DIR} 沒有任何 POI 點位檔，跳過。")
+            return df
+        return recorder.instrument(PoiFeatures(df, layers)).add_features().df
 
     # ==========================================
     # 5. Load: 寫入/更新 主資料庫
     # ==========================================
-    print("\n[Step 4] 寫入主資料庫")
+    def load_master(df):
+        os.makedirs(os.path.dirname(MERGED_CLEANED_PATH), exist_ok=True)
+        IOHandler(output_path=MERGED_CLEANED_PATH, compression=INTERMEDIATE_COMPRESSION).save(df)
+        if EXPORT_CLEANED_CSV:
+            IOHandler(output_path=CLEANED_CSV_PATH, encoding="utf-8-sig").save(df)
+        print(f"ETL 清整完成。")
 
-    os.makedirs(os.path.dirname(MASTER_DATA_PATH), exist_ok=True)
+        print("[Step 4] 寫入主資料庫")
+        ledger = IngestLedger(INGEST_LEDGER_PATH)
 
-    if MASTER_EXISTS:
-        print("模式: Append (合併至現有主檔)")
-        try:
-            loader = MainDataLoader(
-                main_data_path=MASTER_DATA_PATH,
-                new_data_path=MERGED_CLEANED_PATH,
-                output_path=TEMP_OUTPUT_PATH
-            )
-            loader.load()
-            
-            print("執行檔案置換")
-            if os.path.exists(TEMP_OUTPUT_PATH):
-                shutil.copy(MASTER_DATA_PATH, MASTER_DATA_PATH + ".bak")
-                os.remove(MASTER_DATA_PATH)
-                os.rename(TEMP_OUTPUT_PATH, MASTER_DATA_PATH)
-                print(f"  主資料庫更新成功: {MASTER_DATA_PATH}")
-            else:
-                print("錯誤：找不到合併後的暫存檔。")
-        except Exception as e:
-            print(f"Append 過程失敗: {e}")
-    else:
-        print("模式: Initialization (建立新主檔)")
-        try:
-            shutil.copy(MERGED_CLEANED_PATH, MASTER_DATA_PATH)
-            print(f"已成功建立主資料庫: {MASTER_DATA_PATH}")
-        except Exception as e:
-            print(f"建立主檔失敗: {e}")
+        if master_store.exists():
+            print("模式: Append (合併至現有主檔)")
+            try:
+                loader = MainDataLoader(
+                    main_data_path=MASTER_STORE_PATH,
+                    new_data_path=MERGED_CLEANED_PATH,
+                )
+                # 被本批 upsert 取代的舊列：寫入前先讀出，眾數表扣除其筆數
+                replaced = mode_store.replaced_rows(df)
+                loader.load()
+                ledger.mark_loaded()
+                mode_store.add(df, replaced=replaced)
+                print(f"  主資料庫更新成功: {MASTER_STORE_PATH}")
+            except Exception as e:
+                print(f"Append 過程失敗: {e}")
+        else:
+            print("模式: Initialization (建立新主檔)")
+            try:
+                master_store.write(read_frame(MERGED_CLEANED_PATH))
+                ledger.mark_loaded()
+                print(f"已成功建立主資料庫: {MASTER_STORE_PATH}")
+            except Exception as e:
+                print(f"建立主檔失敗: {e}")
+        ledger.close()
+
+        if EXPORT_MASTER_CSV and master_store.exists():
+            master_store.export_csv(MASTER_DATA_PATH)
 
     # ==========================================
     # 6. Cleanup
     # ==========================================
-    print("\n[Step 5] 清理暫存檔案")
-    for temp_file in [MERGED_RAW_PATH, MERGED_CLEANED_PATH]:
-        if os.path.exists(temp_file):
-            try:
-                os.remove(temp_file)
-                print(f"  - 已刪除: {os.path.basename(temp_file)}")
-            except:
-                pass
+    def cleanup(_):
+        print("[Step 5] 清理暫存檔案")
+        for temp_file in [MERGED_RAW_PATH, MERGED_CLEANED_PATH]:
+            if os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                    print(f"  - 已刪除: {os.path.basename(temp_file)}")
+                except:
+                    pass
+        pipeline.prune()
+
+    pipeline.register(Stage("download", download, checkpoint=False))
+    pipeline.register(Stage("merge", merge, deps=["download"], checkpoint=False))
+    pipeline.register(Stage("load_raw", load_raw, deps=["merge"], modules=[moi_schema_module],
+                            input_files=lambda: [MERGED_RAW_PATH]))
+    pipeline.register(Stage("filter_basic", filter_basic, deps=["load_raw"],
+                            modules=[city_partition_module, filter_basic_module]))
+    pipeline.register(Stage("house_age", house_age, deps=["filter_basic"],
+                            modules=[city_partition_module, date_houseage_module, roc_date_module]))
+    # 函式外的設定值與持久化狀態（已存模型、眾數表累計筆數）列入 config，變更時 checkpoint 失效
+    pipeline.register(Stage("parking", parking, deps=["house_age"],
+                            modules=[city_partition_module, parking_processing_module, parking_price_model_module,
+                                     mode_tables_module],
+                            config=lambda: {
+                                "estimator": PARKING_PRICE_ESTIMATOR,
+                                "price_model": parking_price_store.stored_fingerprint(),
+                                "parking_type_modes": mode_store.version("parking_type"),
+                            }))
+    pipeline.register(Stage("material", material, deps=["parking"],
+                            modules=[city_partition_module, material_processing_module, mode_tables_module],
+                            config=lambda: {"main_material_modes": mode_store.version("main_material")}))
+    pipeline.register(Stage("floor", floor, deps=["material"],
+                            modules=[city_partition_module, floor_processing_module]))
+    pipeline.register(Stage("price_clean", price_clean, deps=["floor"],
+                            modules=[city_partition_module, price_final_cleaning_module]))
+    pipeline.register(Stage("elevator", elevator, deps=["price_clean"],
+                            modules=[city_partition_module, elevator_processing_module]))
+    pipeline.register(Stage("lat_lng", lat_lng, deps=["elevator"],
+                            modules=[lat_lng_processing_module, geocode_cache_module]))
+    pipeline.register(Stage("mrt", mrt, deps=["lat_lng"], modules=[mrt_distance_module],
+                            config={"index_path": MRT_INDEX_PATH, "k_stations": MRT_K_STATIONS},
+                            input_files=lambda: [MRT_LOCATION_PATH] if os.path.exists(MRT_LOCATION_PATH) else []))
+    pipeline.register(Stage("poi", poi, deps=["mrt"], modules=[poi_features_module],
+                            config={"layers": POI_LAYERS},
+                            input_files=lambda: [os.path.join(POI_DIR, spec["path"]) for spec in POI_LAYERS
+                                                 if os.path.exists(os.path.join(POI_DIR, spec["path"]))]))
+    pipeline.register(Stage("load_master", load_master, deps=["poi"], checkpoint=False))
+    pipeline.register(Stage("cleanup", cleanup, deps=["load_master"], checkpoint=False))
+    return pipeline
+
 
-    print("全部流程執行完畢！")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="房屋實價登錄 ETL")
+    parser.add_argument("--from-stage", help="從指定 stage 開始（上游使用上次的 checkpoint）")
+    parser.add_argument("--to-stage", help="執行到指定 stage 為止")
+    parser.add_argument("--force", action="store_true", help="忽略 checkpoint，範圍內 stage 全部重跑")
+    parser.add_argument("--list-stages", action="store_true", help="列出所有 stage")
+    parser.add_argument("--profile", action="store_true", help="每個 stage 輸出 cProfile（main_house_rawdata/profiles）")
+    parser.add_argument("--trace-memory", action="store_true", help="以 tracemalloc 記錄各 stage 記憶體峰值（較慢）")
+    parser.add_argument("--workers", type=int, default=1, help="transform 依縣市分區平行處理的程序數（預設 1）")
+    parser.add_argument("--backfill", metavar="SEASON", help="一併回補歷史季度，例如 101S1（到最新已發布季度）")
+    parser.add_argument("--backfill-workers", type=int, default=4, help="歷史季度同時下載數（預設 4）")
+    args = parser.parse_args(argv)
+
+    pipeline = build_pipeline(profile=args.profile, trace_memory=args.trace_memory, transform_workers=args.workers,
+                              backfill_from=args.backfill, backfill_workers=args.backfill_workers)
+    if args.list_stages:
+        for name, stage in pipeline.stages.items():
+            print(f"{name:14s} deps={stage.deps} checkpoint={stage.checkpoint}")
+        return
+
+    try:
+        if pipeline.run(from_stage=args.from_stage, to_stage=args.to_stage, force=args.force):
+            print("全部流程執行完畢！")
+    finally:
+        pipeline.recorder.summary()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
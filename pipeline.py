@@ -0,0 +1,220 @@
+import hashlib
+import inspect
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+import pandas as pd
+import pyarrow.parquet as pq
+from etl_01_extract.ingest_ledger import file_sha256
+from arrow_tables import to_arrow_table
+
+
+class StopPipeline(Exception):
+    """stage 主動結束流程（例如沒有新資料），不視為錯誤"""
+
+
+class Stage:
+    """
+    pipeline 的一個步驟。
+    func 依 deps 順序接收上游輸出，回傳本 stage 輸出。
+    checkpoint=True 時輸出（DataFrame）寫成 Parquet，key 由 程式碼 / config / 上游 key / input_files 內容雜湊 組成。
+    code_hash 只涵蓋函式本身與 modules 的原始碼，函式外的設定值（路徑、參數）與持久化狀態（模型、眾數表）需放在 config；
+    config 可為 callable，於計算 key 時才取值（例如讀取目前持久化狀態的版本）。
+    checkpoint=False 用於有副作用的步驟（下載、合併、寫入主資料），每次都執行。
+    """
+
+    def __init__(self, name: str, func: Callable, deps: Sequence[str] = (), modules: Sequence = (),
+                 config: Optional[Union[dict, Callable[[], dict]]] = None, checkpoint: bool = True,
+                 input_files: Optional[Callable[[], List[str]]] = None):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.modules = list(modules)
+        self.config = config or {}
+        self.checkpoint = checkpoint
+        self.input_files = input_files
+
+    def config_values(self) -> dict:
+        return self.config() if callable(self.config) else self.config
+
+    def code_hash(self) -> str:
+        h = hashlib.sha256()
+        for obj in [self.func] + self.modules:
+            try:
+                h.update(inspect.getsource(obj).encode("utf-8"))
+            except (OSError, TypeError):
+                # 無原始碼（互動模式等）時退回 bytecode
+                h.update(getattr(obj, "__code__", obj).__repr__().encode("utf-8"))
+                h.update(getattr(getattr(obj, "__code__", None), "co_code", b""))
+        return h.hexdigest()
+
+
+class PipelineRunner:
+    """
+    stage 登錄與 DAG 執行：
+    - 依登錄順序（需先登錄上游）執行，上游 key 不變且 checkpoint 存在時直接略過
+    - from_stage / to_stage 只執行中間的 stage，範圍外的上游使用上一次執行的 checkpoint
+    - 上游輸出在最後一個下游 stage 執行後即釋放；下游可直接修改收到的 DataFrame（所有權交接）
+    """
+
+    def __init__(self, checkpoint_dir: str, recorder=None, profile: bool = False):
+        # recorder：MetricsRecorder，記錄每個 stage 的時間 / 記憶體 / 筆數；profile=True 時每個 stage 另存 cProfile
+        self.recorder = recorder
+        self.profile = profile
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.checkpoint_dir / "manifest.json"
+        self.stages: Dict[str, Stage] = {}
+
+    def register(self, stage: Stage):
+        for dep in stage.deps:
+            if dep not in self.stages:
+                raise ValueError(f"stage [{stage.name}] 的上游 [{dep}] 尚未登錄")
+        self.stages[stage.name] = stage
+        return stage
+
+    def stage(self, name: str, deps: Sequence[str] = (), **kwargs):
+        """decorator 形式登錄"""
+        def wrapper(func):
+            self.register(Stage(name, func, deps=deps, **kwargs))
+            return func
+        return wrapper
+
+    def _load_manifest(self) -> dict:
+        if self.manifest_path.exists():
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        return {}
+
+    def _save_manifest(self, manifest: dict):
+        self.manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def _checkpoint_path(self, name: str, key: str) -> Path:
+        return self.checkpoint_dir / f"{name}-{key[:16]}.parquet"
+
+    def _stage_key(self, stage: Stage, keys: Dict[str, Optional[str]]) -> str:
+        h = hashlib.sha256()
+        h.update(stage.name.encode("utf-8"))
+        h.update(stage.code_hash().encode("utf-8"))
+        h.update(json.dumps(stage.config_values(), sort_keys=True, default=str, ensure_ascii=False).encode("utf-8"))
+        for dep in stage.deps:
+            h.update((keys.get(dep) or "").encode("utf-8"))
+        for path in (stage.input_files() if stage.input_files else []):
+            h.update(file_sha256(path).encode("utf-8") if Path(path).exists() else b"missing")
+        return h.hexdigest()
+
+    def _write_checkpoint(self, path: Path, df: pd.DataFrame):
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(to_arrow_table(df, keep_dictionaries=True), tmp, compression="zstd")
+        tmp.replace(path)
+
+    def _read_checkpoint(self, path: Path) -> pd.DataFrame:
+        return pq.read_table(path).to_pandas()
+
+    def _call(self, stage: Stage, args):
+        if self.recorder is None:
+            return stage.func(*args)
+        rows_in = next((len(a) for a in args if isinstance(a, pd.DataFrame)), None)
+        with self.recorder.measure(stage.name, rows_in=rows_in, profile=self.profile) as extra:
+            result = stage.func(*args)
+            if isinstance(result, pd.DataFrame):
+                extra["rows_out"] = len(result)
+        return result
+
+    def run(self, from_stage: Optional[str] = None, to_stage: Optional[str] = None, force: bool = False):
+        names = list(self.stages)
+        for s in (from_stage, to_stage):
+            if s is not None and s not in self.stages:
+                raise ValueError(f"未知的 stage：{s}（可用：{', '.join(names)}）")
+        start = names.index(from_stage) if from_stage else 0
+        end = names.index(to_stage) if to_stage else len(names) - 1
+        selected = names[start:end + 1]
+
+        manifest = self._load_manifest()
+        keys: Dict[str, Optional[str]] = {}
+        outputs = {}
+
+        def output_of(dep: str):
+            # 上游輸出：本次已執行 / 讀 checkpoint；範圍外且無 checkpoint 的副作用 stage 傳 None
+            if dep not in outputs and not self.stages[dep].checkpoint:
+                return None
+            if dep not in outputs:
+                key = keys.get(dep)
+                path = self._checkpoint_path(dep, key) if key else None
+                if path is None or not path.exists():
+                    raise RuntimeError(f"找不到 stage [{dep}] 的 checkpoint，請從較前面的 stage 開始執行")
+                outputs[dep] = self._read_checkpoint(path)
+            return outputs[dep]
+
+        # 各輸出剩餘的下游數，歸零即釋放
+        consumers = {name: 0 for name in names}
+        for name in selected:
+            for dep in self.stages[name].deps:
+                consumers[dep] += 1
+
+        def release(stage: Stage):
+            for dep in stage.deps:
+                consumers[dep] -= 1
+                if consumers[dep] == 0:
+                    outputs.pop(dep, None)
+
+        # 範圍前的上游：沿用上次執行紀錄的 key
+        for name in names[:start]:
+            keys[name] = manifest.get(name)
+
+        try:
+            for name in selected:
+                stage = self.stages[name]
+                t0 = time.perf_counter()
+
+                if not stage.checkpoint:
+                    print(f"\n[Pipeline] ▶ {name}")
+                    outputs[name] = self._call(stage, [output_of(d) for d in stage.deps])
+                    release(stage)
+                    keys[name] = None
+                    continue
+
+                key = self._stage_key(stage, keys)
+                keys[name] = key
+                path = self._checkpoint_path(name, key)
+                if path.exists() and not force:
+                    print(f"\n[Pipeline] ✓ {name} 未變更，使用 checkpoint {path.name}")
+                    manifest[name] = key
+                    if self.recorder is not None:
+                        with self.recorder.measure(name) as extra:
+                            extra["cached"] = True
+                    release(stage)
+                    continue
+
+                print(f"\n[Pipeline] ▶ {name}")
+                result = self._call(stage, [output_of(d) for d in stage.deps])
+                release(stage)
+                if consumers[name]:
+                    outputs[name] = result
+                if isinstance(result, pd.DataFrame):
+                    self._write_checkpoint(path, result)
+                    manifest[name] = key
+                    self._save_manifest(manifest)
+                print(f"[Pipeline]   {name} 完成 ({time.perf_counter() - t0:.1f}s)")
+        except StopPipeline as e:
+            print(f"[Pipeline] 結束：{e}")
+            return False
+        except Exception:
+            print(f"[Pipeline] stage [{name}] 失敗，修正後可用 --from-stage {name} 續跑")
+            raise
+        finally:
+            self._save_manifest(manifest)
+        return True
+
+    def prune(self):
+        """只保留 manifest 中各 stage 最新的 checkpoint"""
+        manifest = self._load_manifest()
+        keep = {self._checkpoint_path(name, key).name for name, key in manifest.items() if key}
+        removed = 0
+        for path in self.checkpoint_dir.glob("*.parquet"):
+            if path.name not in keep:
+                path.unlink()
+                removed += 1
+        if removed:
+            print(f"[Pipeline] 清除 {removed} 個舊 checkpoint")
+        return removed
@@ -0,0 +1,166 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組，改由 tracemalloc 提供記憶體數據
+    resource = None
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 單位 KB，macOS 為 bytes
+    return round(rss / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+
+def _rows(value):
+    return len(value) if hasattr(value, "__len__") and hasattr(value, "columns") else None
+
+
+class MetricsRecorder:
+    """
+    stage / 方法層級的效能與筆數紀錄：wall time、CPU time、max RSS、tracemalloc 峰值增量、筆數進出。
+    每筆紀錄以 JSON 一行 append 到 history_path（跨季執行的歷史紀錄）。
+    """
+
+    def __init__(self, history_path: Optional[str] = None, trace_memory: bool = False,
+                 profile_dir: Optional[str] = None):
+        self.run_id = datetime.now().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        self.history_path = Path(history_path) if history_path else None
+        self.trace_memory = trace_memory
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.records = []
+        self._stack = []
+
+        if self.history_path:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.profile_dir:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _emit(self, record: dict):
+        self.records.append(record)
+        if self.history_path:
+            with open(self.history_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    @contextmanager
+    def measure(self, stage: str, step: Optional[str] = None, rows_in=None, profile: bool = False):
+        """
+        量測一段程式；yield 的 dict 可讓呼叫端補上 rows_out 等欄位。
+        巢狀使用時（stage 內的方法）tracemalloc 峰值會往外層累計。
+        """
+        frame = {"peak": 0, "base": 0}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            for outer in self._stack:
+                outer["peak"] = max(outer["peak"], peak)
+            tracemalloc.reset_peak()
+            frame["base"] = current
+        self._stack.append(frame)
+
+        profiler = None
+        if profile and self.profile_dir:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        extra = {}
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        status = "ok"
+        try:
+            yield extra
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+            if profiler:
+                profiler.disable()
+
+            self._stack.pop()
+            py_peak = None
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                frame["peak"] = max(frame["peak"], peak)
+                for outer in self._stack:
+                    outer["peak"] = max(outer["peak"], frame["peak"])
+                py_peak = round((frame["peak"] - frame["base"]) / 1024 / 1024, 1)
+
+            rows_out = extra.pop("rows_out", None)
+            record = {
+                "run_id": self.run_id,
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                "stage": stage,
+                "step": step,
+                "status": status,
+                "wall_s": round(wall, 4),
+                "cpu_s": round(cpu, 4),
+                "rows_in": rows_in,
+                "rows_out": rows_out,
+                "rows_dropped": rows_in - rows_out if rows_in is not None and rows_out is not None else None,
+                "max_rss_mb": _max_rss_mb(),
+                "py_peak_delta_mb": py_peak,
+            }
+            if profiler:
+                path = self.profile_dir / f"{self.run_id}-{stage}{'-' + step if step else ''}.prof"
+                profiler.dump_stats(path)
+                record["profile"] = str(path)
+            record.update(extra)
+            self._emit(record)
+
+    def instrument(self, obj, stage: Optional[str] = None):
+        """
+        包裝 stage 類別（FilterBasic 等）所有公開方法，每次呼叫記錄時間與 self.df 筆數變化；
+        方法寫入 obj.step_metrics 的內容（例如 apply_filter_plan 各規則刪除的筆數）一併記錄。
+        """
+        stage = stage or type(obj).__name__
+        for name in dir(type(obj)):
+            if name.startswith("_") or not callable(getattr(type(obj), name)):
+                continue
+            method = getattr(obj, name)
+
+            def make_wrapper(method, name):
+                @wraps(method)
+                def wrapper(*args, **kwargs):
+                    with self.measure(stage, name, rows_in=_rows(getattr(obj, "df", None))) as extra:
+                        result = method(*args, **kwargs)
+                        extra["rows_out"] = _rows(getattr(obj, "df", None))
+                        # 方法可把額外數據（例如各規則刪除筆數）放在 obj.step_metrics
+                        extra.update(getattr(obj, "step_metrics", None) or {})
+                        if hasattr(obj, "step_metrics"):
+                            obj.step_metrics = {}
+                    return result
+                return wrapper
+
+            setattr(obj, name, make_wrapper(method, name))
+        return obj
+
+    def summary(self):
+        """本次執行的 stage 層級摘要（依 wall time 排序）"""
+        from tabulate import tabulate
+
+        rows = [
+            [r["stage"], r["wall_s"], r["cpu_s"], r["rows_in"], r["rows_out"], r["max_rss_mb"], r["py_peak_delta_mb"]]
+            for r in self.records if r["step"] is None
+        ]
+        rows.sort(key=lambda r: -r[1])
+        print(tabulate(rows, headers=["stage", "wall_s", "cpu_s", "rows_in", "rows_out", "max_rss_mb", "py_peak_mb"]))
+
+
+def load_history(history_path):
+    """讀取歷史紀錄為 DataFrame，方便比較各季執行的效能變化"""
+    import pandas as pd
+
+    return pd.read_json(history_path, lines=True)